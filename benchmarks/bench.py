@@ -0,0 +1,261 @@
+"""
+Benchmarks for the calculator core and the app render path.
+
+Usage:
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --output new.json --compare baseline.json --threshold 0.15
+    python benchmarks/bench.py --quick
+
+Each benchmark reports the best of several repeats. With --compare, any
+benchmark that is slower than the baseline by more than the threshold is
+flagged and the script exits with status 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calculator import IncrementalMetrics, calculate_lamp_metrics, calculate_lamp_metrics_batch  # noqa: E402
+from comparison import build_comparison, style_comparison  # noqa: E402
+
+
+CATALOG_SIZES = (4, 100, 10_000, 1_000_000)
+QUICK_CATALOG_SIZES = (4, 100, 10_000)
+TABLE_SIZES = (4, 100, 1_000)
+
+SITE = {
+    'number_of_lamps': 120,
+    'hours_per_day': 15,
+    'required_lumens': 30000,
+    'energy_cost': 0.3,
+    'currency': '$',
+}
+
+
+def make_lamps(count, seed=0):
+    """Build a reproducible catalog of lamp dictionaries, led by the two SustainabLED options."""
+    rng = np.random.default_rng(seed)
+    lamps = [
+        {'name': "SustainabLED SHB 240", 'make': "SustainabLED", 'model': "SHB 240", 'wattage': 240.0, 'efficacy': 204.0, 'capital_cost': 140.0},
+        {'name': "SustainabLED SHB 160", 'make': "SustainabLED", 'model': "SHB 160", 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0},
+    ]
+    wattage = rng.integers(50, 400, count).astype(float)
+    efficacy = rng.integers(80, 220, count).astype(float)
+    capital_cost = np.round(rng.uniform(20, 300, count), 2)
+    for i in range(max(count - len(lamps), 0)):
+        lamps.append({
+            'name': f"Comparison Lamp {i + 1}",
+            'make': "Other",
+            'model': f"M{i}",
+            'wattage': float(wattage[i]),
+            'efficacy': float(efficacy[i]),
+            'capital_cost': float(capital_cost[i]),
+        })
+    return lamps[:count]
+
+
+def measure(function, repeats=5, min_time=0.2):
+    """
+    Time function, returning the best seconds per call over several repeats.
+
+    Fast functions are called in a loop until each repeat takes at least min_time.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def bench_calculator(sizes, repeats):
+    results = {}
+    for size in sizes:
+        lamps = make_lamps(size)
+        table = pd.DataFrame(lamps)
+        site_columns = {key: [SITE[key]] for key in ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')}
+
+        def scalar():
+            for lamp in lamps:
+                calculate_lamp_metrics(lamp, SITE)
+
+        def batch():
+            calculate_lamp_metrics_batch(table, site_columns)
+
+        # Alternate energy_cost so every call has something to recompute
+        incremental_metrics = IncrementalMetrics(table, SITE)
+        energy_costs = itertools.cycle((0.3, 0.31))
+
+        def incremental():
+            incremental_metrics.update({'energy_cost': next(energy_costs)})
+
+        # Large scalar loops are slow enough that one repeat is representative
+        scalar_repeats = 1 if size >= 100_000 else repeats
+        for name, function, count in (('scalar', scalar, scalar_repeats), ('batch', batch, repeats), ('incremental', incremental, repeats)):
+            seconds = measure(function, repeats=count, min_time=0 if size >= 100_000 else 0.2)
+            results[f'calculator.{name}.{size}'] = {
+                'seconds': seconds,
+                'calls_per_second': size / seconds,
+            }
+    return results
+
+
+def bench_tables(sizes, repeats):
+    results = {}
+    for size in sizes:
+        lamps = make_lamps(size)
+
+        def build():
+            build_comparison(lamps, SITE)
+
+        def build_and_style():
+            # Rendering the Stylers is what st.dataframe does with them
+            for styler in style_comparison(build_comparison(lamps, SITE)).values():
+                if styler is not None:
+                    styler.to_html()
+
+        for name, function in (('build', build), ('build_and_style', build_and_style)):
+            results[f'tables.{name}.{size}'] = {'seconds': measure(function, repeats=repeats)}
+    return results
+
+
+def bench_app(repeats):
+    try:
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("Skipping app benchmarks: streamlit is not installed", file=sys.stderr)
+        return {}
+
+    def fresh_app():
+        app = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60).run()
+        inputs = app.number_input
+        inputs[0].set_value(SITE['number_of_lamps'])
+        inputs[1].set_value(float(SITE['hours_per_day']))
+        inputs[2].set_value(SITE['required_lumens'])
+        inputs[3].set_value(SITE['energy_cost'])
+        app.number_input(key='wattage_2').set_value(300.0)
+        app.number_input(key='efficacy_2').set_value(120.0)
+        app.number_input(key='capital_cost_2').set_value(60.0)
+        return app.run()
+
+    def timed(function, setup=None):
+        # Only function() is timed; setup() builds its argument before each repeat
+        best = float('inf')
+        for _ in range(repeats):
+            argument = setup() if setup else None
+            start = time.perf_counter()
+            function(argument) if setup else function()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def cold_app():
+        # The results cache lives in st.cache_resource, which outlasts each AppTest
+        app = fresh_app()
+        st.cache_resource.clear()
+        return app
+
+    def warm_app():
+        app = fresh_app()
+        app.button[0].click().run()
+        return app
+
+    app = fresh_app()
+    return {
+        'app.first_run': {'seconds': timed(lambda: AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60).run())},
+        'app.calculate_cold': {'seconds': timed(lambda app: app.button[0].click().run(), setup=cold_app)},
+        'app.calculate_warm': {'seconds': timed(lambda app: app.button[0].click().run(), setup=warm_app)},
+        'app.rerun_with_results': {'seconds': timed(app.run)},
+    }
+
+
+def environment():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare two benchmark runs.
+
+    Returns:
+    - List of (name, baseline seconds, current seconds, ratio, regressed) for
+      every benchmark present in both runs
+    """
+    rows = []
+    for name, entry in sorted(current['results'].items()):
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['seconds']
+        after = entry['seconds']
+        ratio = after / before if before > 0 else float('inf')
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lighting calculator.")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed slowdown before flagging a regression (0.10 == 10%%)")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Skip the 1M-lamp calculator run")
+    parser.add_argument('--skip-app', action='store_true', help="Skip the Streamlit AppTest benchmarks")
+    args = parser.parse_args(argv)
+
+    results = {}
+    results.update(bench_calculator(QUICK_CATALOG_SIZES if args.quick else CATALOG_SIZES, args.repeats))
+    results.update(bench_tables(TABLE_SIZES, args.repeats))
+    if not args.skip_app:
+        results.update(bench_app(min(args.repeats, 3)))
+
+    run = {'environment': environment(), 'results': results}
+    for name, entry in sorted(results.items()):
+        extra = f"  {entry['calls_per_second']:,.0f} calls/s" if 'calls_per_second' in entry else ''
+        print(f"{name:40s} {entry['seconds'] * 1000:12.3f} ms{extra}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(run, handle, indent=2)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        rows = compare(run, baseline, args.threshold)
+        print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+        for name, before, after, ratio, regressed in rows:
+            flag = 'REGRESSION' if regressed else ''
+            print(f"{name:40s} {before * 1000:10.3f} -> {after * 1000:10.3f} ms  x{ratio:5.2f}  {flag}")
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
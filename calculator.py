@@ -1,10 +1,20 @@
+import numpy as np
+
+from instrumentation import instrumented
+from profiles import HOURS_PER_YEAR, flat_hours_per_day, profile_energy_costs
+
+
+@instrumented()
 def calculate_lamp_metrics(lamp, site_requirements):
     """
     Calculate all metrics for a lamp option based on site requirements.
     
     Parameters:
     - lamp: Dictionary containing lamp specifications
-    - site_requirements: Dictionary containing site requirements
+    - site_requirements: Dictionary containing site requirements. May also hold
+      an hourly 'operating_profile' (8760 values), with optional
+      'tariff_profile' and 'demand_rates', to price energy hour by hour
+      (see profiles.py)
     
     Returns:
     - Dictionary with all calculated metrics
@@ -37,11 +47,32 @@ def calculate_lamp_metrics(lamp, site_requirements):
     cost_per_req_lumens = cost_per_1000lm_hour * (required_lumens / 1000)
     
     # Calculate energy costs (updated formula)
-    # Daily energy cost
-    energy_cost_per_day = hours_per_day * number_of_lamps * cost_per_req_lumens
-    
-    # Yearly energy cost
-    energy_cost_per_year = energy_cost_per_day * 365
+    operating_profile = site_requirements.get('operating_profile')
+    if operating_profile is not None:
+        profile_hours = flat_hours_per_day(
+            operating_profile, site_requirements.get('tariff_profile'), site_requirements.get('demand_rates'), energy_cost
+        )
+        if profile_hours is not None:
+            # A full-output daily schedule on the flat tariff is priced exactly like hours_per_day
+            hours_per_day, operating_profile = profile_hours, None
+
+    if operating_profile is not None:
+        # Hourly operating/dimming profile priced against an hourly tariff
+        energy_cost_per_year = float(profile_energy_costs(
+            {'wattage': [wattage], 'efficacy': [efficacy]},
+            number_of_lamps,
+            required_lumens,
+            operating_profile,
+            site_requirements.get('tariff_profile', np.full(HOURS_PER_YEAR, energy_cost)),
+            site_requirements.get('demand_rates')
+        )[0, 0])
+        energy_cost_per_day = energy_cost_per_year / 365
+    else:
+        # Daily energy cost
+        energy_cost_per_day = hours_per_day * number_of_lamps * cost_per_req_lumens
+
+        # Yearly energy cost
+        energy_cost_per_year = energy_cost_per_day * 365
     
     # 5-year energy cost
     energy_cost_5years = energy_cost_per_year * 5
@@ -70,4 +101,249 @@ def calculate_lamp_metrics(lamp, site_requirements):
         'energy_cost_5years': round(energy_cost_5years, 2),
         'total_capital_cost': round(total_capital_cost, 2),
         'total_5year_cost': round(total_5year_cost, 2)
-    }
\ No newline at end of file
+    }
+
+# Columns the batch engine reads from the lamp and site tables
+LAMP_COLUMNS = ('wattage', 'efficacy', 'capital_cost')
+SITE_COLUMNS = ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')
+
+# Bump whenever a formula changes, so stored scenarios are recalculated
+MODEL_VERSION = '1'
+
+
+def round_like_python(values, ndigits=2):
+    """
+    Round an array exactly like Python's built-in round().
+
+    np.round scales by 10**ndigits and rounds half to even, which disagrees with
+    round() when the scaled value lands on (or within float error of) a half.
+    Those few cells are re-rounded with round() so batch results match the
+    scalar calculator bit for bit.
+
+    Parameters:
+    - values: NumPy array of floats
+    - ndigits: Number of decimal places
+
+    Returns:
+    - NumPy array of rounded floats
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+
+    # Flag values whose scaled fraction is too close to .5 (or too large to scale exactly)
+    with np.errstate(invalid='ignore'):
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        ambiguous = (distance <= 1e-7 + np.abs(scaled) * 1e-13) | (np.abs(scaled) >= 2.0 ** 52)
+    ambiguous &= np.isfinite(values)
+
+    if ambiguous.any():
+        rounded[ambiguous] = [round(v, ndigits) for v in values[ambiguous].tolist()]
+    return rounded
+
+
+def _column(table, key, shape):
+    # Accept DataFrames, dicts of arrays or dicts of scalars
+    return np.asarray(table[key], dtype=np.float64).reshape(shape)
+
+
+# Every metric, the inputs or metrics it is computed from, and how, in evaluation
+# order. Operation order matches calculate_lamp_metrics so the floats agree exactly.
+METRIC_GRAPH = {
+    'light_output_per_lamp': (('wattage', 'efficacy'), lambda wattage, efficacy: wattage * efficacy),
+    'total_light_output': (('light_output_per_lamp', 'number_of_lamps'), lambda light_output_per_lamp, number_of_lamps: light_output_per_lamp * number_of_lamps),
+    'suitable': (('light_output_per_lamp', 'required_lumens'), lambda light_output_per_lamp, required_lumens: light_output_per_lamp >= required_lumens),
+    'cost_per_1000lm_hour': (('energy_cost', 'wattage', 'light_output_per_lamp'), lambda energy_cost, wattage, light_output_per_lamp: ((energy_cost * wattage / 1000) / (light_output_per_lamp / 1000))),
+    'cost_per_req_lumens': (('cost_per_1000lm_hour', 'required_lumens'), lambda cost_per_1000lm_hour, required_lumens: cost_per_1000lm_hour * (required_lumens / 1000)),
+    'energy_cost_per_day': (('hours_per_day', 'number_of_lamps', 'cost_per_req_lumens'), lambda hours_per_day, number_of_lamps, cost_per_req_lumens: hours_per_day * number_of_lamps * cost_per_req_lumens),
+    'energy_cost_per_year': (('energy_cost_per_day',), lambda energy_cost_per_day: energy_cost_per_day * 365),
+    'energy_cost_5years': (('energy_cost_per_year',), lambda energy_cost_per_year: energy_cost_per_year * 5),
+    'total_capital_cost': (('number_of_lamps', 'capital_cost'), lambda number_of_lamps, capital_cost: number_of_lamps * capital_cost),
+    'total_5year_cost': (('total_capital_cost', 'energy_cost_5years'), lambda total_capital_cost, energy_cost_5years: total_capital_cost + energy_cost_5years),
+}
+
+
+def _downstream(graph):
+    # For each input and metric, every metric that has to be recomputed when it changes
+    downstream = {key: set() for key in LAMP_COLUMNS + SITE_COLUMNS + tuple(graph)}
+    for node, (inputs, _) in graph.items():
+        for key in inputs:
+            downstream[key].add(node)
+            # Graph order is topological, so the input's own set is already complete
+            for source, nodes in downstream.items():
+                if key in nodes:
+                    nodes.add(node)
+    return downstream
+
+
+METRIC_DOWNSTREAM = _downstream(METRIC_GRAPH)
+
+# For each metric, the metrics that have to be evaluated to get it (itself included)
+METRIC_UPSTREAM = {
+    node: {source for source in METRIC_GRAPH if node in METRIC_DOWNSTREAM[source]} | {node}
+    for node in METRIC_GRAPH
+}
+
+
+def _evaluate(values, nodes):
+    # Evaluate the given metrics in graph order, reading inputs from values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for node, (inputs, function) in METRIC_GRAPH.items():
+            if node in nodes:
+                values[node] = function(*(values[key] for key in inputs))
+    return values
+
+
+def _rounded(key, value):
+    # Suitability stays boolean; every other metric is rounded like the scalar version
+    return value if key == 'suitable' else round_like_python(value)
+
+
+def _batch_metrics(lamp_shape, site_shape, lamps, sites):
+    values = {key: _column(lamps, key, lamp_shape) for key in LAMP_COLUMNS}
+    values.update({key: _column(sites, key, site_shape) for key in SITE_COLUMNS})
+    _evaluate(values, METRIC_GRAPH)
+
+    shape = np.broadcast_shapes(values['wattage'].shape, values['number_of_lamps'].shape)
+
+    # Round like the scalar version; per-lamp columns are broadcast without copying
+    keys = ('wattage', 'efficacy') + tuple(METRIC_GRAPH)
+    return {key: np.broadcast_to(_rounded(key, values[key]), shape) for key in keys}
+
+
+class IncrementalMetrics:
+    """
+    Metrics for a whole lamp catalog at one site, kept up to date input by input.
+
+    Every intermediate metric is cached. Changing a site requirement (or the
+    lamp columns) re-evaluates only the metrics downstream of it in
+    METRIC_GRAPH, so editing energy_cost leaves light output, suitability and
+    capital cost untouched. Results match calculate_lamp_metrics_batch.
+
+    Hourly operating profiles are not handled here; see profiles.py.
+    """
+
+    def __init__(self, lamps, site_requirements):
+        self._values = {}
+        self._rounded = {}
+        self.recomputed = ()
+        self.update(site_requirements, lamps)
+
+    def update(self, site_requirements=None, lamps=None):
+        """
+        Apply new site requirements and/or lamp columns.
+
+        Parameters:
+        - site_requirements: Mapping with any of the SITE_COLUMNS, or None
+        - lamps: DataFrame or mapping of LAMP_COLUMNS, or None
+
+        Returns:
+        - Tuple of the metric names that were recomputed
+        """
+        changed = set()
+        if lamps is not None:
+            for key in LAMP_COLUMNS:
+                column = _column(lamps, key, (-1,))
+                if key not in self._values or not np.array_equal(column, self._values[key]):
+                    self._values[key] = column
+                    changed.add(key)
+        if site_requirements is not None:
+            for key in SITE_COLUMNS:
+                if key not in site_requirements:
+                    continue
+                value = np.float64(site_requirements[key])
+                if key not in self._values or value != self._values[key]:
+                    self._values[key] = value
+                    changed.add(key)
+
+        missing = [key for key in LAMP_COLUMNS + SITE_COLUMNS if key not in self._values]
+        if missing:
+            raise KeyError(f"Missing inputs: {', '.join(missing)}")
+
+        stale = set()
+        for key in changed:
+            stale |= METRIC_DOWNSTREAM[key]
+        _evaluate(self._values, stale)
+
+        # Refresh the rounded copies of changed inputs and recomputed metrics
+        for key in stale | (changed & {'wattage', 'efficacy'}):
+            self._rounded[key] = _rounded(key, self._values[key])
+
+        self.recomputed = tuple(node for node in METRIC_GRAPH if node in stale)
+        return self.recomputed
+
+    def __len__(self):
+        return len(self._values['wattage'])
+
+    def metrics(self):
+        """
+        Return the current metrics as (n_lamps,) arrays keyed like calculate_lamp_metrics_pairs.
+
+        The arrays are the cached values; treat them as read-only.
+        """
+        keys = ('wattage', 'efficacy') + tuple(METRIC_GRAPH)
+        return {key: self._rounded[key] for key in keys}
+
+
+@instrumented()
+def calculate_lamp_metrics_batch(lamps, sites):
+    """
+    Calculate all metrics for every lamp against every site in one vectorized pass.
+
+    Gives exactly the same numbers as calculate_lamp_metrics, broadcast to a
+    lamps x sites grid.
+
+    Parameters:
+    - lamps: DataFrame or mapping of columns (wattage, efficacy, capital_cost)
+    - sites: DataFrame or mapping of columns (number_of_lamps, hours_per_day,
+      required_lumens, energy_cost)
+
+    Returns:
+    - Dictionary of (n_lamps, n_sites) arrays keyed like calculate_lamp_metrics.
+      Suitability is returned as the boolean array 'suitable' (True == "OKAY").
+    """
+    # Lamps run down the rows, sites across the columns
+    return _batch_metrics((-1, 1), (1, -1), lamps, sites)
+
+
+@instrumented()
+def calculate_lamp_metric_batch(lamps, sites, metric):
+    """
+    Calculate a single metric for every lamp against every site.
+
+    Only the metrics it depends on are evaluated, so this is cheaper than
+    calculate_lamp_metrics_batch when one value per cell is all that's needed.
+
+    Parameters:
+    - lamps: DataFrame or mapping of columns (wattage, efficacy, capital_cost)
+    - sites: DataFrame or mapping of columns (number_of_lamps, hours_per_day,
+      required_lumens, energy_cost)
+    - metric: Name of a metric in METRIC_GRAPH (or 'wattage' / 'efficacy')
+
+    Returns:
+    - (n_lamps, n_sites) array, identical to calculate_lamp_metrics_batch(...)[metric]
+    """
+    values = {key: _column(lamps, key, (-1, 1)) for key in LAMP_COLUMNS}
+    values.update({key: _column(sites, key, (1, -1)) for key in SITE_COLUMNS})
+    _evaluate(values, METRIC_UPSTREAM.get(metric, ()))
+    shape = np.broadcast_shapes(values['wattage'].shape, values['number_of_lamps'].shape)
+    return np.broadcast_to(_rounded(metric, values[metric]), shape)
+
+
+@instrumented()
+def calculate_lamp_metrics_pairs(lamps, sites):
+    """
+    Calculate all metrics for lamp i against site i, for equal-length lamp and site tables.
+
+    Gives exactly the same numbers as calculate_lamp_metrics.
+
+    Parameters:
+    - lamps: DataFrame or mapping of columns (wattage, efficacy, capital_cost)
+    - sites: DataFrame or mapping of columns (number_of_lamps, hours_per_day,
+      required_lumens, energy_cost)
+
+    Returns:
+    - Dictionary of (n,) arrays keyed like calculate_lamp_metrics_batch
+    """
+    return _batch_metrics((-1,), (-1,), lamps, sites)
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from catalog import brand_mask
+
+
+def _lamp_table(lamps):
+    if isinstance(lamps, list):
+        return pd.DataFrame(lamps)
+    return lamps
+
+
+def project_cash_flows(lamps, site_requirements, years=25, escalation=0.0, discount_rate=0.0,
+                       replacement_years=None, capital_escalation=0.0):
+    """
+    Project year-by-year costs for every lamp over an N-year horizon.
+
+    Year 0 holds the capital cost of all lamps. Years 1..N hold the yearly
+    energy cost from calculate_lamp_metrics, escalated each year, plus the
+    capital cost of replacing every lamp at the end of each replacement cycle
+    (except at the end of the horizon). With no escalation, no discounting and
+    no replacements, the 5-year cumulative cost equals total_5year_cost.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements
+    - years: Horizon in years
+    - escalation: Yearly energy tariff escalation (0.03 == 3% a year)
+    - discount_rate: Yearly discount rate for NPV
+    - replacement_years: Years between lamp replacements (scalar or one per lamp), or None
+    - capital_escalation: Yearly escalation of replacement lamp prices
+
+    Returns:
+    - Dictionary of arrays: year (N+1,), and per lamp cash_flows,
+      discounted_cash_flows, cumulative_cost and cumulative_discounted_cost
+      (n_lamps, N+1), plus npv (n_lamps,)
+    """
+    lamps = _lamp_table(lamps)
+    wattage = np.asarray(lamps['wattage'], dtype=np.float64)[:, None]
+    efficacy = np.asarray(lamps['efficacy'], dtype=np.float64)[:, None]
+    capital_cost = np.asarray(lamps['capital_cost'], dtype=np.float64)[:, None]
+
+    number_of_lamps = site_requirements['number_of_lamps']
+    required_lumens = site_requirements['required_lumens']
+
+    # Yearly energy cost, as in calculate_lamp_metrics
+    light_output_per_lamp = wattage * efficacy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost_per_1000lm_hour = ((site_requirements['energy_cost'] * wattage / 1000) / (light_output_per_lamp / 1000))
+    cost_per_req_lumens = cost_per_1000lm_hour * (required_lumens / 1000)
+    energy_cost_per_year = site_requirements['hours_per_day'] * number_of_lamps * cost_per_req_lumens * 365
+    total_capital_cost = number_of_lamps * capital_cost
+
+    year = np.arange(years + 1)
+    cash_flows = np.zeros((len(wattage), years + 1))
+    cash_flows[:, 0] = total_capital_cost[:, 0]
+    cash_flows[:, 1:] = energy_cost_per_year * (1 + escalation) ** (year[1:] - 1)
+
+    if replacement_years is not None:
+        cycle = np.broadcast_to(np.asarray(replacement_years, dtype=np.float64), (len(wattage),))[:, None]
+        # Replace at the end of every full cycle, but not at the end of the horizon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            replaced = (np.mod(year[1:], cycle) == 0) & (year[1:] < years) & (cycle > 0)
+        cash_flows[:, 1:] += replaced * total_capital_cost * (1 + capital_escalation) ** year[1:]
+
+    discount = (1 + discount_rate) ** -year.astype(np.float64)
+    discounted_cash_flows = cash_flows * discount
+
+    return {
+        'year': year,
+        'cash_flows': cash_flows,
+        'discounted_cash_flows': discounted_cash_flows,
+        'cumulative_cost': np.cumsum(cash_flows, axis=1),
+        'cumulative_discounted_cost': np.cumsum(discounted_cash_flows, axis=1),
+        'npv': discounted_cash_flows.sum(axis=1),
+    }
+
+
+def break_even(cumulative_cost, ours, theirs):
+    """
+    Find when each of our lamps pays back against each comparison lamp.
+
+    Savings accumulate as the comparison lamp's cumulative cost minus ours.
+    Their running maximum is non-decreasing, so the first break-even year is
+    a sorted lookup (the count of years still below zero) rather than a loop.
+
+    Parameters:
+    - cumulative_cost: (n_lamps, N+1) cumulative costs from project_cash_flows
+    - ours: Indices of the lamps being recommended
+    - theirs: Indices of the comparison lamps
+
+    Returns:
+    - Dictionary with cumulative_savings (n_ours, n_theirs, N+1),
+      break_even_year (first whole year with savings >= 0, NaN if never) and
+      break_even_fraction (interpolated within that year)
+    """
+    ours = np.asarray(ours)
+    theirs = np.asarray(theirs)
+    cumulative_savings = cumulative_cost[theirs][None, :, :] - cumulative_cost[ours][:, None, :]
+    horizon = cumulative_savings.shape[-1]
+
+    # Equivalent to a row-wise np.searchsorted(running_max, 0) on sorted rows
+    running_max = np.maximum.accumulate(cumulative_savings, axis=-1)
+    first = (running_max < 0).sum(axis=-1)
+    never = first >= horizon
+
+    safe = np.minimum(first, horizon - 1)
+    at = np.take_along_axis(cumulative_savings, safe[..., None], axis=-1)[..., 0]
+    before = np.take_along_axis(cumulative_savings, np.maximum(safe - 1, 0)[..., None], axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(first > 0, (first - 1) + (-before) / (at - before), 0.0)
+
+    return {
+        'cumulative_savings': cumulative_savings,
+        'break_even_year': np.where(never, np.nan, first.astype(np.float64)),
+        'break_even_fraction': np.where(never, np.nan, fraction),
+    }
+
+
+def project_against_comparisons(lamps, site_requirements, sustainabled_mask=None, **kwargs):
+    """
+    Project cash flows for every lamp and the break-even of each SustainabLED
+    option against each comparison lamp.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements
+    - sustainabled_mask: Boolean array marking SustainabLED options (defaults to brand_mask)
+    - kwargs: Passed on to project_cash_flows
+
+    Returns:
+    - project_cash_flows results, plus the break_even results for nominal and
+      discounted costs and the sustainabled_index / comparison_index used
+    """
+    lamps = _lamp_table(lamps)
+    if sustainabled_mask is None:
+        sustainabled_mask = brand_mask(lamps)
+    sustainabled_mask = np.asarray(sustainabled_mask, dtype=bool)
+    ours = np.flatnonzero(sustainabled_mask)
+    theirs = np.flatnonzero(~sustainabled_mask)
+
+    projection = project_cash_flows(lamps, site_requirements, **kwargs)
+    projection['sustainabled_index'] = ours
+    projection['comparison_index'] = theirs
+    projection['break_even'] = break_even(projection['cumulative_cost'], ours, theirs)
+    projection['discounted_break_even'] = break_even(projection['cumulative_discounted_cost'], ours, theirs)
+    return projection
@@ -0,0 +1,455 @@
+import hashlib
+import os
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+
+# Columns every catalog row ends up with
+CATALOG_COLUMNS = ('name', 'make', 'model', 'wattage', 'efficacy', 'capital_cost')
+
+# Manufacturer price lists use all sorts of headers, map the common ones
+COLUMN_ALIASES = {
+    'name': 'name',
+    'lamp name': 'name',
+    'product': 'name',
+    'product name': 'name',
+    'make': 'make',
+    'brand': 'make',
+    'manufacturer': 'make',
+    'model': 'model',
+    'sku': 'model',
+    'part number': 'model',
+    'wattage': 'wattage',
+    'wattage (w)': 'wattage',
+    'watts': 'wattage',
+    'power (w)': 'wattage',
+    'efficacy': 'efficacy',
+    'efficacy (lm/w)': 'efficacy',
+    'lm/w': 'efficacy',
+    'capital cost': 'capital_cost',
+    'capital_cost': 'capital_cost',
+    'capital cost of 1 lamp': 'capital_cost',
+    'price': 'capital_cost',
+    'unit price': 'capital_cost',
+    'cost': 'capital_cost',
+}
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# The one number in a cell, with any text around it ("EUR 12.50", "5 each", "120 W").
+# An exponent only counts right after the digits, so units like "EUR" stay text.
+NUMBER_IN_TEXT = r'^[^\d]*?([+-]?\.?\d(?:[\d.,]*\d)?(?:[eE][+-]?\d+)?)[^\d]*$'
+
+# Space, no-break space or narrow no-break space grouping digits in threes ("1 234,50")
+SPACE_THOUSANDS = r'(?<=\d)[ \u00a0\u202f](?=\d{3}(?!\d))'
+
+# Number formats _to_number accepts commas in
+DECIMAL_COMMA_NUMBER = r'[+-]?(?:\d{1,3}(?:\.\d{3})+|\d+),\d+'     # 12,5 and 1.234,50
+THOUSANDS_COMMA_NUMBER = r'[+-]?\d{1,3}(?:,\d{3})+(?:\.\d+)?'     # 1,234 and 1,234.50
+THOUSANDS_COMMA_INTEGER = r'[+-]?\d{1,3}(?:,\d{3})+'
+
+# Make that marks our own lamps in any lamp table
+SUSTAINABLED_MAKE = "SustainabLED"
+
+# SustainabLED products offered in the app; their specifications are fixed
+SUSTAINABLED_PRODUCTS = (
+    {'name': "SustainabLED SHB 240", 'make': "SustainabLED", 'model': "SHB 240", 'wattage': 240.0, 'efficacy': 204.0, 'capital_cost': 140.0},
+    {'name': "SustainabLED SHB 160", 'make': "SustainabLED", 'model': "SHB 160", 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0},
+)
+
+# OpenDocument XML namespaces used by the ODS reader
+_ODS_NS = {
+    'table': 'urn:oasis:names:tc:opendocument:xmlns:table:1.0',
+    'office': 'urn:oasis:names:tc:opendocument:xmlns:office:1.0',
+    'text': 'urn:oasis:names:tc:opendocument:xmlns:text:1.0',
+}
+
+
+class LampCatalog:
+    """
+    Compact columnar lamp catalog.
+
+    Numeric specs are float64 arrays (so results match calculate_lamp_metrics
+    exactly), makes are stored as categorical codes and names/models as object
+    arrays. A catalog can be passed straight to calculate_lamp_metrics_batch.
+    """
+
+    __slots__ = ('name', 'make_codes', 'makes', 'model', 'wattage', 'efficacy', 'capital_cost', 'load_stats')
+
+    def __init__(self, name, make, model, wattage, efficacy, capital_cost, load_stats=None):
+        make = pd.Categorical(make)
+        self.name = np.asarray(name, dtype=object)
+        self.make_codes = np.asarray(make.codes, dtype=np.int32)
+        self.makes = np.asarray(make.categories, dtype=object)
+        self.model = np.asarray(model, dtype=object)
+        self.wattage = np.asarray(wattage, dtype=np.float64)
+        self.efficacy = np.asarray(efficacy, dtype=np.float64)
+        self.capital_cost = np.asarray(capital_cost, dtype=np.float64)
+        self.load_stats = load_stats or {}
+
+    @classmethod
+    def from_records(cls, records, load_stats=None):
+        """Build a catalog from a list of lamp dictionaries."""
+        return cls(
+            name=[r['name'] for r in records],
+            make=[r['make'] for r in records],
+            model=[r['model'] for r in records],
+            wattage=[r['wattage'] for r in records],
+            efficacy=[r['efficacy'] for r in records],
+            capital_cost=[r['capital_cost'] for r in records],
+            load_stats=load_stats,
+        )
+
+    def __len__(self):
+        return len(self.wattage)
+
+    @property
+    def make(self):
+        return self.makes[self.make_codes]
+
+    def __getitem__(self, column):
+        # Column access so the catalog works wherever a DataFrame of lamps does
+        if column == 'make':
+            return self.make
+        if column in CATALOG_COLUMNS:
+            return getattr(self, column)
+        raise KeyError(column)
+
+    def lamp(self, index):
+        """Return one lamp as the dictionary calculate_lamp_metrics expects."""
+        return {
+            'name': self.name[index],
+            'make': self.makes[self.make_codes[index]],
+            'model': self.model[index],
+            'wattage': float(self.wattage[index]),
+            'efficacy': float(self.efficacy[index]),
+            'capital_cost': float(self.capital_cost[index]),
+        }
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'name': self.name,
+            'make': pd.Categorical.from_codes(self.make_codes, self.makes),
+            'model': self.model,
+            'wattage': self.wattage,
+            'efficacy': self.efficacy,
+            'capital_cost': self.capital_cost,
+        })
+
+    def freeze(self):
+        """Make every column read-only so one catalog can be shared by all sessions; returns self."""
+        for col in ('name', 'make_codes', 'makes', 'model', 'wattage', 'efficacy', 'capital_cost'):
+            getattr(self, col).flags.writeable = False
+        return self
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, col).nbytes for col in ('name', 'make_codes', 'makes', 'model', 'wattage', 'efficacy', 'capital_cost'))
+
+
+class LampRecord:
+    """
+    One editable lamp, stored in fixed slots rather than a per-session dictionary.
+
+    Supports lamp['wattage'] style access, so it can be used wherever a lamp
+    dictionary is expected.
+    """
+
+    __slots__ = CATALOG_COLUMNS
+
+    def __init__(self, name='', make='', model='', wattage=0.0, efficacy=0.0, capital_cost=0.0):
+        self.name = name
+        self.make = make
+        self.model = model
+        self.wattage = wattage
+        self.efficacy = efficacy
+        self.capital_cost = capital_cost
+
+    def __getitem__(self, key):
+        if key not in CATALOG_COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in CATALOG_COLUMNS}
+
+
+def brand_mask(lamps, make=SUSTAINABLED_MAKE):
+    """
+    Flag the lamps of one make.
+
+    Parameters:
+    - lamps: DataFrame, LampCatalog, structured results array or mapping with a make column
+    - make: Make to flag (defaults to SustainabLED)
+
+    Returns:
+    - Boolean NumPy array, one entry per lamp
+    """
+    return np.asarray(lamps['make'], dtype=object) == make
+
+
+def catalog_fingerprint(catalog):
+    """
+    Hash a catalog's contents, so anything derived from it can be invalidated when it changes.
+
+    Parameters:
+    - catalog: LampCatalog or DataFrame of lamps
+
+    Returns:
+    - Hex digest string
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for col in ('wattage', 'efficacy', 'capital_cost'):
+        digest.update(np.ascontiguousarray(catalog[col], dtype=np.float64).tobytes())
+    for col in ('name', 'make', 'model'):
+        digest.update('\x1f'.join(map(str, catalog[col])).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _normalize_header(header):
+    key = str(header).strip().lower()
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _rows_to_chunks(rows, chunk_size):
+    # The first non-empty row is the header, everything after it is data
+    header = None
+    batch = []
+    for row in rows:
+        if header is None:
+            if any(cell not in (None, '') for cell in row):
+                header = [_normalize_header(cell) for cell in row]
+            continue
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield _label(pd.DataFrame(batch), header)
+            batch = []
+    if batch:
+        yield _label(pd.DataFrame(batch), header)
+
+
+def _label(frame, header):
+    # Rows may be ragged, pad the frame or the header so they line up
+    for i in range(frame.shape[1], len(header)):
+        frame[i] = None
+    frame.columns = list(header) + [f'column_{i}' for i in range(len(header), frame.shape[1])]
+    return frame
+
+
+def _iter_xlsx_rows(path, sheet):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Reading XLSX catalogs requires openpyxl (pip install openpyxl)")
+
+    # Read-only mode streams rows instead of loading the whole workbook
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        for row in worksheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _ods_cell_value(cell):
+    value_type = cell.get(f"{{{_ODS_NS['office']}}}value-type")
+    if value_type in ('float', 'currency', 'percentage'):
+        return float(cell.get(f"{{{_ODS_NS['office']}}}value"))
+    paragraphs = cell.findall('text:p', _ODS_NS)
+    if not paragraphs:
+        return None
+    return '\n'.join(''.join(p.itertext()) for p in paragraphs)
+
+
+def _iter_ods_rows(path, sheet):
+    table_tag = f"{{{_ODS_NS['table']}}}table"
+    row_tag = f"{{{_ODS_NS['table']}}}table-row"
+    cell_tags = (f"{{{_ODS_NS['table']}}}table-cell", f"{{{_ODS_NS['table']}}}covered-table-cell")
+    name_attr = f"{{{_ODS_NS['table']}}}name"
+    cols_attr = f"{{{_ODS_NS['table']}}}number-columns-repeated"
+    rows_attr = f"{{{_ODS_NS['table']}}}number-rows-repeated"
+
+    # Stream content.xml with iterparse so only one row is held in memory at a time
+    with zipfile.ZipFile(path) as archive, archive.open('content.xml') as content:
+        in_sheet = False
+        done = False
+        for event, element in ET.iterparse(content, events=('start', 'end')):
+            if element.tag == table_tag:
+                if event == 'start':
+                    in_sheet = not done and (sheet is None or element.get(name_attr) == sheet)
+                elif in_sheet:
+                    in_sheet = False
+                    done = True
+                continue
+            if event != 'end' or element.tag != row_tag:
+                continue
+            if in_sheet:
+                row = []
+                blanks = 0
+                for cell in element:
+                    if cell.tag not in cell_tags:
+                        continue
+                    value = _ods_cell_value(cell)
+                    repeat = int(cell.get(cols_attr, 1))
+                    # Trailing blank cells are repeated thousands of times, only
+                    # expand blanks once a value follows them
+                    if value is None:
+                        blanks += repeat
+                        continue
+                    row.extend([None] * blanks)
+                    row.extend([value] * repeat)
+                    blanks = 0
+                if row:
+                    for _ in range(int(element.get(rows_attr, 1))):
+                        yield tuple(row)
+            element.clear()
+
+
+def iter_catalog_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, sheet=None):
+    """
+    Stream raw rows from a CSV, XLSX or ODS price list in chunks.
+
+    Parameters:
+    - path: Path to the price list
+    - chunk_size: Number of rows per yielded DataFrame
+    - sheet: Worksheet name for spreadsheet formats (defaults to the first)
+
+    Returns:
+    - Iterator of DataFrames with normalized column names
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, skip_blank_lines=True):
+            chunk.columns = [_normalize_header(c) for c in chunk.columns]
+            yield chunk
+    elif extension == '.xlsx':
+        yield from _rows_to_chunks(_iter_xlsx_rows(path, sheet), chunk_size)
+    elif extension == '.ods':
+        yield from _rows_to_chunks(_iter_ods_rows(path, sheet), chunk_size)
+    else:
+        raise ValueError(f"Unsupported catalog format: {extension}")
+
+
+def _to_number(series):
+    """
+    Parse a column of prices or specs typed in by people.
+
+    The number is taken from the text around it, so currency symbols, codes,
+    units and words ("EUR 12.50", "5 each") are dropped; cells holding no
+    number, or more than one, become NaN. A comma is read as the
+    decimal separator when it is the last separator and isn't a thousands
+    group ("12,5" and "1.234,50"), and as a thousands separator when it
+    groups digits in threes ("1,234" and "1,234.50"). Values where the commas
+    fit neither pattern become NaN, so the row is rejected instead of misread.
+    """
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series)):
+        return pd.to_numeric(series, errors='coerce')
+
+    text = series.astype(str).str.replace(SPACE_THOUSANDS, '', regex=True)
+    text = text.str.extract(NUMBER_IN_TEXT, expand=False).fillna('')
+    has_comma = text.str.contains(',', regex=False)
+    decimal_comma = (
+        has_comma & text.str.fullmatch(DECIMAL_COMMA_NUMBER) & ~text.str.fullmatch(THOUSANDS_COMMA_INTEGER)
+    )
+    thousands_comma = has_comma & ~decimal_comma & text.str.fullmatch(THOUSANDS_COMMA_NUMBER)
+
+    text = text.where(~decimal_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    text = text.where(~thousands_comma, text.str.replace(',', '', regex=False))
+    text = text.where(~has_comma | decimal_comma | thousands_comma, '')
+    return pd.to_numeric(text, errors='coerce')
+
+
+def coerce_catalog_chunk(chunk):
+    """
+    Validate and type-coerce one chunk of catalog rows.
+
+    Rows with a missing or non-positive wattage or efficacy, or a missing or
+    negative capital cost, are rejected.
+
+    Parameters:
+    - chunk: DataFrame from iter_catalog_chunks
+
+    Returns:
+    - Tuple of (clean DataFrame with CATALOG_COLUMNS, number of rejected rows)
+    """
+    missing = [col for col in ('wattage', 'efficacy', 'capital_cost') if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Catalog is missing required columns: {', '.join(missing)}")
+
+    clean = pd.DataFrame(index=chunk.index)
+    for col in ('wattage', 'efficacy', 'capital_cost'):
+        clean[col] = _to_number(chunk[col]).astype(np.float64)
+
+    for col in ('make', 'model'):
+        clean[col] = chunk[col].fillna('').astype(str).str.strip() if col in chunk.columns else ''
+
+    # Fall back to "Make Model" when the list has no product name column
+    if 'name' in chunk.columns:
+        clean['name'] = chunk['name'].fillna('').astype(str).str.strip()
+    else:
+        clean['name'] = ''
+    unnamed = clean['name'] == ''
+    clean.loc[unnamed, 'name'] = (clean.loc[unnamed, 'make'] + ' ' + clean.loc[unnamed, 'model']).str.strip()
+
+    valid = (
+        np.isfinite(clean['wattage']) & (clean['wattage'] > 0)
+        & np.isfinite(clean['efficacy']) & (clean['efficacy'] > 0)
+        & np.isfinite(clean['capital_cost']) & (clean['capital_cost'] >= 0)
+    )
+    return clean.loc[valid, list(CATALOG_COLUMNS)], int((~valid).sum())
+
+
+def load_catalog(path, chunk_size=DEFAULT_CHUNK_SIZE, sheet=None):
+    """
+    Load a manufacturer price list into a LampCatalog.
+
+    Rows are read and validated chunk by chunk, so peak memory is the final
+    columnar catalog plus one chunk of raw rows.
+
+    Parameters:
+    - path: Path to a CSV, XLSX or ODS price list
+    - chunk_size: Number of rows to read at a time
+    - sheet: Worksheet name for spreadsheet formats
+
+    Returns:
+    - LampCatalog, with row counts and load time in catalog.load_stats
+    """
+    start = time.perf_counter()
+    columns = {col: [] for col in CATALOG_COLUMNS}
+    rows_read = 0
+    rows_rejected = 0
+
+    for chunk in iter_catalog_chunks(path, chunk_size=chunk_size, sheet=sheet):
+        rows_read += len(chunk)
+        clean, rejected = coerce_catalog_chunk(chunk)
+        rows_rejected += rejected
+        for col in CATALOG_COLUMNS:
+            columns[col].append(clean[col].to_numpy())
+
+    def joined(col, dtype):
+        return np.concatenate(columns[col]).astype(dtype, copy=False) if columns[col] else np.empty(0, dtype=dtype)
+
+    seconds = time.perf_counter() - start
+    load_stats = {
+        'path': path,
+        'rows_read': rows_read,
+        'rows_loaded': rows_read - rows_rejected,
+        'rows_rejected': rows_rejected,
+        'seconds': seconds,
+        'rows_per_second': rows_read / seconds if seconds > 0 else float('inf'),
+    }
+
+    return LampCatalog(
+        name=joined('name', object),
+        make=joined('make', object),
+        model=joined('model', object),
+        wattage=joined('wattage', np.float64),
+        efficacy=joined('efficacy', np.float64),
+        capital_cost=joined('capital_cost', np.float64),
+        load_stats=load_stats,
+    )
@@ -0,0 +1,243 @@
+"""
+Pre-built index answering "which lamps are suitable and worth considering?"
+
+A lamp is suitable for a site when its light output per lamp reaches the
+site's required lumens, so the suitable lamps for any query are the lamps
+above a light-output threshold. Among those, only lamps on the Pareto
+frontier of cost per 1000 lm/hour against capital cost are worth showing.
+Cost per 1000 lm/hour is energy_cost / efficacy, so the ranking does not
+depend on the tariff and can be computed once.
+
+Each lamp is on the frontier for a contiguous range of required lumens:
+from its own light output down to the brightest lamp that dominates it.
+Those ranges are stored in a segment tree, so a query is a stabbing query
+taking O(log n + k) time.
+"""
+import os
+
+import numpy as np
+
+from catalog import catalog_fingerprint
+
+
+INDEX_VERSION = 1
+
+
+def _dominator_light(cost, capital, light):
+    """
+    For each lamp, the highest light output of any lamp that dominates it
+    (no worse on cost and capital, strictly better on one), or -inf.
+    """
+    n = len(cost)
+    capital_rank = np.unique(capital, return_inverse=True)[1]
+    size = int(capital_rank.max()) + 1 if n else 0
+    tree = [-np.inf] * (size + 1)   # Fenwick tree of prefix maxima over capital rank
+
+    result = np.full(n, -np.inf)
+    order = np.lexsort((capital, cost))
+    start = 0
+    while start < n:
+        # Lamps with equal cost only dominate each other through strictly lower capital
+        end = start
+        while end < n and cost[order[end]] == cost[order[start]]:
+            end += 1
+        group = order[start:end]
+
+        group_best = -np.inf
+        previous_capital = None
+        pending = -np.inf
+        for i in group:
+            if capital[i] != previous_capital:
+                group_best = max(group_best, pending)
+                pending = -np.inf
+                previous_capital = capital[i]
+            best = group_best
+            position = capital_rank[i] + 1
+            while position > 0:
+                best = max(best, tree[position])
+                position -= position & -position
+            result[i] = best
+            pending = max(pending, light[i])
+
+        for i in group:
+            position = capital_rank[i] + 1
+            while position <= size:
+                if light[i] > tree[position]:
+                    tree[position] = light[i]
+                position += position & -position
+        start = end
+    return result
+
+
+class CatalogIndex:
+    """
+    Stabbing-query index over a lamp catalog for suitability range queries.
+
+    Build once with CatalogIndex.build (or load_or_build_index to reuse a copy
+    saved on disk), then call suitable_frontier(required_lumens).
+    """
+
+    def __init__(self, fingerprint, light_levels, light_order, suitable_counts, node_offsets, node_items, cost_rank):
+        self.fingerprint = fingerprint
+        self.light_levels = light_levels
+        self.light_order = light_order
+        self.suitable_counts = suitable_counts
+        self.node_offsets = node_offsets
+        self.node_items = node_items
+        self.cost_rank = cost_rank
+
+    @property
+    def leaves(self):
+        return (len(self.node_offsets) - 1) // 2
+
+    @classmethod
+    def build(cls, catalog):
+        """
+        Build the index for a catalog.
+
+        Parameters:
+        - catalog: LampCatalog or DataFrame of lamps
+
+        Returns:
+        - CatalogIndex
+        """
+        wattage = np.asarray(catalog['wattage'], dtype=np.float64)
+        efficacy = np.asarray(catalog['efficacy'], dtype=np.float64)
+        capital = np.asarray(catalog['capital_cost'], dtype=np.float64)
+        light = wattage * efficacy
+        with np.errstate(divide='ignore'):
+            cost = 1.0 / efficacy   # cost per 1000 lm/hour for a tariff of 1 per kWh
+
+        # Queries are bucketed by the first distinct light level >= required lumens
+        light_levels = np.unique(light)
+        light_rank = np.searchsorted(light_levels, light)
+        dominator = _dominator_light(cost, capital, light)
+        dominator_rank = np.where(np.isfinite(dominator), np.searchsorted(light_levels, dominator), -1)
+
+        # Lamp i answers every bucket q with dominator_rank < q <= light_rank
+        low = dominator_rank + 1
+        high = light_rank
+        live = np.flatnonzero(low <= high)
+
+        leaves = 1
+        while leaves < len(light_levels):
+            leaves *= 2
+        nodes = []
+        items = []
+        for i in live.tolist():
+            left = int(low[i]) + leaves
+            right = int(high[i]) + leaves + 1
+            while left < right:
+                if left & 1:
+                    nodes.append(left)
+                    items.append(i)
+                    left += 1
+                if right & 1:
+                    right -= 1
+                    nodes.append(right)
+                    items.append(i)
+                left //= 2
+                right //= 2
+
+        nodes = np.asarray(nodes, dtype=np.int64)
+        items = np.asarray(items, dtype=np.int64)
+        order = np.argsort(nodes, kind='stable')
+        node_offsets = np.zeros(2 * leaves + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=2 * leaves), out=node_offsets[1:])
+
+        return cls(
+            fingerprint=catalog_fingerprint(catalog),
+            light_levels=light_levels,
+            light_order=np.argsort(-light, kind='stable'),
+            # Number of lamps at or above each light level (plus 0 past the brightest)
+            suitable_counts=np.append(np.cumsum(np.bincount(light_rank, minlength=len(light_levels))[::-1])[::-1], 0),
+            node_offsets=node_offsets,
+            node_items=items[order],
+            cost_rank=np.argsort(np.argsort(cost, kind='stable'), kind='stable'),
+        )
+
+    def suitable_frontier(self, required_lumens):
+        """
+        Return the suitable, non-dominated lamps for a required lumens value.
+
+        Parameters:
+        - required_lumens: Lumens required from each lamp
+
+        Returns:
+        - Catalog indices, cheapest cost per 1000 lm/hour first
+        """
+        bucket = int(np.searchsorted(self.light_levels, required_lumens, side='left'))
+        if bucket >= len(self.light_levels):
+            return np.empty(0, dtype=np.int64)
+
+        # Walk from the leaf to the root collecting the lamps stored at each node
+        found = []
+        node = bucket + self.leaves
+        while node >= 1:
+            found.append(self.node_items[self.node_offsets[node]:self.node_offsets[node + 1]])
+            node //= 2
+        found = np.concatenate(found)
+        return found[np.argsort(self.cost_rank[found], kind='stable')]
+
+    def suitable(self, required_lumens):
+        """Return every suitable lamp, brightest first, without a linear scan."""
+        bucket = int(np.searchsorted(self.light_levels, required_lumens, side='left'))
+        return self.light_order[:self.suitable_counts[bucket]]
+
+    def save(self, path):
+        """Write the index to an .npz file."""
+        # Pass a file object so np.savez doesn't append its own extension
+        with open(path, 'wb') as handle:
+            self._write(handle)
+
+    def _write(self, handle):
+        np.savez(
+            handle,
+            version=INDEX_VERSION,
+            fingerprint=self.fingerprint,
+            light_levels=self.light_levels,
+            light_order=self.light_order,
+            suitable_counts=self.suitable_counts,
+            node_offsets=self.node_offsets,
+            node_items=self.node_items,
+            cost_rank=self.cost_rank,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f"Catalog index {path} was built by an incompatible version")
+            return cls(
+                fingerprint=str(data['fingerprint']),
+                light_levels=data['light_levels'],
+                light_order=data['light_order'],
+                suitable_counts=data['suitable_counts'],
+                node_offsets=data['node_offsets'],
+                node_items=data['node_items'],
+                cost_rank=data['cost_rank'],
+            )
+
+
+def load_or_build_index(catalog, path):
+    """
+    Load the index saved at path, rebuilding and saving it if the catalog has changed.
+
+    Parameters:
+    - catalog: LampCatalog or DataFrame of lamps
+    - path: Location of the .npz index file
+
+    Returns:
+    - CatalogIndex matching the catalog
+    """
+    fingerprint = catalog_fingerprint(catalog)
+    if os.path.exists(path):
+        try:
+            index = CatalogIndex.load(path)
+            if index.fingerprint == fingerprint:
+                return index
+        except (ValueError, OSError, KeyError):
+            pass
+    index = CatalogIndex.build(catalog)
+    index.save(path)
+    return index
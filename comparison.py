@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from catalog import brand_mask
+from instrumentation import instrumented, span
+from results import calculate_results, format_table, results_frame
+
+
+# Style the suitability column (one call per column rather than per cell)
+def color_suitability(column):
+    return np.where(
+        column == "OKAY",
+        'background-color: #005700; color: #FFFFFF; font-weight: bold',
+        'background-color: #8B0000; color: #FFFFFF; font-weight: bold'
+    )
+
+
+# Style the savings with green color for positive values
+def color_savings(column):
+    return np.where(column > 0, 'color: #00FF00; font-weight: bold', 'color: #FF6B6B; font-weight: bold')
+
+
+@instrumented()
+def build_comparison(lamp_options, site_requirements, store=None):
+    """
+    Calculate metrics for every lamp option and build the result tables.
+
+    The tables are plain DataFrames, so the result can be cached and shared
+    between sessions; style_comparison turns them into Stylers for display.
+
+    Parameters:
+    - lamp_options: List of lamp dictionaries
+    - site_requirements: Dictionary containing site requirements
+    - store: ScenarioStore passed on to calculate_results, or None
+
+    Returns:
+    - Dictionary with the result records and every table as a DataFrame
+      (savings is None without both kinds of lamp), or None if no lamp has
+      valid data
+    """
+    currency = site_requirements['currency']
+
+    # Calculate metrics for each lamp option
+    results = calculate_results(lamp_options, site_requirements, store)
+    if not len(results):
+        return None
+
+    # Suitability Check
+    suitability_df = results_frame(results, [
+        ('name', 'Lamp Name'), ('make', 'Make'), ('model', 'Model'),
+        ('light_output_per_lamp', 'Light Output per Lamp (lm)'), ('total_light_output', 'Total Light Output (lm)'),
+        ('suitability', 'Suitability')
+    ])
+
+    # Cost Efficiency
+    efficiency_df = results_frame(results, [
+        ('name', 'Lamp Name'),
+        ('cost_per_1000lm_hour', f'Cost per 1000 lm/hour ({currency})'),
+        ('cost_per_req_lumens', f'Cost per Required Lumens ({currency})')
+    ])
+
+    # Energy Costs
+    energy_df = results_frame(results, [
+        ('name', 'Lamp Name'),
+        ('energy_cost_per_day', f'Energy Cost per Day ({currency})'),
+        ('energy_cost_per_year', f'Energy Cost per Year ({currency})'),
+        ('energy_cost_5years', f'Energy Cost 5 Years ({currency})')
+    ])
+
+    # Total Costs
+    total_df = results_frame(results, [
+        ('name', 'Lamp Name'),
+        ('total_capital_cost', f'Total Capital Cost ({currency})'),
+        ('total_5year_cost', f'Total 5-Year Cost ({currency})')
+    ])
+
+    # Find the SustainabLED lamps and comparison lamps by make, not by name
+    is_sustainabled = brand_mask(results)
+    sustainabled_results = results[is_sustainabled]
+    comparison_results = results[~is_sustainabled]
+
+    savings_df = None
+    best_sustainabled = None
+    with span('comparison.savings'):
+        if len(sustainabled_results) and len(comparison_results):
+            # Find the best SustainabLED option (lowest 5-year cost)
+            best = sustainabled_results[np.argmin(sustainabled_results['total_5year_cost'])]
+            best_sustainabled = best['name']
+
+            # Calculate savings against each comparison lamp
+            comparisons = comparison_results[(comparison_results['wattage'] > 0) & (comparison_results['efficacy'] > 0)]  # Only show valid lamps
+            if len(comparisons):
+                five_year_savings = comparisons['total_5year_cost'] - best['total_5year_cost']
+                savings_df = pd.DataFrame({
+                    'Comparison Lamp': comparisons['name'],
+                    f'Annual Savings ({currency})': five_year_savings / 5,
+                    f'5-Year Savings ({currency})': five_year_savings
+                })
+
+    # Create a comprehensive comparison with all metrics
+    detailed_df = results_frame(results, [
+        ('name', 'Lamp Name'), ('wattage', 'Wattage (W)'), ('efficacy', 'Efficacy (lm/W)'),
+        ('light_output_per_lamp', 'Light Output per Lamp (lm)'), ('total_light_output', 'Total Light Output (lm)'),
+        ('suitability', 'Suitability'),
+        ('cost_per_1000lm_hour', f'Cost per 1000 lm/hour ({currency})'),
+        ('cost_per_req_lumens', f'Cost per Required Lumens ({currency})'),
+        ('energy_cost_per_day', f'Energy Cost/Day ({currency})'),
+        ('energy_cost_per_year', f'Energy Cost/Year ({currency})'),
+        ('energy_cost_5years', f'Energy Cost/5 Years ({currency})'),
+        ('total_capital_cost', f'Total Capital Cost ({currency})'),
+        ('total_5year_cost', f'Total 5-Year Cost ({currency})')
+    ])
+
+    return {
+        'results': results,
+        'suitability': suitability_df,
+        'efficiency': efficiency_df,
+        'energy': energy_df,
+        'total': total_df,
+        'savings': savings_df,
+        'best_sustainabled': best_sustainabled,
+        'detailed': detailed_df,
+    }
+
+
+# Tables build_comparison returns, in display order
+COMPARISON_TABLES = ('suitability', 'efficiency', 'energy', 'total', 'savings', 'detailed')
+
+
+@instrumented()
+def style_comparison(comparison):
+    """
+    Build fresh Stylers for the tables of a build_comparison result.
+
+    st.dataframe mutates the Styler it renders, so Stylers are made per rerun
+    and never cached; the DataFrames they wrap are only read.
+
+    Returns:
+    - Dictionary of COMPARISON_TABLES to Stylers (savings stays None when there is none)
+    """
+    # Numbers are only formatted to 2 decimals when the tables are rendered
+    tables = {}
+    for key in COMPARISON_TABLES:
+        frame = comparison[key]
+        if frame is None:
+            tables[key] = None
+            continue
+        styler = format_table(frame)
+        if 'Suitability' in frame.columns:
+            styler = styler.apply(color_suitability, subset=['Suitability'])
+        if key == 'savings':
+            styler = styler.apply(color_savings, subset=list(frame.columns[1:]))
+        tables[key] = styler
+    return tables
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+from calculator import calculate_lamp_metrics_batch
+
+
+# Lifetime specs read per lamp, with the value used when a lamp doesn't give one
+LIFETIME_DEFAULTS = {
+    'l70_hours': 50_000.0,       # operating hours until output falls to 70%
+    'l90_hours': np.nan,         # operating hours until output falls to 90% (optional)
+    'failure_rate': 0.01,        # share of lamps failing in their first year at the site
+    'wear_out_shape': 1.0,       # Weibull shape; 1 == constant failure rate, > 1 == wear-out
+    'refurbishment_cost': np.nan,  # cost to renew one lamp; NaN means buy a new lamp instead
+    'warranty_years': 0.0,       # failed lamps are replaced free within this many years of purchase
+}
+
+
+def _lamp_table(lamps):
+    if isinstance(lamps, list):
+        return pd.DataFrame(lamps)
+    return lamps
+
+
+def lifetime_specs(lamps, lifetime=None):
+    """
+    Collect the lifetime specs for every lamp.
+
+    Each spec comes from the lamp table column of the same name where the
+    lamp gives a value, then from lifetime (a scalar or one value per lamp),
+    then from LIFETIME_DEFAULTS.
+
+    Returns:
+    - Dictionary of (n_lamps,) float arrays keyed like LIFETIME_DEFAULTS
+    """
+    lamps = _lamp_table(lamps)
+    lifetime = lifetime or {}
+    n_lamps = len(lamps['wattage'])
+    specs = {}
+    for key, default in LIFETIME_DEFAULTS.items():
+        fallback = np.broadcast_to(np.asarray(lifetime.get(key, default), dtype=np.float64), (n_lamps,))
+        try:
+            values = np.asarray(lamps[key], dtype=np.float64)
+        except KeyError:
+            values = fallback
+        # Lamps left blank in a column fall back as well
+        specs[key] = np.where(np.isnan(values), fallback, values)
+    return specs
+
+
+def lumen_maintenance(hours, l70_hours, l90_hours=np.nan):
+    """
+    Share of initial light output left after a number of operating hours.
+
+    Output follows exp(-a * hours**b), fitted through the L90 and L70 points.
+    Without an L90 point the curve is the plain exponential (b == 1) through
+    L70, as in TM-21 projections.
+
+    Parameters:
+    - hours: Operating hours (any shape)
+    - l70_hours: Hours to 70% output (broadcastable against hours)
+    - l90_hours: Hours to 90% output, or NaN
+
+    Returns:
+    - Array of output fractions in (0, 1]
+    """
+    hours = np.asarray(hours, dtype=np.float64)
+    l70_hours = np.asarray(l70_hours, dtype=np.float64)
+    l90_hours = np.asarray(l90_hours, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shape = np.log(np.log(1 / 0.7) / np.log(1 / 0.9)) / np.log(l70_hours / l90_hours)
+        shape = np.where(np.isfinite(shape) & (shape > 0), shape, 1.0)
+        rate = np.log(1 / 0.7) / l70_hours ** shape
+    return np.exp(-rate * hours ** shape)
+
+
+def simulate_fleet(lamps, site_requirements, years=15, lifetime=None, refurbish_below=0.7,
+                   constant_lumens=False, discount_rate=0.0, seed=None):
+    """
+    Simulate a site's fleet of every lamp option year by year.
+
+    Each lamp option gets number_of_lamps individual units. Every year each
+    unit ages by hours_per_day * 365 hours and its output follows
+    lumen_maintenance. Units fail with Weibull probabilities and are replaced
+    with new lamps, at no cost within the warranty. Units whose output falls
+    below refurbish_below are refurbished (or replaced when the lamp has no
+    refurbishment cost), which restores full output. All units of all options
+    are updated together as arrays; only the years are looped over.
+
+    With no depreciation and no failures, year 0 and the yearly energy costs
+    are the total_capital_cost and energy_cost_per_year of calculate_lamp_metrics.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog; may carry
+      LIFETIME_DEFAULTS columns
+    - site_requirements: Dictionary containing site requirements
+    - years: Horizon in years
+    - lifetime: Lifetime specs as scalars or one value per lamp (see lifetime_specs)
+    - refurbish_below: Output fraction at which a unit is refurbished, or None for never
+    - constant_lumens: If True, drivers raise power to hold output, so energy
+      grows as output depreciates; otherwise power (and energy) stay constant
+    - discount_rate: Yearly discount rate for the discounted lifecycle cost
+    - seed: Seed for the failure draws
+
+    Returns:
+    - Dictionary with year (years+1,) and per lamp option (n_lamps, years+1)
+      arrays: mean_output, min_output (fractions of initial output),
+      suitable_fraction (share of units delivering required_lumens),
+      failures, refurbishments, energy_cost, replacement_cost,
+      refurbishment_cost, cash_flows and cumulative_cost; plus (n_lamps,)
+      lifecycle_cost, discounted_lifecycle_cost and first_unsuitable_year
+      (NaN when every unit stays suitable)
+    """
+    lamps = _lamp_table(lamps)
+    specs = lifetime_specs(lamps, lifetime)
+    site = {key: [site_requirements[key]] for key in ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')}
+    metrics = calculate_lamp_metrics_batch(lamps, site)
+
+    light_output_per_lamp = metrics['light_output_per_lamp'][:, 0]
+    energy_cost_per_unit = metrics['energy_cost_per_year'][:, 0] / site_requirements['number_of_lamps']
+    capital_cost = np.asarray(lamps['capital_cost'], dtype=np.float64)
+    n_lamps = len(capital_cost)
+    n_units = int(site_requirements['number_of_lamps'])
+    hours_per_year = site_requirements['hours_per_day'] * 365
+
+    # Per lamp option parameters as columns, against (n_lamps, n_units) unit state
+    l70_hours = specs['l70_hours'][:, None]
+    l90_hours = specs['l90_hours'][:, None]
+    wear_out_shape = specs['wear_out_shape'][:, None]
+    with np.errstate(divide='ignore'):
+        # Weibull scale that gives failure_rate over the first year of operation
+        scale = hours_per_year / (-np.log1p(-specs['failure_rate'])) ** (1 / specs['wear_out_shape'])
+    scale = scale[:, None]
+    refurbishment_cost = np.where(np.isnan(specs['refurbishment_cost']), capital_cost, specs['refurbishment_cost'])
+    initial_output = light_output_per_lamp[:, None]
+    # Lamps without a refurbishment option are replaced with new ones instead
+    replaced_when_worn = np.isnan(specs['refurbishment_cost'])[:, None]
+    required = site_requirements['required_lumens']
+
+    rng = np.random.default_rng(seed)
+    age = np.zeros((n_lamps, n_units))
+    purchased = np.zeros((n_lamps, n_units))
+
+    shape = (n_lamps, years + 1)
+    results = {key: np.zeros(shape) for key in (
+        'mean_output', 'min_output', 'suitable_fraction', 'failures', 'refurbishments',
+        'energy_cost', 'replacement_cost', 'refurbishment_cost', 'cash_flows')}
+    results['mean_output'][:, 0] = results['min_output'][:, 0] = 1.0
+    results['suitable_fraction'][:, 0] = light_output_per_lamp >= required
+    results['cash_flows'][:, 0] = metrics['total_capital_cost'][:, 0]
+
+    for year in range(1, years + 1):
+        start_output = lumen_maintenance(age, l70_hours, l90_hours)
+        end_age = age + hours_per_year
+        output = lumen_maintenance(end_age, l70_hours, l90_hours)
+
+        # Energy over the year; holding output takes proportionally more power
+        if constant_lumens:
+            power_factor = (0.5 * (1 / start_output + 1 / output)).mean(axis=1)
+        else:
+            power_factor = 1.0
+        results['energy_cost'][:, year] = energy_cost_per_unit * n_units * power_factor
+
+        # Output at the end of the year, before any maintenance
+        results['mean_output'][:, year] = output.mean(axis=1)
+        results['min_output'][:, year] = output.min(axis=1)
+        results['suitable_fraction'][:, year] = (output * initial_output >= required).mean(axis=1)
+
+        # Conditional Weibull failure probability over this year's hours
+        with np.errstate(divide='ignore', invalid='ignore'):
+            survival = np.exp((age / scale) ** wear_out_shape - (end_age / scale) ** wear_out_shape)
+        failed = rng.random(age.shape) >= np.nan_to_num(survival, nan=1.0)
+        under_warranty = (year - purchased) <= specs['warranty_years'][:, None]
+
+        if refurbish_below is None:
+            refurbished = np.zeros_like(failed)
+        else:
+            refurbished = ~failed & (output < refurbish_below)
+
+        results['failures'][:, year] = failed.sum(axis=1)
+        results['refurbishments'][:, year] = refurbished.sum(axis=1)
+        results['replacement_cost'][:, year] = (failed & ~under_warranty).sum(axis=1) * capital_cost
+        results['refurbishment_cost'][:, year] = results['refurbishments'][:, year] * refurbishment_cost
+
+        # New and refurbished units start again at full output
+        age = np.where(failed | refurbished, 0.0, end_age)
+        purchased = np.where(failed | (refurbished & replaced_when_worn), year, purchased)
+
+    results['cash_flows'][:, 1:] = (
+        results['energy_cost'][:, 1:] + results['replacement_cost'][:, 1:] + results['refurbishment_cost'][:, 1:]
+    )
+    results['cumulative_cost'] = np.cumsum(results['cash_flows'], axis=1)
+    results['year'] = np.arange(years + 1)
+
+    discount = (1 + discount_rate) ** -results['year'].astype(np.float64)
+    results['lifecycle_cost'] = results['cumulative_cost'][:, -1]
+    results['discounted_lifecycle_cost'] = (results['cash_flows'] * discount).sum(axis=1)
+
+    unsuitable = results['suitable_fraction'] < 1.0
+    results['first_unsuitable_year'] = np.where(unsuitable.any(axis=1), unsuitable.argmax(axis=1), np.nan)
+    return results
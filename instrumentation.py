@@ -0,0 +1,237 @@
+"""
+Opt-in timing instrumentation for the app and calculator.
+
+Nothing is recorded unless CALCULATOR_INSTRUMENT=1 is set when the process
+starts; without it every helper here is a no-op and decorated functions
+are returned unchanged.
+
+Environment variables:
+- CALCULATOR_INSTRUMENT=1        record timing spans
+- CALCULATOR_METRICS_PORT=9464   serve OpenMetrics text at http://127.0.0.1:<port>/metrics
+- CALCULATOR_METRICS_FILE=path   rewrite this file with OpenMetrics text after every rerun
+- CALCULATOR_PROFILE_DIR=path    dump a cProfile .prof file for every rerun
+
+Spans from every session are aggregated into one process-wide histogram
+per span name.
+"""
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ENABLED = os.environ.get('CALCULATOR_INSTRUMENT', '') not in ('', '0')
+METRICS_PORT = os.environ.get('CALCULATOR_METRICS_PORT')
+METRICS_FILE = os.environ.get('CALCULATOR_METRICS_FILE')
+PROFILE_DIR = os.environ.get('CALCULATOR_PROFILE_DIR')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe collection of span histograms shared by every session."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self):
+        """Return every histogram in OpenMetrics text format."""
+        lines = [
+            "# TYPE calculator_span_seconds histogram",
+            "# UNIT calculator_span_seconds seconds",
+            "# HELP calculator_span_seconds Time spent in each app stage and calculator call.",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'calculator_span_seconds_bucket{{span="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'calculator_span_seconds_sum{{span="{label}"}} {histogram.total}')
+                lines.append(f'calculator_span_seconds_count{{span="{label}"}} {histogram.count}')
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block under name."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start)
+
+
+def instrumented(name=None):
+    """
+    Decorator recording a span for every call.
+
+    When instrumentation is off the function is returned untouched, so hot
+    paths pay nothing.
+    """
+    def decorate(function):
+        if not ENABLED:
+            return function
+        label = name or f'{function.__module__}.{function.__name__}'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.observe(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class RerunTimer:
+    """
+    Time consecutive stages of a top-to-bottom script.
+
+    Call mark(stage) at the end of each stage; the time since the previous
+    mark is recorded as that stage. finish() records the whole rerun,
+    writes the metrics file and the cProfile dump.
+    """
+
+    def __init__(self, prefix='app'):
+        self.prefix = prefix
+        self.start = self.last = time.perf_counter()
+        self.profiler = None
+        if PROFILE_DIR:
+            try:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            except ValueError:
+                # Newer Pythons allow one active profiler per process; skip overlapping reruns
+                self.profiler = None
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        registry.observe(f'{self.prefix}.{stage}', now - self.last)
+        self.last = now
+
+    def finish(self):
+        registry.observe(f'{self.prefix}.rerun', time.perf_counter() - self.start)
+        if self.profiler is not None:
+            self.profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profiler.dump_stats(os.path.join(PROFILE_DIR, f'rerun-{time.time():.3f}-{uuid.uuid4().hex[:8]}.prof'))
+        if METRICS_FILE:
+            write_metrics_file(METRICS_FILE)
+
+
+class _NullRerunTimer:
+    def mark(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+
+def begin_rerun(prefix='app'):
+    """Start timing a script rerun; returns a no-op timer when instrumentation is off."""
+    if not ENABLED:
+        return _NullRerunTimer()
+    ensure_metrics_server()
+    return RerunTimer(prefix)
+
+
+def write_metrics_file(path):
+    """Atomically replace path with the current OpenMetrics text."""
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as handle:
+        handle.write(registry.render())
+    os.replace(temporary, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_disabled = False
+_server_lock = threading.Lock()
+
+
+def ensure_metrics_server(port=None, host='127.0.0.1'):
+    """
+    Start the /metrics endpoint in a daemon thread, once per process.
+
+    If the port can't be bound (e.g. it is already taken) the error is
+    reported once and the endpoint stays off for the life of the process.
+    """
+    global _server, _server_disabled
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None and not _server_disabled:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except (OSError, ValueError) as error:
+                _server_disabled = True
+                print(f"Metrics endpoint disabled: cannot serve on {host}:{port} ({error})", file=sys.stderr)
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
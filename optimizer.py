@@ -0,0 +1,269 @@
+"""
+Cost-minimal lamp selection over a catalog.
+
+Two kinds of site are supported:
+
+- Fixed positions (the calculator's model): number_of_lamps positions that
+  each need required_lumens. Every position gets one suitable lamp.
+- Total lumen target: any number of lamps whose combined output reaches
+  total_lumens.
+
+Both can be limited by a capital budget, in which case the cheapest answer
+may be a mixed fleet. Catalogs are pruned to their Pareto frontier first, so
+50k-SKU catalogs solve in milliseconds.
+"""
+import numpy as np
+
+
+# Cheap x dear pairs evaluated at once by the budgeted fixed-position solver
+PAIR_BLOCK_CELLS = 1_000_000
+
+
+def _lamp_arrays(catalog):
+    wattage = np.asarray(catalog['wattage'], dtype=np.float64)
+    efficacy = np.asarray(catalog['efficacy'], dtype=np.float64)
+    capital_cost = np.asarray(catalog['capital_cost'], dtype=np.float64)
+    return wattage, efficacy, capital_cost
+
+
+def pareto_frontier(cost, benefit):
+    """
+    Return indices of points not dominated on (cost lower, benefit higher).
+
+    Parameters:
+    - cost: Array to minimize
+    - benefit: Array to maximize
+
+    Returns:
+    - Indices of the frontier, sorted by increasing cost
+    """
+    return pareto_frontier_2d_costs(cost, -np.asarray(benefit, dtype=np.float64))
+
+
+def pareto_frontier_2d_costs(first, second):
+    """
+    Return indices of points not dominated when minimizing both arrays.
+
+    Sort by the first cost (ties broken by the second) and keep every point
+    that strictly improves on the best second cost so far: O(n log n).
+
+    Returns:
+    - Indices of the frontier, sorted by increasing first cost
+    """
+    first = np.asarray(first, dtype=np.float64)
+    second = np.asarray(second, dtype=np.float64)
+    order = np.lexsort((second, first))
+    best_so_far = np.minimum.accumulate(second[order])
+    # A point is on the frontier when it is strictly better than everything before it
+    keep = np.empty(len(order), dtype=bool)
+    if len(order):
+        keep[0] = True
+        keep[1:] = second[order][1:] < best_so_far[:-1]
+    return order[keep]
+
+
+def _best_pair_split(lamps, capital_cost, total_per_position, positions, capital_budget):
+    # Every (cheap, dear) pair: all positions get cheap, then as many as the budget allows are upgraded to dear
+    capital = capital_cost[lamps]
+    total = total_per_position[lamps]
+    affordable = np.flatnonzero(positions * capital <= capital_budget)
+    best_cost, best_counts = np.inf, None
+    # Keep each block of the (cheap, dear) grid to about PAIR_BLOCK_CELLS values
+    step = max(1, PAIR_BLOCK_CELLS // max(len(lamps), 1))
+    for start in range(0, len(affordable), step):
+        cheap = affordable[start:start + step]
+        gap = capital[None, :] - capital[cheap, None]
+        spare = capital_budget - positions * capital[cheap, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            upgraded = np.where(gap > 0, np.minimum(np.floor(spare / gap), positions), 0)
+        # The division can round up past the budget by one upgrade
+        upgraded = np.maximum(upgraded - (upgraded * gap > spare), 0)
+        saving = np.maximum(total[cheap, None] - total[None, :], 0)
+        cost = positions * total[cheap, None] - upgraded * saving
+        row, column = np.unravel_index(np.argmin(cost), cost.shape)
+        if cost[row, column] < best_cost:
+            best_cost = cost[row, column]
+            n = int(upgraded[row, column]) if saving[row, column] > 0 else 0
+            best_counts = {lamps[cheap[row]]: positions - n}
+            if n:
+                best_counts[lamps[column]] = n
+    return best_counts
+
+
+def _spend_leftover(counts, lamps, capital_cost, total_per_position, capital_budget):
+    # Greedily upgrade positions to the lamp that saves most per position while budget remains
+    counts = dict(counts)
+    while True:
+        leftover = capital_budget - sum(n * capital_cost[i] for i, n in counts.items())
+        best = None
+        for current, n in counts.items():
+            if not n:
+                continue
+            gap = capital_cost[lamps] - capital_cost[current]
+            saving = total_per_position[current] - total_per_position[lamps]
+            allowed = np.flatnonzero((gap > 0) & (gap <= leftover) & (saving > 0))
+            if len(allowed):
+                target = allowed[np.argmax(saving[allowed])]
+                if best is None or saving[target] > best[2]:
+                    best = (current, lamps[target], saving[target], gap[target])
+        if best is None:
+            return counts
+        current, target, _, gap = best
+        moved = min(counts[current], int(leftover // gap))
+        counts[current] -= moved
+        counts[target] = counts.get(target, 0) + moved
+
+
+def _mix_result(counts, capital_per_lamp, energy_per_lamp, light_per_lamp, candidates):
+    counts = {int(i): int(n) for i, n in counts.items() if n > 0}
+    capital = sum(n * capital_per_lamp[i] for i, n in counts.items())
+    energy = sum(n * energy_per_lamp[i] for i, n in counts.items())
+    return {
+        'feasible': True,
+        'mix': counts,
+        'number_of_lamps': sum(counts.values()),
+        'total_light_output': sum(n * light_per_lamp[i] for i, n in counts.items()),
+        'total_capital_cost': capital,
+        'energy_cost': energy,
+        'total_cost': capital + energy,
+        'candidates': candidates,
+    }
+
+
+def _infeasible(candidates, reason):
+    return {'feasible': False, 'reason': reason, 'mix': {}, 'candidates': candidates}
+
+
+def solve_fixed_positions(catalog, site_requirements, years=5, capital_budget=None):
+    """
+    Choose lamps for number_of_lamps positions that each need required_lumens.
+
+    Energy per position follows calculate_lamp_metrics (cost per required
+    lumens x hours x 365 x years). Without a budget the answer is the single
+    lamp with the lowest per-position cost. With a budget every pair of
+    frontier lamps is tried, filling every position with the cheaper lamp and
+    upgrading as many as the budget allows to the other (which covers every
+    single-lamp fleet too). Whatever budget the best pair leaves over is then
+    spent on further upgrades to any frontier lamp.
+
+    Parameters:
+    - catalog: LampCatalog or DataFrame of lamps
+    - site_requirements: Dictionary containing site requirements
+    - years: Cost horizon in years
+    - capital_budget: Maximum total capital spend, or None
+
+    Returns:
+    - Dictionary with mix ({catalog index: count}), costs and feasibility
+    """
+    wattage, efficacy, capital_cost = _lamp_arrays(catalog)
+    positions = int(site_requirements['number_of_lamps'])
+    required_lumens = site_requirements['required_lumens']
+
+    light_output_per_lamp = wattage * efficacy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost_per_1000lm_hour = (site_requirements['energy_cost'] * wattage / 1000) / (light_output_per_lamp / 1000)
+    cost_per_req_lumens = cost_per_1000lm_hour * (required_lumens / 1000)
+    energy_per_position = site_requirements['hours_per_day'] * cost_per_req_lumens * 365 * years
+
+    suitable = np.flatnonzero(
+        (light_output_per_lamp >= required_lumens) & np.isfinite(energy_per_position) & np.isfinite(capital_cost)
+    )
+    if not len(suitable):
+        return _infeasible(0, "No lamp in the catalog meets the required lumens")
+
+    # Only lamps on the (capital, energy) frontier can be part of an optimal fleet
+    frontier = suitable[pareto_frontier_2d_costs(capital_cost[suitable], energy_per_position[suitable])]
+    candidates = len(frontier)
+
+    total_per_position = capital_cost + energy_per_position
+    best = frontier[np.argmin(total_per_position[frontier])]
+    if capital_budget is None or positions * capital_cost[best] <= capital_budget:
+        return _mix_result({best: positions}, capital_cost, energy_per_position, light_output_per_lamp, candidates)
+
+    budget_per_position = capital_budget / positions
+    if capital_cost[frontier[0]] > budget_per_position:
+        return _infeasible(candidates, "Capital budget is too small to fit any suitable lamp")
+
+    counts = _best_pair_split(frontier, capital_cost, total_per_position, positions, capital_budget)
+    counts = _spend_leftover(counts, frontier, capital_cost, total_per_position, capital_budget)
+    return _mix_result(counts, capital_cost, energy_per_position, light_output_per_lamp, candidates)
+
+
+def solve_lumen_target(catalog, site_requirements, total_lumens, years=5, capital_budget=None):
+    """
+    Choose the cheapest fleet whose combined light output reaches total_lumens.
+
+    Energy per lamp is wattage x hours x 365 x years x energy cost. Every
+    single-type fleet is tried, so the best one is always found: without a
+    budget only lamps on the frontier of (cost per lamp) against light output
+    can win, with a budget every lamp is tried. Each fleet is also tried with
+    its last lamp swapped for the cheapest frontier lamp that covers the
+    remainder (a binary search). Mixes beyond that are not searched, so a
+    mixed answer is a good fleet rather than a proven optimum.
+
+    Parameters:
+    - catalog: LampCatalog or DataFrame of lamps
+    - site_requirements: Dictionary with hours_per_day and energy_cost
+    - total_lumens: Combined light output needed
+    - years: Cost horizon in years
+    - capital_budget: Maximum total capital spend, or None
+
+    Returns:
+    - Dictionary with mix ({catalog index: count}), costs and feasibility
+    """
+    wattage, efficacy, capital_cost = _lamp_arrays(catalog)
+    light_output_per_lamp = wattage * efficacy
+    energy_per_lamp = wattage / 1000 * site_requirements['hours_per_day'] * 365 * years * site_requirements['energy_cost']
+    cost_per_lamp = capital_cost + energy_per_lamp
+
+    valid = np.flatnonzero((light_output_per_lamp > 0) & np.isfinite(cost_per_lamp))
+    if not len(valid):
+        return _infeasible(0, "No lamp in the catalog has a valid light output")
+
+    # Top-up lamps: cheapest lamp for each level of light output
+    top_up = valid[pareto_frontier(cost_per_lamp[valid], light_output_per_lamp[valid])]
+    top_up_light = light_output_per_lamp[top_up]
+
+    # A budget can rule out the frontier lamps, so then every lamp is a candidate
+    bulk = top_up if capital_budget is None else valid
+    full = np.ceil(total_lumens / light_output_per_lamp[bulk])
+
+    # Fill the last gap with the cheapest lamp that covers it
+    remainder = total_lumens - (full - 1) * light_output_per_lamp[bulk]
+    position = np.searchsorted(top_up_light, remainder)
+    extra = top_up[np.minimum(position, len(top_up) - 1)]
+    topped_up = (full > 1) & (position < len(top_up)) & (extra != bulk)
+
+    # Single-type fleets, then the topped-up ones
+    capital = np.concatenate((
+        full * capital_cost[bulk],
+        (full - 1) * capital_cost[bulk] + capital_cost[extra],
+    ))
+    cost = np.concatenate((
+        full * cost_per_lamp[bulk],
+        np.where(topped_up, (full - 1) * cost_per_lamp[bulk] + cost_per_lamp[extra], np.inf),
+    ))
+    if capital_budget is not None:
+        cost[capital > capital_budget] = np.inf
+
+    best = int(np.argmin(cost))
+    if not np.isfinite(cost[best]):
+        return _infeasible(len(bulk), "Capital budget is too small to reach the lumen target")
+    if best < len(bulk):
+        counts = {bulk[best]: full[best]}
+    else:
+        best -= len(bulk)
+        counts = {bulk[best]: full[best] - 1, extra[best]: 1}
+    return _mix_result(counts, capital_cost, energy_per_lamp, light_output_per_lamp, len(bulk))
+
+
+def solve_lamp_mix(catalog, site_requirements, years=5, capital_budget=None, total_lumens=None):
+    """
+    Find the cost-minimal lamp choice (possibly a mixed fleet) for a site.
+
+    Uses solve_lumen_target when total_lumens is given, otherwise
+    solve_fixed_positions with the site's number_of_lamps and required_lumens.
+    """
+    if total_lumens is not None:
+        return solve_lumen_target(catalog, site_requirements, total_lumens, years=years, capital_budget=capital_budget)
+    return solve_fixed_positions(catalog, site_requirements, years=years, capital_budget=capital_budget)
@@ -0,0 +1,340 @@
+"""
+Headless multi-site portfolio runner.
+
+Evaluates every lamp in a catalog against every site in a sites file and
+streams the results to CSV or Parquet. Work is sharded by site across a
+process pool; Streamlit is never imported.
+
+Usage:
+    python portfolio.py sites.csv catalog.xlsx -o results.parquet --workers 8
+    python portfolio.py sites.csv catalog.xlsx -o results/ --format parquet
+    python portfolio.py sites.csv catalog.xlsx -o results.parquet --store scenarios.sqlite --customer "Acme Ltd"
+
+When the output is a directory each worker writes its own part file, so the
+parent process never becomes the bottleneck and throughput scales with cores.
+With --store, sites already in the scenario store are read back instead of
+recalculated, and new ones are saved to it.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculator import SITE_COLUMNS, calculate_lamp_metrics_batch
+from catalog import load_catalog
+from scenario_store import ScenarioStore
+
+
+# Output columns, in the same order calculate_lamp_metrics returns them
+METRIC_COLUMNS = (
+    'wattage', 'efficacy', 'light_output_per_lamp', 'total_light_output', 'suitability',
+    'cost_per_1000lm_hour', 'cost_per_req_lumens',
+    'energy_cost_per_day', 'energy_cost_per_year', 'energy_cost_5years',
+    'total_capital_cost', 'total_5year_cost',
+)
+
+# Aim for roughly this many lamp x site cells per task
+TARGET_CELLS_PER_TASK = 1_000_000
+
+# Catalog and scenario store (store, set_key, customer) held by each worker process, set once by _init_worker
+_worker_catalog = None
+_worker_store = (None, None, None)
+
+
+def load_sites(path):
+    """
+    Load a sites file (CSV or XLSX) with one row per site.
+
+    Parameters:
+    - path: Path to the sites file
+
+    Returns:
+    - DataFrame with site_id, currency and the SITE_COLUMNS as numbers
+    """
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xls', '.ods'):
+        sites = pd.read_excel(path)
+    else:
+        sites = pd.read_csv(path)
+    sites.columns = [str(c).strip().lower() for c in sites.columns]
+
+    missing = [col for col in SITE_COLUMNS if col not in sites.columns]
+    if missing:
+        raise ValueError(f"Sites file is missing required columns: {', '.join(missing)}")
+
+    for col in SITE_COLUMNS:
+        sites[col] = pd.to_numeric(sites[col], errors='raise').astype(np.float64)
+    if 'site_id' not in sites.columns:
+        sites['site_id'] = np.arange(len(sites))
+    if 'currency' not in sites.columns:
+        sites['currency'] = '$'
+    return sites[['site_id', 'currency', *SITE_COLUMNS]].reset_index(drop=True)
+
+
+def _init_worker(catalog, store_path=None, set_key=None, customer=None):
+    global _worker_catalog, _worker_store
+    _worker_catalog = catalog
+    if store_path is not None:
+        _worker_store = (ScenarioStore(store_path), set_key, customer)
+
+
+def evaluate_sites(catalog, sites, suitable_only=False, store=None, set_key=None, customer=None):
+    """
+    Evaluate a catalog against a block of sites.
+
+    Parameters:
+    - catalog: LampCatalog (or DataFrame of lamps)
+    - sites: DataFrame of sites as returned by load_sites
+    - suitable_only: Drop rows where the lamp is NOT SUITABLE for the site
+    - store: ScenarioStore to read stored sites from and save new ones to, or None
+    - set_key: The catalog's key in store (from put_lamp_set)
+    - customer: Customer the stored scenarios are tagged with
+
+    Returns:
+    - Long-format DataFrame with one row per (site, lamp)
+    """
+    if store is None:
+        metrics = calculate_lamp_metrics_batch(catalog, sites)
+    else:
+        metrics = store.evaluate(catalog, sites, set_key=set_key, customer=customer)
+    n_lamps, n_sites = metrics['suitable'].shape
+
+    # Site-major order: all lamps for the first site, then the next site...
+    columns = {
+        'site_id': np.repeat(sites['site_id'].to_numpy(), n_lamps),
+        'currency': np.repeat(sites['currency'].to_numpy(), n_lamps),
+        'name': np.tile(np.asarray(catalog['name']), n_sites),
+        'make': np.tile(np.asarray(catalog['make']), n_sites),
+        'model': np.tile(np.asarray(catalog['model']), n_sites),
+    }
+    suitable = metrics['suitable'].T.ravel()
+    for col in METRIC_COLUMNS:
+        if col == 'suitability':
+            columns[col] = np.where(suitable, "OKAY", "NOT SUITABLE")
+        else:
+            columns[col] = metrics[col].T.ravel()
+
+    frame = pd.DataFrame(columns)
+    if suitable_only:
+        frame = frame[suitable].reset_index(drop=True)
+    return frame
+
+
+def _evaluate_shard(args):
+    sites, suitable_only = args
+    return evaluate_sites(_worker_catalog, sites, suitable_only, *_worker_store)
+
+
+def _evaluate_shard_to_file(args):
+    sites, suitable_only, path, schema = args
+    writer = ResultWriter(path, schema=schema)
+    try:
+        writer.write(evaluate_sites(_worker_catalog, sites, suitable_only, *_worker_store))
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Writing Parquet requires pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def result_schema(sites):
+    """
+    Arrow schema of the evaluate_sites output for these sites.
+
+    Every Parquet block is cast to it, so an empty block (e.g. a shard with no
+    suitable lamps) can't fix its untyped columns as null.
+    """
+    pa, _ = _pyarrow()
+    site_id = sites['site_id'].dtype
+    fields = [('site_id', pa.string() if site_id == object else pa.from_numpy_dtype(site_id))]
+    fields += [(col, pa.string()) for col in ('currency', 'name', 'make', 'model')]
+    fields += [(col, pa.string() if col == 'suitability' else pa.float64()) for col in METRIC_COLUMNS]
+    return pa.schema(fields)
+
+
+class ResultWriter:
+    """
+    Append result blocks to a CSV or Parquet file as they arrive.
+
+    Parquet blocks are cast to schema when one is given. Without one the
+    schema comes from the first non-empty block; empty blocks before it are
+    held back, since their object columns carry no types.
+    """
+
+    def __init__(self, path, format=None, schema=None):
+        self.path = path
+        self.format = format or ('parquet' if path.lower().endswith('.parquet') else 'csv')
+        self.schema = schema
+        self.rows = 0
+        self._parquet = None
+        self._pending = None
+        self._header = True
+
+    def write(self, frame):
+        if self.format == 'parquet':
+            pa, pq = _pyarrow()
+            if self._parquet is None and self.schema is None and not len(frame):
+                self._pending = frame
+                return
+            table = pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+            if self._parquet is None:
+                self.schema = table.schema
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is None and self._pending is not None:
+            # Only empty blocks arrived; still leave a file with their columns behind
+            pa, pq = _pyarrow()
+            pq.write_table(pa.Table.from_pandas(self._pending, preserve_index=False), self.path)
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def iter_site_shards(sites, sites_per_task):
+    for start in range(0, len(sites), sites_per_task):
+        yield sites.iloc[start:start + sites_per_task]
+
+
+def _default_sites_per_task(catalog, sites_per_task):
+    if sites_per_task is None:
+        sites_per_task = max(1, TARGET_CELLS_PER_TASK // max(len(catalog), 1))
+    return sites_per_task
+
+
+def _store_args(catalog, store_path, customer):
+    # Store the catalog once up front so workers share its set_key
+    if store_path is None:
+        return (catalog,)
+    store = ScenarioStore(store_path)
+    try:
+        return (catalog, store_path, store.put_lamp_set(catalog), customer)
+    finally:
+        store.close()
+
+
+def run_portfolio(sites, catalog, writer, workers=None, sites_per_task=None, suitable_only=False,
+                  store_path=None, customer=None):
+    """
+    Evaluate every site against the catalog on a process pool, streaming results to writer.
+
+    At most two shards per worker are in flight, so memory stays bounded no
+    matter how many sites there are. Shards are written in site order.
+    With store_path, sites are read from and saved to that scenario store.
+
+    Returns:
+    - Number of result rows written
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = iter_site_shards(sites, _default_sites_per_task(catalog, sites_per_task))
+    initargs = _store_args(catalog, store_path, customer)
+    if writer.format == 'parquet' and writer.schema is None:
+        writer.schema = result_schema(sites)
+
+    if workers == 1:
+        store = ScenarioStore(store_path) if store_path is not None else None
+        try:
+            for shard in shards:
+                writer.write(evaluate_sites(catalog, shard, suitable_only, store, *initargs[2:]))
+        finally:
+            if store is not None:
+                store.close()
+        return writer.rows
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = []
+        for shard in shards:
+            pending.append(pool.submit(_evaluate_shard, (shard, suitable_only)))
+            # Backpressure: wait for the oldest shard before queueing more
+            if len(pending) >= workers * 2:
+                writer.write(pending.pop(0).result())
+        for future in pending:
+            writer.write(future.result())
+    return writer.rows
+
+
+def run_portfolio_to_directory(sites, catalog, directory, format='parquet', workers=None,
+                               sites_per_task=None, suitable_only=False, store_path=None, customer=None):
+    """
+    Evaluate every site against the catalog, with each worker writing its own part files.
+
+    Results never pass back through the parent process, so this scales close
+    to linearly with the number of workers.
+
+    Returns:
+    - Number of result rows written
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(directory, exist_ok=True)
+    shards = iter_site_shards(sites, _default_sites_per_task(catalog, sites_per_task))
+    schema = result_schema(sites) if format == 'parquet' else None
+    tasks = (
+        (shard, suitable_only, os.path.join(directory, f'part-{i:05d}.{format}'), schema)
+        for i, shard in enumerate(shards)
+    )
+
+    rows = 0
+    initargs = _store_args(catalog, store_path, customer)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(_evaluate_shard_to_file, task))
+            if len(pending) >= workers * 2:
+                rows += pending.pop(0).result()
+        for future in pending:
+            rows += future.result()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a lamp catalog against a portfolio of sites.")
+    parser.add_argument('sites', help="Sites file (CSV/XLSX) with number_of_lamps, hours_per_day, required_lumens, energy_cost, currency")
+    parser.add_argument('catalog', help="Lamp catalog (CSV/XLSX/ODS)")
+    parser.add_argument('-o', '--output', required=True, help="Output file (.csv or .parquet) or directory for part files")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='parquet', help="Part file format in directory mode")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--sites-per-task', type=int, default=None, help="Sites per shard (default: ~1M cells per shard)")
+    parser.add_argument('--suitable-only', action='store_true', help="Only write lamps that are suitable for the site")
+    parser.add_argument('--store', default=None, help="Scenario store (.sqlite) to reuse and save results in")
+    parser.add_argument('--customer', default=None, help="Customer to tag stored scenarios with")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sites = load_sites(args.sites)
+    catalog = load_catalog(args.catalog)
+    print(f"Loaded {len(sites)} sites and {len(catalog)} lamps in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.output.endswith(os.sep) or os.path.isdir(args.output):
+        rows = run_portfolio_to_directory(sites, catalog, args.output, format=args.format, workers=args.workers,
+                                          sites_per_task=args.sites_per_task, suitable_only=args.suitable_only,
+                                          store_path=args.store, customer=args.customer)
+    else:
+        writer = ResultWriter(args.output)
+        try:
+            rows = run_portfolio(sites, catalog, writer, workers=args.workers,
+                                 sites_per_task=args.sites_per_task, suitable_only=args.suitable_only,
+                                 store_path=args.store, customer=args.customer)
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows} rows to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
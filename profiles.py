@@ -0,0 +1,179 @@
+"""
+Hourly operating profiles and time-of-use tariffs for a full year.
+
+Profiles are (n_profiles, 8760) float32 arrays saved as .npy files and
+memory-mapped on load, so thousands of site profiles are never parsed or
+copied into memory in full.
+
+- An operating profile gives the fraction of full output each hour
+  (0 = off, 1 = full, 0.6 = dimmed to 60%).
+- A tariff profile gives the energy price per kWh each hour.
+- Optional demand rates give a price per kW of the monthly peak.
+
+Energy follows calculate_lamp_metrics: a lamp delivering the required lumens
+draws required_lumens / efficacy watts. Summing hour by hour rounds
+differently from the flat formula, so profile_energy_costs can differ from
+energy_cost_per_year in the last cent. calculate_lamp_metrics therefore
+prices a profile that is just hours_per_day at full output on the flat
+tariff (see flat_hours_per_day) with the flat formula, which gives exactly
+the same result.
+"""
+import math
+
+import numpy as np
+
+
+HOURS_PER_YEAR = 8760
+
+# Hour index where each month starts (non-leap year)
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_STARTS = np.concatenate(([0], np.cumsum(DAYS_PER_MONTH)[:-1])) * 24
+
+# Profile rows processed at a time when streaming from a memory map
+PROFILE_CHUNK = 1024
+
+
+def save_profiles(path, profiles):
+    """
+    Save hourly profiles as a compact float32 .npy file.
+
+    Parameters:
+    - path: Destination .npy path
+    - profiles: Array of shape (8760,) or (n_profiles, 8760)
+    """
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=np.float32))
+    if profiles.shape[1] != HOURS_PER_YEAR:
+        raise ValueError(f"Profiles must have {HOURS_PER_YEAR} hourly values, got {profiles.shape[1]}")
+    with open(path, 'wb') as handle:
+        np.save(handle, profiles)
+
+
+def load_profiles(path):
+    """Memory-map a profiles file written by save_profiles."""
+    profiles = np.load(path, mmap_mode='r')
+    if profiles.ndim != 2 or profiles.shape[1] != HOURS_PER_YEAR:
+        raise ValueError(f"{path} is not an (n, {HOURS_PER_YEAR}) profile file")
+    return profiles
+
+
+def daily_hours_profile(hours_per_day):
+    """
+    Build an operating profile that runs at full output for hours_per_day each day.
+
+    A fractional last hour runs at that fraction, so the profile sums to
+    hours_per_day * 365.
+    """
+    day = np.clip(float(hours_per_day) - np.arange(24), 0.0, 1.0)
+    return np.tile(day, 365)
+
+
+def flat_hours_per_day(operating_profile, tariff_profile=None, demand_rates=None, energy_cost=None):
+    """
+    Recognise a profile that the flat hours_per_day x energy_cost formula describes exactly.
+
+    Parameters:
+    - operating_profile: (8760,) operating profile
+    - tariff_profile: (8760,) tariff, or None for the flat energy_cost
+    - demand_rates: Demand rates, or None
+    - energy_cost: The flat price per kWh the tariff has to equal
+
+    Returns:
+    - hours_per_day when operating_profile is daily_hours_profile(hours_per_day),
+      the tariff is flat at energy_cost and there are no demand charges; otherwise None
+    """
+    if demand_rates is not None and np.any(np.asarray(demand_rates, dtype=np.float64) != 0):
+        return None
+    if tariff_profile is not None and not np.all(np.asarray(tariff_profile, dtype=np.float64) == energy_cost):
+        return None
+    operating = np.asarray(operating_profile, dtype=np.float64)
+    if operating.shape != (HOURS_PER_YEAR,):
+        return None
+    # The first day of a daily_hours_profile sums to hours_per_day exactly
+    hours_per_day = math.fsum(operating[:24].tolist())
+    if not np.array_equal(operating, daily_hours_profile(hours_per_day)):
+        return None
+    return hours_per_day
+
+
+def _rows(profiles, count):
+    if profiles.ndim == 1:
+        return np.broadcast_to(profiles, (count, HOURS_PER_YEAR))
+    return profiles
+
+
+def weighted_kwh_cost(operating_profiles, tariffs, demand_rates=None):
+    """
+    Yearly cost of running a 1 kW load on each profile.
+
+    Computes the row-wise dot product of operating and tariff profiles (plus
+    monthly peak x demand rate), streaming PROFILE_CHUNK rows at a time from
+    memory-mapped inputs.
+
+    Parameters:
+    - operating_profiles: (8760,) or (n, 8760) array
+    - tariffs: (8760,) or (n, 8760) array of prices per kWh
+    - demand_rates: None, (12,) or (n, 12) prices per kW of monthly peak
+
+    Returns:
+    - (n,) array of yearly cost per kW of connected load
+    """
+    # Leave memory maps as they are so rows are only read chunk by chunk
+    if not isinstance(operating_profiles, np.ndarray):
+        operating_profiles = np.asarray(operating_profiles, dtype=np.float64)
+    if not isinstance(tariffs, np.ndarray):
+        tariffs = np.asarray(tariffs, dtype=np.float64)
+    count = max(operating_profiles.shape[0] if operating_profiles.ndim == 2 else 1,
+                tariffs.shape[0] if tariffs.ndim == 2 else 1)
+    operating_profiles = _rows(operating_profiles, count)
+    tariffs = _rows(tariffs, count)
+    if demand_rates is not None:
+        demand_rates = np.broadcast_to(np.asarray(demand_rates, dtype=np.float64), (count, 12))
+
+    cost = np.empty(count)
+    for start in range(0, count, PROFILE_CHUNK):
+        stop = min(start + PROFILE_CHUNK, count)
+        operating = np.asarray(operating_profiles[start:stop], dtype=np.float64)
+        tariff = np.asarray(tariffs[start:stop], dtype=np.float64)
+        cost[start:stop] = np.einsum('ij,ij->i', operating, tariff)
+        if demand_rates is not None:
+            monthly_peak = np.maximum.reduceat(operating, MONTH_STARTS, axis=1)
+            cost[start:stop] += (monthly_peak * demand_rates[start:stop]).sum(axis=1)
+    return cost
+
+
+def effective_kw_per_lamp(wattage, efficacy, required_lumens):
+    """
+    Power drawn per lamp to deliver the required lumens, as calculate_lamp_metrics prices it.
+    """
+    wattage = np.asarray(wattage, dtype=np.float64)
+    light_output_per_lamp = wattage * np.asarray(efficacy, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return wattage / 1000 * (np.asarray(required_lumens, dtype=np.float64) / light_output_per_lamp)
+
+
+def profile_energy_costs(lamps, number_of_lamps, required_lumens, operating_profiles, tariffs, demand_rates=None):
+    """
+    Yearly energy cost of every lamp on every site profile.
+
+    The profile part reduces to one cost per kW per site, so the lamps x sites
+    result is an outer product of per-lamp power and per-site cost.
+
+    Parameters:
+    - lamps: DataFrame, LampCatalog or mapping with wattage and efficacy
+    - number_of_lamps: Scalar or (n_sites,) lamp counts
+    - required_lumens: Scalar or (n_sites,) lumens required per lamp
+    - operating_profiles: (8760,) or (n_sites, 8760), typically from load_profiles
+    - tariffs: (8760,) or (n_sites, 8760) prices per kWh
+    - demand_rates: None, (12,) or (n_sites, 12)
+
+    Returns:
+    - (n_lamps, n_sites) array of yearly energy cost
+    """
+    cost_per_kw = weighted_kwh_cost(operating_profiles, tariffs, demand_rates)
+    number_of_lamps = np.broadcast_to(np.asarray(number_of_lamps, dtype=np.float64), cost_per_kw.shape)
+    required_lumens = np.broadcast_to(np.asarray(required_lumens, dtype=np.float64), cost_per_kw.shape)
+
+    wattage = np.asarray(lamps['wattage'], dtype=np.float64)[:, None]
+    efficacy = np.asarray(lamps['efficacy'], dtype=np.float64)[:, None]
+    kw = effective_kw_per_lamp(wattage, efficacy, required_lumens[None, :])
+    return kw * number_of_lamps[None, :] * cost_per_kw[None, :]
@@ -0,0 +1,455 @@
+"""
+Streaming comparison report export.
+
+Writes the calculator's comparison sections (suitability, cost efficiency,
+energy costs, total costs and savings) to XLSX, CSV or Parquet. Results
+are produced a block of sites at a time and every block is written as soon
+as it is ready, so exporting millions of lamp x site rows never builds the
+full DataFrame.
+
+Every report starts with the site requirements. A single-site XLSX opens
+with a "Calculator" sheet laid out like attached_assets/CALCULATOR - SENAN.xlsx:
+the site requirements block, then one row per metric with the lamps across
+the columns. Lamps x sites do not fit across columns, so portfolio reports
+(and single-site CSV/Parquet) write a "sites" section with one row per site
+instead and keep the long-format sections.
+
+- XLSX uses openpyxl's write-only workbook, one sheet per section. Sections
+  longer than an Excel sheet continue on "<section> (2)", "<section> (3)"...
+  openpyxl serializes rows several times faster when lxml is installed.
+- CSV and Parquet write one file per section next to the output path, e.g.
+  report.csv -> report-sites.csv, report-suitability.csv...
+
+Usage:
+    python report.py sites.csv catalog.xlsx -o report.xlsx
+    python report.py sites.csv catalog.xlsx -o report.parquet --sites-per-block 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog import brand_mask, load_catalog
+from portfolio import ResultWriter, TARGET_CELLS_PER_TASK, _pyarrow, evaluate_sites, iter_site_shards, load_sites
+
+
+# (key, sheet title, [(field, label)]) for every section, in the app's order.
+# "{currency}" in a label is filled in for single-site reports.
+REPORT_SECTIONS = (
+    ('suitability', 'Suitability Check', [
+        ('name', 'Lamp Name'), ('make', 'Make'), ('model', 'Model'),
+        ('light_output_per_lamp', 'Light Output per Lamp (lm)'), ('total_light_output', 'Total Light Output (lm)'),
+        ('suitability', 'Suitability'),
+    ]),
+    ('efficiency', 'Cost Efficiency', [
+        ('name', 'Lamp Name'),
+        ('cost_per_1000lm_hour', 'Cost per 1000 lm/hour ({currency})'),
+        ('cost_per_req_lumens', 'Cost per Required Lumens ({currency})'),
+    ]),
+    ('energy', 'Energy Costs', [
+        ('name', 'Lamp Name'),
+        ('energy_cost_per_day', 'Energy Cost per Day ({currency})'),
+        ('energy_cost_per_year', 'Energy Cost per Year ({currency})'),
+        ('energy_cost_5years', 'Energy Cost 5 Years ({currency})'),
+    ]),
+    ('total', 'Total Costs', [
+        ('name', 'Lamp Name'),
+        ('total_capital_cost', 'Total Capital Cost ({currency})'),
+        ('total_5year_cost', 'Total 5-Year Cost ({currency})'),
+    ]),
+    ('savings', 'Savings', [
+        ('name', 'Comparison Lamp'),
+        ('best_sustainabled', 'SustainabLED Lamp'),
+        ('annual_savings', 'Annual Savings ({currency})'),
+        ('five_year_savings', '5-Year Savings ({currency})'),
+    ]),
+)
+
+# Site inputs, as in the "YOUR PROJECT - SITE REQUIREMENTS" block of the SENAN sheet
+SITE_REQUIREMENTS = (
+    ('number_of_lamps', 'No of Lamps'),
+    ('hours_per_day', 'No of Hours per day'),
+    ('required_lumens', 'Lumens Required from each lamp'),
+    ('energy_cost', 'Energy Cost per kWh ({currency})'),
+)
+
+# Rows of the single-site calculator sheet, lamps across the columns.
+# A None field is a heading row.
+CALCULATOR_ROWS = (
+    ('make', 'MAKE'),
+    ('model', 'MODEL'),
+    ('wattage', 'Wattage'),
+    ('efficacy', 'Efficacy (Lm/W)'),
+    (None, 'YOUR CALCULATED COMPARISON COSTS'),
+    ('light_output_per_lamp', 'Light Output of this Lamp (lm)'),
+    ('total_light_output', 'Total Light Output of Site (lm)'),
+    ('suitability', 'SUITABILITY OF THIS LAMP FOR PROJECT'),
+    ('cost_per_1000lm_hour', 'Cost per 1000 Lm/Hour ({currency})'),
+    ('cost_per_req_lumens', 'Cost per Required Lumens ({currency})'),
+    ('energy_cost_per_day', 'ENERGY COST OF SITE PER DAY ({currency})'),
+    ('energy_cost_per_year', 'ENERGY COST OF SITE PER YEAR ({currency})'),
+    ('energy_cost_5years', 'ENERGY COST OF SITE PER 5 YEARS ({currency})'),
+    (None, 'THE BOTTOM LINE'),
+    ('total_capital_cost', 'CAPITAL COST OF ALL LAMPS ({currency})'),
+    ('total_5year_cost', 'CAPITAL COST + ENERGY COSTS FOR 5 YEARS ({currency})'),
+)
+
+# Per-site columns leading every section of a multi-site report
+SITE_LABELS = (('site_id', 'Site ID'), ('currency', 'Currency'))
+
+# Section fields written as text; every other field except site_id is a number
+TEXT_FIELDS = ('currency', 'name', 'make', 'model', 'suitability', 'best_sustainabled')
+
+# Rows per Excel worksheet, including the header
+XLSX_MAX_ROWS = 1_048_576
+
+
+def _label(template, currency):
+    if currency is None:
+        return template.replace(' ({currency})', '')
+    return template.format(currency=currency)
+
+
+def savings_rows(block, lamps_per_site):
+    """
+    Savings of the best SustainabLED lamp against every other lamp, per site.
+
+    Parameters:
+    - block: Long-format results (as from portfolio.evaluate_sites), each
+      site's lamps contiguous and in the same order
+    - lamps_per_site: Number of lamps evaluated for every site
+
+    Returns:
+    - DataFrame with site_id, currency, name, best_sustainabled,
+      annual_savings and five_year_savings; sites without a SustainabLED lamp
+      or without a comparison lamp produce no rows
+    """
+    n_sites = len(block) // lamps_per_site if lamps_per_site else 0
+    ours = brand_mask(block[:lamps_per_site])
+    # Only lamps with valid data are compared, as in the app
+    wattage = block['wattage'].to_numpy()[:lamps_per_site]
+    efficacy = block['efficacy'].to_numpy()[:lamps_per_site]
+    theirs = ~ours & (wattage > 0) & (efficacy > 0)
+    if not n_sites or not ours.any() or not theirs.any():
+        return pd.DataFrame(columns=['site_id', 'currency', 'name', 'best_sustainabled', 'annual_savings', 'five_year_savings'])
+
+    # Lamps down the columns, one row per site
+    total = block['total_5year_cost'].to_numpy().reshape(n_sites, lamps_per_site)
+    our_index = np.flatnonzero(ours)
+    best = our_index[np.argmin(total[:, our_index], axis=1)]
+    five_year_savings = total[:, theirs] - total[np.arange(n_sites), best][:, None]
+
+    names = block['name'].to_numpy()[:lamps_per_site]
+    n_theirs = int(theirs.sum())
+    first_rows = np.arange(n_sites) * lamps_per_site
+    return pd.DataFrame({
+        'site_id': np.repeat(block['site_id'].to_numpy()[first_rows], n_theirs),
+        'currency': np.repeat(block['currency'].to_numpy()[first_rows], n_theirs),
+        'name': np.tile(names[theirs], n_sites),
+        'best_sustainabled': np.repeat(names[best], n_theirs),
+        'annual_savings': (five_year_savings / 5).ravel(),
+        'five_year_savings': five_year_savings.ravel(),
+    })
+
+
+def section_frames(block, lamps_per_site, currency=None):
+    """
+    Split a block of long-format results into the report sections.
+
+    Parameters:
+    - block: Long-format results with each site's lamps contiguous
+    - lamps_per_site: Number of lamps evaluated for every site
+    - currency: Currency symbol for a single-site report. When None the
+      site ID and currency lead every section instead.
+
+    Yields:
+    - (section key, sheet title, DataFrame) for every section
+    """
+    leading = [] if currency is not None else list(SITE_LABELS)
+    for key, title, columns in REPORT_SECTIONS:
+        source = savings_rows(block, lamps_per_site) if key == 'savings' else block
+        frame = pd.DataFrame({
+            _label(label, currency): source[field].to_numpy()
+            for field, label in leading + columns
+        })
+        yield key, title, frame
+
+
+def site_frame(sites, currency=None):
+    """
+    The site requirements section.
+
+    Parameters:
+    - sites: DataFrame (or mapping of columns) with the SITE_REQUIREMENTS
+      fields, plus site_id and currency unless currency is given
+    - currency: Currency symbol for a single-site report
+
+    Returns:
+    - DataFrame with one row per site
+    """
+    leading = [] if currency is not None else list(SITE_LABELS)
+    return pd.DataFrame({
+        _label(label, currency): np.asarray(sites[field])
+        for field, label in leading + list(SITE_REQUIREMENTS)
+    })
+
+
+def calculator_rows(block, site_requirements):
+    """
+    Rows of the single-site calculator sheet, in the SENAN layout.
+
+    Parameters:
+    - block: Long-format results for the site, one row per lamp
+    - site_requirements: Dictionary containing site requirements
+
+    Yields:
+    - One list of cell values per sheet row
+    """
+    currency = site_requirements['currency']
+    yield ['COST OF LIGHT CALCULATOR']
+    yield []
+    yield ['YOUR PROJECT - SITE REQUIREMENTS']
+    for field, label in SITE_REQUIREMENTS:
+        yield [_label(label, currency), site_requirements[field]]
+    yield []
+    for field, label in CALCULATOR_ROWS:
+        if field is None:
+            yield [label]
+        else:
+            yield [_label(label, currency)] + block[field].tolist()
+
+
+def report_schemas(site_id=None, currency=None):
+    """
+    Arrow schema of every report section, for Parquet reports.
+
+    Every block of a section is cast to it, so a block whose site IDs or
+    makes are all missing can't fix those columns as null.
+
+    Parameters:
+    - site_id: dtype of the sites' site_id column
+    - currency: Currency symbol for a single-site report, which has no site
+      ID or currency columns
+
+    Returns:
+    - Dictionary of pyarrow schemas by section key, including 'sites'
+    """
+    pa, _ = _pyarrow()
+
+    def field_type(field):
+        if field == 'site_id':
+            return pa.string() if site_id == object else pa.from_numpy_dtype(site_id)
+        return pa.string() if field in TEXT_FIELDS else pa.float64()
+
+    leading = [] if currency is not None else list(SITE_LABELS)
+    sections = [('sites', list(SITE_REQUIREMENTS))] + [(key, columns) for key, _, columns in REPORT_SECTIONS]
+    return {
+        key: pa.schema([(_label(label, currency), field_type(field)) for field, label in leading + columns])
+        for key, columns in sections
+    }
+
+
+def iter_report_blocks(catalog, sites, sites_per_block=None):
+    """
+    Evaluate the catalog against the sites one block of sites at a time.
+
+    Yields:
+    - (section key, sheet title, DataFrame) for the site requirements and
+      every section of every block
+    """
+    if sites_per_block is None:
+        sites_per_block = max(1, TARGET_CELLS_PER_TASK // max(len(catalog), 1))
+    for shard in iter_site_shards(sites, sites_per_block):
+        yield 'sites', 'Site Requirements', site_frame(shard)
+        block = evaluate_sites(catalog, shard)
+        yield from section_frames(block, len(catalog))
+
+
+class ReportWriter:
+    """
+    Write report sections to XLSX, CSV or Parquet as blocks arrive.
+
+    Parameters:
+    - path: Output path, or a binary file object for XLSX
+    - format: 'xlsx', 'csv' or 'parquet'; taken from the extension when None
+    - schemas: Parquet schema per section key, as from report_schemas
+    """
+
+    def __init__(self, path, format=None, schemas=None):
+        if format is None:
+            format = os.path.splitext(path)[1].lower().lstrip('.') if isinstance(path, str) else 'xlsx'
+        if format not in ('xlsx', 'csv', 'parquet'):
+            raise ValueError(f"Unsupported report format: {format}")
+        self.path = path
+        self.format = format
+        self.schemas = schemas
+        self.rows = {}
+        self._sheets = {}
+        self._writers = {}
+        self._workbook = None
+        if format == 'xlsx':
+            try:
+                from openpyxl import Workbook
+            except ImportError:
+                raise ImportError("Writing XLSX reports requires openpyxl (pip install openpyxl)")
+            self._workbook = Workbook(write_only=True)
+
+    def section_path(self, key):
+        """File a CSV or Parquet section is written to."""
+        stem, extension = os.path.splitext(self.path)
+        return f'{stem}-{key}{extension or "." + self.format}'
+
+    def write(self, key, title, frame):
+        if self.format == 'xlsx':
+            self._write_sheet(key, title, frame)
+        else:
+            writer = self._writers.get(key)
+            if writer is None:
+                writer = self._writers[key] = ResultWriter(
+                    self.section_path(key), self.format, schema=(self.schemas or {}).get(key))
+            # Empty blocks would still emit a CSV header
+            if len(frame) or writer.rows == 0:
+                writer.write(frame)
+        self.rows[key] = self.rows.get(key, 0) + len(frame)
+
+    def write_rows(self, key, title, rows):
+        """
+        Write a free-form XLSX sheet, such as the calculator layout.
+
+        Parameters:
+        - key: Section key rows are counted under
+        - title: Sheet title
+        - rows: Iterable of lists of cell values
+        """
+        if self.format != 'xlsx':
+            raise ValueError(f"Free-form sheets can only be written to XLSX, not {self.format}")
+        sheet = self._workbook.create_sheet(title)
+        sheet.column_dimensions['A'].width = max(len(label) for _, label in CALCULATOR_ROWS)
+        count = 0
+        for row in rows:
+            sheet.append(row)
+            count += 1
+        self.rows[key] = self.rows.get(key, 0) + count
+
+    def _new_sheet(self, title, part, header):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        sheet = self._workbook.create_sheet(title if part == 1 else f'{title} ({part})')
+        for i, label in enumerate(header):
+            sheet.column_dimensions[get_column_letter(i + 1)].width = max(12, len(label) + 2)
+        cells = []
+        for label in header:
+            cell = WriteOnlyCell(sheet, value=label)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        sheet.append(cells)
+        # [worksheet, part number, rows written]; the list is updated in place
+        return [sheet, part, 1]
+
+    def _write_sheet(self, key, title, frame):
+        state = self._sheets.get(key)
+        if state is None:
+            state = self._sheets[key] = self._new_sheet(title, 1, list(frame.columns))
+        for row in frame.itertuples(index=False, name=None):
+            if state[2] >= XLSX_MAX_ROWS:
+                state[:] = self._new_sheet(title, state[1] + 1, list(frame.columns))
+            state[0].append(row)
+            state[2] += 1
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+        for writer in self._writers.values():
+            writer.close()
+
+
+def export_report(catalog, sites, path, format=None, sites_per_block=None):
+    """
+    Stream the comparison report for every site to path.
+
+    Parameters:
+    - catalog: LampCatalog (or DataFrame of lamps)
+    - sites: DataFrame of sites as returned by portfolio.load_sites
+    - path: Output path (.xlsx, .csv or .parquet)
+    - format: Overrides the format taken from the extension
+    - sites_per_block: Sites evaluated and written at a time
+
+    Returns:
+    - Dictionary of rows written per section
+    """
+    writer = ReportWriter(path, format)
+    if writer.format == 'parquet':
+        writer.schemas = report_schemas(site_id=sites['site_id'].dtype)
+    try:
+        for key, title, frame in iter_report_blocks(catalog, sites, sites_per_block):
+            writer.write(key, title, frame)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def export_comparison(results, site_requirements, target, format='xlsx'):
+    """
+    Write the report for a single comparison, as shown in the app.
+
+    An XLSX report opens with the calculator sheet (site requirements and
+    metrics by lamp); CSV and Parquet get a sites section instead.
+
+    Parameters:
+    - results: Structured array from results.calculate_results
+    - site_requirements: Dictionary containing site requirements
+    - target: Output path, or a binary file object for XLSX
+    - format: 'xlsx', 'csv' or 'parquet'
+
+    Returns:
+    - Dictionary of rows written per section
+    """
+    block = pd.DataFrame({name: results[name] for name in results.dtype.names})
+    block['suitability'] = np.where(results['suitable'], "OKAY", "NOT SUITABLE")
+    block['site_id'] = 0
+    block['currency'] = site_requirements['currency']
+
+    writer = ReportWriter(target, format)
+    if writer.format == 'parquet':
+        writer.schemas = report_schemas(currency=site_requirements['currency'])
+    try:
+        if writer.format == 'xlsx':
+            writer.write_rows('calculator', 'Calculator', calculator_rows(block, site_requirements))
+        else:
+            site = {field: [site_requirements[field]] for field, _ in SITE_REQUIREMENTS}
+            writer.write('sites', 'Site Requirements', site_frame(site, site_requirements['currency']))
+        for key, title, frame in section_frames(block, len(block), site_requirements['currency']):
+            writer.write(key, title, frame)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the lamp comparison report for a portfolio of sites.")
+    parser.add_argument('sites', help="Sites file (CSV/XLSX) with number_of_lamps, hours_per_day, required_lumens, energy_cost, currency")
+    parser.add_argument('catalog', help="Lamp catalog (CSV/XLSX/ODS)")
+    parser.add_argument('-o', '--output', required=True, help="Report file (.xlsx, .csv or .parquet)")
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet'], default=None, help="Override the format taken from the extension")
+    parser.add_argument('--sites-per-block', type=int, default=None, help="Sites evaluated and written at a time (default: ~1M cells)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sites = load_sites(args.sites)
+    catalog = load_catalog(args.catalog)
+    rows = export_report(catalog, sites, args.output, format=args.format, sites_per_block=args.sites_per_block)
+
+    elapsed = time.perf_counter() - start
+    summary = ', '.join(f'{key} {count}' for key, count in rows.items())
+    print(f"Wrote {summary} rows to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
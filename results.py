@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from calculator import calculate_lamp_metrics_batch
+from instrumentation import instrumented
+
+
+# One record per lamp; numbers stay numeric until the table is rendered
+RESULT_DTYPE = np.dtype([
+    ('name', object),
+    ('make', object),
+    ('model', object),
+    ('wattage', np.float64),
+    ('efficacy', np.float64),
+    ('light_output_per_lamp', np.float64),
+    ('total_light_output', np.float64),
+    ('suitable', np.bool_),
+    ('cost_per_1000lm_hour', np.float64),
+    ('cost_per_req_lumens', np.float64),
+    ('energy_cost_per_day', np.float64),
+    ('energy_cost_per_year', np.float64),
+    ('energy_cost_5years', np.float64),
+    ('total_capital_cost', np.float64),
+    ('total_5year_cost', np.float64),
+])
+
+NUMERIC_FIELDS = tuple(name for name in RESULT_DTYPE.names if RESULT_DTYPE[name] == np.float64)
+
+
+@instrumented()
+def calculate_results(lamp_options, site_requirements, store=None):
+    """
+    Calculate metrics for every lamp option with valid data into a structured array.
+
+    Gives the same numbers as calling calculate_lamp_metrics on each lamp.
+
+    Parameters:
+    - lamp_options: List of lamp dictionaries
+    - site_requirements: Dictionary containing site requirements
+    - store: ScenarioStore to read the scenario from (and save it to), or None
+
+    Returns:
+    - Structured NumPy array with RESULT_DTYPE, one record per lamp
+    """
+    # Only calculate for lamps with valid data
+    lamps = [lamp for lamp in lamp_options if lamp['wattage'] and lamp['efficacy']]
+    results = np.empty(len(lamps), dtype=RESULT_DTYPE)
+    if not lamps:
+        return results
+
+    columns = {key: [lamp[key] for lamp in lamps] for key in ('wattage', 'efficacy', 'capital_cost')}
+    site = {key: [site_requirements[key]] for key in ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')}
+    if store is None:
+        metrics = calculate_lamp_metrics_batch(columns, site)
+    else:
+        site['currency'] = [site_requirements.get('currency', '')]
+        metrics = store.evaluate(lamps, pd.DataFrame(site))
+
+    for key in ('name', 'make', 'model'):
+        results[key] = [lamp[key] for lamp in lamps]
+    for key, values in metrics.items():
+        results[key] = values[:, 0]
+    return results
+
+
+def suitability_labels(results):
+    """Return the "OKAY" / "NOT SUITABLE" labels calculate_lamp_metrics uses."""
+    return np.where(results['suitable'], "OKAY", "NOT SUITABLE")
+
+
+@instrumented()
+def results_frame(results, columns):
+    """
+    Build a display DataFrame straight from the result records.
+
+    Parameters:
+    - results: Structured array from calculate_results
+    - columns: List of (field, label) pairs; the field 'suitability' gives the text labels
+
+    Returns:
+    - DataFrame with numeric columns left as numbers
+    """
+    data = {}
+    for field, label in columns:
+        data[label] = suitability_labels(results) if field == 'suitability' else results[field]
+    return pd.DataFrame(data)
+
+
+@instrumented()
+def format_table(frame, decimals=2):
+    """
+    Return a Styler that shows every numeric column to a fixed number of decimals.
+
+    Formatting only happens when the table is rendered; the underlying data stays numeric.
+    """
+    numeric = frame.select_dtypes(include=np.number).columns
+    return frame.style.format(precision=decimals, subset=list(numeric))
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from calculator import calculate_lamp_metrics_batch
+from catalog import brand_mask
+
+
+# Working memory for one block of the savings matrix
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+def _lamp_table(lamps):
+    if isinstance(lamps, list):
+        return pd.DataFrame(lamps)
+    return lamps
+
+
+def _block_rows(n_columns, memory_budget):
+    # About three (rows, n_columns) float arrays are alive per block
+    return max(1, int(memory_budget // (8 * 3 * max(n_columns, 1))))
+
+
+def iter_savings_blocks(their_cost, our_cost, their_output=None, our_output=None,
+                        memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Compute the pairwise savings matrix a block of rows at a time.
+
+    Savings[i, j] is their_cost[i] - our_cost[j]: what switching comparison
+    lamp i to our lamp j saves. Blocks are sized so each fits memory_budget.
+
+    Parameters:
+    - their_cost: (n_theirs,) cost of each lamp being replaced
+    - our_cost: (n_ours,) cost of each alternative
+    - their_output, our_output: Optional light output per lamp; an
+      alternative is only allowed where it gives at least the output of the
+      lamp it replaces
+    - memory_budget: Approximate bytes of working memory per block
+
+    Yields:
+    - (start, stop, savings) with savings of shape (stop - start, n_ours);
+      pairs that aren't allowed are -inf
+    """
+    their_cost = np.asarray(their_cost, dtype=np.float64)
+    our_cost = np.asarray(our_cost, dtype=np.float64)
+    match_output = their_output is not None and our_output is not None
+    if match_output:
+        their_output = np.asarray(their_output, dtype=np.float64)
+        our_output = np.asarray(our_output, dtype=np.float64)
+
+    step = _block_rows(len(our_cost), memory_budget)
+    for start in range(0, len(their_cost), step):
+        stop = min(start + step, len(their_cost))
+        savings = their_cost[start:stop, None] - our_cost[None, :]
+        if match_output:
+            savings[our_output[None, :] < their_output[start:stop, None]] = -np.inf
+        yield start, stop, savings
+
+
+def savings_matrix(their_cost, our_cost, years=5, their_output=None, our_output=None,
+                   memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Assemble the full pairwise savings matrix from iter_savings_blocks.
+
+    Returns:
+    - Dictionary with total_savings and annual_savings, both (n_theirs, n_ours)
+    """
+    total_savings = np.empty((len(their_cost), len(our_cost)))
+    for start, stop, block in iter_savings_blocks(their_cost, our_cost, their_output, our_output, memory_budget):
+        total_savings[start:stop] = block
+    return {'total_savings': total_savings, 'annual_savings': total_savings / years}
+
+
+def top_alternatives(their_cost, our_cost, k=5, their_output=None, our_output=None,
+                     memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Find the k alternatives with the largest savings for every lamp being replaced.
+
+    Each block of the savings matrix is reduced with np.argpartition, so only
+    the k best columns per row are ever sorted. Pairs with an unknown (NaN)
+    cost are never chosen.
+
+    Parameters:
+    - their_cost, our_cost, their_output, our_output, memory_budget: As for iter_savings_blocks
+    - k: Alternatives to keep per lamp
+
+    Returns:
+    - Dictionary with index (n_theirs, k) of our lamps, best first, and
+      savings (n_theirs, k); rows with fewer than k allowed alternatives are
+      padded with index -1 and savings NaN
+    """
+    n_theirs, n_ours = len(their_cost), len(our_cost)
+    k = min(k, n_ours)
+    index = np.full((n_theirs, k), -1, dtype=np.int64)
+    savings = np.full((n_theirs, k), np.nan)
+    if k == 0:
+        return {'index': index, 'savings': savings}
+
+    for start, stop, block in iter_savings_blocks(their_cost, our_cost, their_output, our_output, memory_budget):
+        # argpartition sorts NaN above every number; rank unknown costs with the disallowed pairs
+        block[np.isnan(block)] = -np.inf
+        if k < n_ours:
+            candidates = np.argpartition(block, n_ours - k, axis=1)[:, n_ours - k:]
+        else:
+            candidates = np.broadcast_to(np.arange(n_ours), block.shape)
+        values = np.take_along_axis(block, candidates, axis=1)
+
+        # Order just the k candidates, largest savings first
+        order = np.argsort(-values, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        values = np.take_along_axis(values, order, axis=1)
+
+        allowed = np.isfinite(values)
+        index[start:stop] = np.where(allowed, candidates, -1)
+        savings[start:stop] = np.where(allowed, values, np.nan)
+    return {'index': index, 'savings': savings}
+
+
+def horizon_costs(lamps, site_requirements, years=5):
+    """
+    Total cost of every lamp over a horizon, from calculate_lamp_metrics_batch.
+
+    With years == 5 this is total_5year_cost.
+
+    Returns:
+    - Dictionary of (n_lamps,) arrays: total_cost, light_output_per_lamp and suitable
+    """
+    site = {key: [site_requirements[key]] for key in ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')}
+    metrics = calculate_lamp_metrics_batch(lamps, site)
+    if years == 5:
+        total_cost = metrics['total_5year_cost'][:, 0]
+    else:
+        total_cost = metrics['total_capital_cost'][:, 0] + metrics['energy_cost_per_year'][:, 0] * years
+    return {
+        'total_cost': total_cost,
+        'light_output_per_lamp': metrics['light_output_per_lamp'][:, 0],
+        'suitable': metrics['suitable'][:, 0],
+    }
+
+
+def compare_groups(lamps, site_requirements, ours=None, theirs=None, k=5, years=5,
+                   suitable_only=True, match_output=False, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Rank the best of our lamps to replace each comparison lamp.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements
+    - ours: Boolean mask of the alternatives (defaults to the SustainabLED make)
+    - theirs: Boolean mask of the lamps being replaced (defaults to every other lamp)
+    - k: Alternatives to return per lamp
+    - years: Cost horizon in years
+    - suitable_only: Only offer alternatives that are suitable for the site
+    - match_output: Only offer alternatives with at least the replaced lamp's light output
+    - memory_budget: Approximate bytes of working memory per block
+
+    Returns:
+    - Dictionary with comparison_index (n_theirs,) and alternative_index
+      (n_theirs, k) into lamps (-1 where there is no alternative),
+      total_savings over the horizon and annual_savings (n_theirs, k)
+    """
+    lamps = _lamp_table(lamps)
+    if ours is None:
+        ours = brand_mask(lamps)
+    ours = np.asarray(ours, dtype=bool)
+    theirs = ~ours if theirs is None else np.asarray(theirs, dtype=bool)
+
+    costs = horizon_costs(lamps, site_requirements, years)
+    candidates = ours & costs['suitable'] if suitable_only else ours
+    our_index = np.flatnonzero(candidates)
+    their_index = np.flatnonzero(theirs)
+
+    output = costs['light_output_per_lamp']
+    top = top_alternatives(
+        costs['total_cost'][their_index], costs['total_cost'][our_index], k,
+        output[their_index] if match_output else None, output[our_index] if match_output else None,
+        memory_budget,
+    )
+    found = top['index'] >= 0
+    return {
+        'comparison_index': their_index,
+        'alternative_index': np.where(found, our_index[np.maximum(top['index'], 0)], -1),
+        'total_savings': top['savings'],
+        'annual_savings': top['savings'] / years,
+    }
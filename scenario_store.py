@@ -0,0 +1,330 @@
+"""
+Persistent scenario store.
+
+Every evaluated scenario (site requirements, lamp set, model version) is
+saved in a local SQLite database under a content hash of those inputs, so
+repeating a scenario (in the app, from the portfolio CLI, after a restart)
+reads the stored results instead of recomputing them.
+
+- Lamps and lamp sets are stored once and shared by every scenario that uses them.
+- Results are stored as one float64 block per scenario, in exactly the
+  values calculate_lamp_metrics_batch returned.
+- Scenarios are tagged with customer and site IDs, and can be looked up by
+  customer, site or lamp.
+
+Usage:
+    python scenario_store.py scenarios.sqlite --customer "Acme Ltd"
+    python scenario_store.py scenarios.sqlite --lamp "SustainabLED SHB 160"
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculator import LAMP_COLUMNS, MODEL_VERSION, SITE_COLUMNS, calculate_lamp_metrics_batch
+from catalog import CATALOG_COLUMNS
+from results_cache import content_hash
+
+
+# Metrics stored per scenario, one float64 row each ('suitable' as 0/1)
+STORED_METRICS = (
+    'wattage', 'efficacy', 'light_output_per_lamp', 'total_light_output', 'suitable',
+    'cost_per_1000lm_hour', 'cost_per_req_lumens', 'energy_cost_per_day', 'energy_cost_per_year',
+    'energy_cost_5years', 'total_capital_cost', 'total_5year_cost',
+)
+
+# Rows per statement when reading keys back in bulk (SQLite's variable limit is 999 on old builds)
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lamps (
+    lamp_key TEXT PRIMARY KEY,
+    name TEXT, make TEXT, model TEXT,
+    wattage REAL, efficacy REAL, capital_cost REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lamps_name ON lamps (name);
+
+CREATE TABLE IF NOT EXISTS lamp_sets (
+    set_key TEXT PRIMARY KEY,
+    n_lamps INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS lamp_set_members (
+    set_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    lamp_key TEXT NOT NULL,
+    PRIMARY KEY (set_key, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lamp_set_members_lamp ON lamp_set_members (lamp_key);
+
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_key TEXT PRIMARY KEY,
+    set_key TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    number_of_lamps REAL, hours_per_day REAL, required_lumens REAL, energy_cost REAL,
+    created REAL NOT NULL,
+    results BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scenarios_set ON scenarios (set_key);
+
+CREATE TABLE IF NOT EXISTS scenario_tags (
+    scenario_key TEXT NOT NULL,
+    customer TEXT NOT NULL DEFAULT '',
+    site_id TEXT NOT NULL DEFAULT '',
+    currency TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (scenario_key, customer, site_id, currency)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scenario_tags_customer ON scenario_tags (customer, site_id);
+CREATE INDEX IF NOT EXISTS scenario_tags_site ON scenario_tags (site_id);
+"""
+
+
+def _lamp_table(lamps):
+    if isinstance(lamps, list):
+        return pd.DataFrame(lamps)
+    return lamps
+
+
+def lamp_keys(lamps):
+    """Content hash of every lamp's name, make, model and specs."""
+    lamps = _lamp_table(lamps)
+    columns = [np.asarray(lamps[key], dtype=object) for key in CATALOG_COLUMNS]
+    return [content_hash(*(
+        float(value) if key in LAMP_COLUMNS else str(value)
+        for key, value in zip(CATALOG_COLUMNS, row)
+    )) for row in zip(*columns)]
+
+
+def scenario_key(set_key, site):
+    """
+    Content hash of one scenario: the lamp set, the site inputs and MODEL_VERSION.
+
+    Currency only changes how results are labelled, so it isn't part of the key.
+    """
+    return content_hash(MODEL_VERSION, set_key, [float(site[key]) for key in SITE_COLUMNS])
+
+
+def _pack(metrics, column):
+    return np.stack([np.asarray(metrics[key][:, column], dtype=np.float64) for key in STORED_METRICS]).tobytes()
+
+
+def _unpack(blob, n_lamps):
+    block = np.frombuffer(blob, dtype=np.float64).reshape(len(STORED_METRICS), n_lamps)
+    metrics = dict(zip(STORED_METRICS, block))
+    metrics['suitable'] = metrics['suitable'].astype(bool)
+    return metrics
+
+
+class ScenarioStore:
+    """
+    SQLite-backed store of evaluated scenarios.
+
+    One connection is shared by every thread of the process, guarded by a
+    lock; worker processes open their own store on the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def put_lamp_set(self, lamps):
+        """
+        Store a lamp set (and any new lamps in it).
+
+        Returns:
+        - The set's content hash, used as set_key everywhere else
+        """
+        lamps = _lamp_table(lamps)
+        keys = lamp_keys(lamps)
+        set_key = hashlib.blake2b('\x1f'.join(keys).encode('ascii'), digest_size=16).hexdigest()
+        with self._lock, self._connection:
+            if self._connection.execute("SELECT 1 FROM lamp_sets WHERE set_key = ?", (set_key,)).fetchone():
+                return set_key
+            columns = [np.asarray(lamps[key], dtype=object) for key in CATALOG_COLUMNS]
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO lamps VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((key, str(name), str(make), str(model), float(wattage), float(efficacy), float(capital_cost))
+                 for key, name, make, model, wattage, efficacy, capital_cost in zip(keys, *columns))
+            )
+            self._connection.executemany(
+                "INSERT INTO lamp_set_members VALUES (?, ?, ?)",
+                ((set_key, position, key) for position, key in enumerate(keys))
+            )
+            self._connection.execute("INSERT INTO lamp_sets VALUES (?, ?)", (set_key, len(keys)))
+        return set_key
+
+    def get_many(self, keys, n_lamps):
+        """
+        Read stored results in bulk.
+
+        Returns:
+        - Dictionary of scenario key -> metrics dictionary of (n_lamps,) arrays,
+          for the keys that are stored
+        """
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(keys), QUERY_BATCH):
+                batch = keys[start:start + QUERY_BATCH]
+                rows = self._connection.execute(
+                    f"SELECT scenario_key, results FROM scenarios WHERE scenario_key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, blob in rows:
+                    found[key] = _unpack(blob, n_lamps)
+        return found
+
+    def put_many(self, entries):
+        """
+        Store scenarios in bulk, in one transaction.
+
+        Parameters:
+        - entries: Iterable of (scenario_key, set_key, site, metrics, column,
+          customer, site_id), where column picks the site's column out of
+          (n_lamps, n_sites) metrics arrays
+        """
+        now = time.time()
+        scenarios, tags = [], []
+        for key, set_key, site, metrics, column, customer, site_id in entries:
+            scenarios.append((
+                key, set_key, MODEL_VERSION,
+                *(float(site[name]) for name in ('number_of_lamps', 'hours_per_day', 'required_lumens', 'energy_cost')),
+                now, _pack(metrics, column),
+            ))
+            tags.append((key, customer or '', '' if site_id is None else str(site_id), str(site.get('currency', ''))))
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR IGNORE INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", scenarios)
+            self._connection.executemany("INSERT OR IGNORE INTO scenario_tags VALUES (?, ?, ?, ?)", tags)
+
+    def tag_many(self, tags):
+        """Record (scenario_key, customer, site_id, currency) tags for scenarios already stored."""
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR IGNORE INTO scenario_tags VALUES (?, ?, ?, ?)", tags)
+
+    def evaluate(self, lamps, sites, set_key=None, customer=None):
+        """
+        Evaluate lamps against sites, reading stored scenarios and storing new ones.
+
+        Only sites whose scenario isn't stored yet are calculated, all in one
+        calculate_lamp_metrics_batch call.
+
+        Parameters:
+        - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+        - sites: DataFrame of sites (SITE_COLUMNS, optionally site_id and currency)
+        - set_key: Result of put_lamp_set for these lamps, to skip rehashing them
+        - customer: Customer the scenarios are tagged with
+
+        Returns:
+        - Dictionary of (n_lamps, n_sites) arrays keyed like calculate_lamp_metrics_batch
+        """
+        lamps = _lamp_table(lamps)
+        if set_key is None:
+            set_key = self.put_lamp_set(lamps)
+        n_lamps = len(lamps['wattage'])
+        records = sites.to_dict('records')
+        keys = [scenario_key(set_key, site) for site in records]
+        stored = self.get_many(keys, n_lamps)
+
+        missing = [i for i, key in enumerate(keys) if key not in stored]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        metrics = {key: np.empty((n_lamps, len(keys)), dtype=bool if key == 'suitable' else np.float64) for key in STORED_METRICS}
+        if missing:
+            computed = calculate_lamp_metrics_batch(lamps, sites.iloc[missing])
+            for key in STORED_METRICS:
+                metrics[key][:, missing] = computed[key]
+            self.put_many(
+                (keys[i], set_key, records[i], computed, column, customer, records[i].get('site_id'))
+                for column, i in enumerate(missing)
+            )
+        hit_tags = []
+        for column, key in enumerate(keys):
+            if key in stored:
+                for name, values in stored[key].items():
+                    metrics[name][:, column] = values
+                hit_tags.append((key, customer or '', str(records[column].get('site_id', '')), str(records[column].get('currency', ''))))
+        if hit_tags:
+            self.tag_many(hit_tags)
+        return metrics
+
+    def find(self, customer=None, site_id=None, lamp=None, limit=1000):
+        """
+        Look up stored scenarios by customer, site ID and/or lamp name.
+
+        Returns:
+        - DataFrame with one row per matching scenario tag
+        """
+        clauses, parameters = [], []
+        if customer is not None:
+            clauses.append("t.customer = ?")
+            parameters.append(customer)
+        if site_id is not None:
+            clauses.append("t.site_id = ?")
+            parameters.append(str(site_id))
+        if lamp is not None:
+            clauses.append(
+                "s.set_key IN (SELECT m.set_key FROM lamp_set_members m JOIN lamps l ON l.lamp_key = m.lamp_key WHERE l.name = ?)"
+            )
+            parameters.append(lamp)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"""
+            SELECT s.scenario_key, t.customer, t.site_id, t.currency, s.model_version,
+                   s.number_of_lamps, s.hours_per_day, s.required_lumens, s.energy_cost, s.created, s.set_key
+            FROM scenarios s JOIN scenario_tags t ON t.scenario_key = s.scenario_key
+            {where}
+            ORDER BY s.created DESC
+            LIMIT ?
+        """
+        with self._lock:
+            return pd.read_sql_query(query, self._connection, params=parameters + [limit])
+
+    def lamp_set(self, set_key):
+        """Return a stored lamp set as a DataFrame, in its original order."""
+        with self._lock:
+            return pd.read_sql_query(
+                """
+                SELECT l.name, l.make, l.model, l.wattage, l.efficacy, l.capital_cost
+                FROM lamp_set_members m JOIN lamps l ON l.lamp_key = m.lamp_key
+                WHERE m.set_key = ? ORDER BY m.position
+                """,
+                self._connection, params=[set_key]
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up stored lighting scenarios.")
+    parser.add_argument('store', help="Scenario store (.sqlite)")
+    parser.add_argument('--customer')
+    parser.add_argument('--site-id')
+    parser.add_argument('--lamp', help="Lamp name")
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    store = ScenarioStore(args.store)
+    try:
+        found = store.find(customer=args.customer, site_id=args.site_id, lamp=args.lamp, limit=args.limit)
+    finally:
+        store.close()
+    print(found.to_string(index=False) if len(found) else "No matching scenarios")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""
+Local JSON calculation service.
+
+A small asyncio HTTP/1.1 server (standard library only, no Streamlit) that
+exposes the calculator model:
+
+    POST /calculate   {"lamp": {...}, "site_requirements": {...}}
+                      -> the calculate_lamp_metrics dictionary
+    POST /batch       {"lamps": [...], "sites": [...]}
+                      -> every metric as an n_lamps x n_sites grid
+                         (at most MAX_GRID_CELLS cells, evaluated off the event loop)
+    GET  /metrics     latency percentiles, queue depth and batch sizes
+    GET  /health
+
+Inputs must be finite and not negative, with wattage and efficacy above
+zero (400 otherwise). Responses are strict JSON: any metric that still
+comes out as NaN or infinite is sent as null.
+
+Concurrent /calculate requests are queued and evaluated together in one
+vectorized calculate_lamp_metrics_pairs call. When the queue is full (or
+max_grids /batch grids are already running), new requests get 503 responses
+with a Retry-After header instead of piling up.
+
+Usage:
+    python service.py --port 8080 --max-batch 1024 --max-wait-ms 2
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from calculator import LAMP_COLUMNS, SITE_COLUMNS, calculate_lamp_metrics_batch, calculate_lamp_metrics_pairs
+
+
+# Field order of a calculate_lamp_metrics result
+RESULT_FIELDS = (
+    'name', 'make', 'model', 'wattage', 'efficacy', 'light_output_per_lamp', 'total_light_output',
+    'suitability', 'cost_per_1000lm_hour', 'cost_per_req_lumens', 'energy_cost_per_day',
+    'energy_cost_per_year', 'energy_cost_5years', 'total_capital_cost', 'total_5year_cost',
+)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Largest lamps x sites grid a single /batch request may ask for
+MAX_GRID_CELLS = 250_000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """A client error, reported back as an HTTP status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """Rolling window of request latencies per endpoint."""
+
+    def __init__(self, window=10_000):
+        self.window = window
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.counts = collections.Counter()
+
+    def record(self, endpoint, seconds):
+        self.samples[endpoint].append(seconds)
+        self.counts[endpoint] += 1
+
+    def summary(self):
+        summary = {}
+        for endpoint, samples in self.samples.items():
+            values = np.fromiter(samples, dtype=np.float64) * 1000
+            summary[endpoint] = {
+                'requests': self.counts[endpoint],
+                'p50_ms': float(np.percentile(values, 50)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max()),
+            }
+        return summary
+
+
+# Inputs that divide the model and so must be strictly positive; every other input must not be negative
+POSITIVE_FIELDS = ('wattage', 'efficacy')
+
+
+def _require(mapping, keys, what):
+    if not isinstance(mapping, dict):
+        raise RequestError(400, f"{what} must be an object")
+    missing = [key for key in keys if key not in mapping]
+    if missing:
+        raise RequestError(400, f"{what} is missing: {', '.join(missing)}")
+    for key in keys:
+        value = mapping[key]
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise RequestError(400, f"{what}.{key} must be a number")
+        # JSON allows NaN, Infinity and integers too large for a float64
+        try:
+            finite = math.isfinite(value)
+        except OverflowError:
+            finite = False
+        if not finite:
+            raise RequestError(400, f"{what}.{key} must be a finite number")
+        if key in POSITIVE_FIELDS and value <= 0:
+            raise RequestError(400, f"{what}.{key} must be greater than zero")
+        if value < 0:
+            raise RequestError(400, f"{what}.{key} must not be negative")
+
+
+def _json_values(values):
+    # JSON has no NaN or Infinity; report them as null
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        return values.tolist()
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+    return np.where(finite, values, None).tolist()
+
+
+def encode_json(response):
+    """Serialize a response as strict JSON (NaN and Infinity are rejected, not written)."""
+    return json.dumps(response, allow_nan=False).encode('utf-8')
+
+
+class MicroBatcher:
+    """
+    Collect single calculations into batches and evaluate each batch in one vectorized call.
+
+    A batch is evaluated as soon as max_batch requests are waiting, or
+    max_wait seconds after the first one arrived.
+    """
+
+    def __init__(self, max_batch=1024, max_wait=0.002, max_pending=10_000):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.batches = 0
+        self.batched_requests = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def submit(self, lamp, site_requirements):
+        """Queue a calculation, returning a future, or raise RequestError(503) when full."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((lamp, site_requirements, future))
+        except asyncio.QueueFull:
+            raise RequestError(503, "Calculation queue is full, retry shortly")
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain anything else that is already waiting
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            self.batches += 1
+            self.batched_requests += len(batch)
+            try:
+                results = evaluate_pairs([item[0] for item in batch], [item[1] for item in batch])
+            except Exception:
+                # Retry one by one, so a request that slipped past validation only fails itself
+                results = []
+                for lamp, site_requirements, _ in batch:
+                    try:
+                        results.append(evaluate_pairs([lamp], [site_requirements])[0])
+                    except Exception as error:
+                        results.append(error)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def evaluate_pairs(lamps, sites):
+    """
+    Evaluate lamp i against site i for lists of lamp and site dictionaries.
+
+    Returns:
+    - List of dictionaries matching calculate_lamp_metrics
+    """
+    lamp_columns = {key: [lamp[key] for lamp in lamps] for key in LAMP_COLUMNS}
+    site_columns = {key: [site[key] for site in sites] for key in SITE_COLUMNS}
+    metrics = calculate_lamp_metrics_pairs(lamp_columns, site_columns)
+
+    columns = {key: _json_values(values) for key, values in metrics.items()}
+    results = []
+    for i, lamp in enumerate(lamps):
+        result = {}
+        for field in RESULT_FIELDS:
+            if field in ('name', 'make', 'model'):
+                result[field] = lamp.get(field, '')
+            elif field == 'suitability':
+                result[field] = "OKAY" if columns['suitable'][i] else "NOT SUITABLE"
+            else:
+                result[field] = columns[field][i]
+        results.append(result)
+    return results
+
+
+def evaluate_grid(lamps, sites):
+    """Evaluate every lamp against every site, returning nested lists per metric."""
+    lamp_columns = {key: [lamp[key] for lamp in lamps] for key in LAMP_COLUMNS}
+    site_columns = {key: [site[key] for site in sites] for key in SITE_COLUMNS}
+    metrics = calculate_lamp_metrics_batch(lamp_columns, site_columns)
+    grid = {key: _json_values(values) for key, values in metrics.items() if key != 'suitable'}
+    grid['suitability'] = np.where(metrics['suitable'], "OKAY", "NOT SUITABLE").tolist()
+    return {
+        'lamps': [lamp.get('name', '') for lamp in lamps],
+        'sites': [site.get('site_id', i) for i, site in enumerate(sites)],
+        'metrics': grid,
+    }
+
+
+class CalculationService:
+    """HTTP front end over a MicroBatcher."""
+
+    def __init__(self, max_batch=1024, max_wait=0.002, max_pending=10_000, max_grids=2):
+        self.batcher = MicroBatcher(max_batch=max_batch, max_wait=max_wait, max_pending=max_pending)
+        self.latency = LatencyStats()
+        self.started = time.time()
+        self.max_grids = max_grids
+        self.grids_running = 0
+
+    async def handle_calculate(self, body):
+        _require(body.get('lamp'), LAMP_COLUMNS, 'lamp')
+        _require(body.get('site_requirements'), SITE_COLUMNS, 'site_requirements')
+        return await self.batcher.submit(body['lamp'], body['site_requirements'])
+
+    async def handle_batch(self, body):
+        lamps = body.get('lamps')
+        sites = body.get('sites')
+        if not isinstance(lamps, list) or not isinstance(sites, list) or not lamps or not sites:
+            raise RequestError(400, "lamps and sites must be non-empty lists")
+        for i, lamp in enumerate(lamps):
+            _require(lamp, LAMP_COLUMNS, f'lamps[{i}]')
+        for i, site in enumerate(sites):
+            _require(site, SITE_COLUMNS, f'sites[{i}]')
+        if len(lamps) * len(sites) > MAX_GRID_CELLS:
+            raise RequestError(413, f"lamps x sites must be at most {MAX_GRID_CELLS} cells")
+        if self.grids_running >= self.max_grids:
+            raise RequestError(503, "Too many batch grids running, retry shortly")
+
+        # Evaluate and encode on a worker thread so /calculate traffic keeps flowing
+        self.grids_running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: encode_json(evaluate_grid(lamps, sites)))
+        finally:
+            self.grids_running -= 1
+
+    def handle_metrics(self):
+        batches = self.batcher.batches
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'queue_depth': self.batcher.queue.qsize(),
+            'grids_running': self.grids_running,
+            'batches': batches,
+            'mean_batch_size': self.batcher.batched_requests / batches if batches else 0.0,
+            'latency': self.latency.summary(),
+        }
+
+    async def dispatch(self, method, path, body):
+        routes = {
+            '/calculate': ('POST', self.handle_calculate),
+            '/batch': ('POST', self.handle_batch),
+        }
+        if path == '/health':
+            return {'status': 'ok'}
+        if path == '/metrics':
+            return self.handle_metrics()
+        if path not in routes:
+            raise RequestError(404, f"Unknown endpoint: {path}")
+        expected, handler = routes[path]
+        if method != expected:
+            raise RequestError(405, f"{path} expects {expected}")
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, "Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return await handler(payload)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                path = target.split('?', 1)[0]
+                status, extra_headers = 200, {}
+                body = None
+                try:
+                    try:
+                        length = int(headers.get('content-length', 0))
+                    except ValueError:
+                        raise RequestError(400, "Content-Length must be an integer")
+                    if length < 0:
+                        raise RequestError(400, "Content-Length must not be negative")
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    response = await self.dispatch(method, path, body)
+                except RequestError as error:
+                    status, response = error.status, {'error': str(error)}
+                    if status == 503:
+                        extra_headers['Retry-After'] = '1'
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception:
+                    traceback.print_exc(file=sys.stderr)
+                    status, response = 500, {'error': "Internal server error"}
+                self.latency.record(path, time.perf_counter() - start)
+
+                # Without reading the body the next request can't be found on this connection
+                keep_alive = (
+                    body is not None and version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                )
+                payload = response if isinstance(response, bytes) else encode_json(response)
+                head = [
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ] + [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the lighting calculator as a JSON API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=1024, help="Largest micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Longest a request waits for its batch to fill")
+    parser.add_argument('--max-pending', type=int, default=10_000, help="Queued requests before returning 503")
+    parser.add_argument('--max-grids', type=int, default=2, help="Concurrent /batch grids before returning 503")
+    args = parser.parse_args(argv)
+
+    service = CalculationService(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000,
+                                 max_pending=args.max_pending, max_grids=args.max_grids)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
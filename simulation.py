@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+
+from catalog import brand_mask
+
+
+# Uncertain inputs a simulation can draw, with the bounds each sample is clipped to
+SIMULATED_INPUTS = {
+    'energy_cost': (0.0, np.inf),
+    'hours_per_day': (0.0, 24.0),
+    'number_of_lamps': (1.0, np.inf),
+    'capital_cost_factor': (0.0, np.inf),
+}
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Working memory for one chunk of samples
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Resolution of the streaming percentile histograms
+HISTOGRAM_BINS = 4096
+
+
+def sample_distribution(rng, spec, size):
+    """
+    Draw samples from a distribution spec.
+
+    Parameters:
+    - rng: numpy.random.Generator
+    - spec: A plain number (constant) or a dictionary such as
+      {'dist': 'normal', 'mean': 0.3, 'std': 0.05},
+      {'dist': 'uniform', 'low': 10, 'high': 16},
+      {'dist': 'triangular', 'left': 0.2, 'mode': 0.3, 'right': 0.5} or
+      {'dist': 'lognormal', 'mean': 0.0, 'sigma': 0.1}
+    - size: Output shape
+
+    Returns:
+    - NumPy array of samples
+    """
+    if not isinstance(spec, dict):
+        return np.full(size, float(spec))
+
+    dist = spec.get('dist', 'constant')
+    if dist == 'constant':
+        return np.full(size, float(spec['value']))
+    if dist == 'normal':
+        return rng.normal(spec['mean'], spec['std'], size)
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size)
+    if dist == 'triangular':
+        return rng.triangular(spec['left'], spec['mode'], spec['right'], size)
+    if dist == 'lognormal':
+        return rng.lognormal(spec['mean'], spec['sigma'], size)
+    raise ValueError(f"Unknown distribution: {dist}")
+
+
+class StreamingHistogram:
+    """
+    Fixed-memory histogram for estimating percentiles over many chunks.
+
+    Each row (a lamp, or a pair of lamps) gets its own bins over [low, high].
+    Samples outside the range are counted in the edge bins and the true
+    minimum and maximum are tracked separately. NaN and infinite samples
+    (e.g. from a lamp with no capital cost) are left out and counted in
+    invalid; a row with no valid samples has NaN percentiles.
+    """
+
+    def __init__(self, low, high, bins=HISTOGRAM_BINS):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.maximum(np.asarray(high, dtype=np.float64), self.low + 1e-9)
+        self.bins = bins
+        self.counts = np.zeros((self.low.size, bins), dtype=np.int64)
+        self.minimum = np.full(self.low.size, np.inf)
+        self.maximum = np.full(self.low.size, -np.inf)
+        self.invalid = np.zeros(self.low.size, dtype=np.int64)
+
+    def add(self, values):
+        """Add a (rows, samples) block of values."""
+        rows = values.shape[0]
+        finite = np.isfinite(values)
+        self.invalid += (~finite).sum(axis=1)
+
+        width = (self.high - self.low) / self.bins
+        # Clip before casting so out-of-range and non-finite values never overflow int64
+        position = np.clip((values - self.low[:, None]) / width[:, None], 0, self.bins - 1)
+        index = np.where(finite, position, 0).astype(np.int64)
+        index += (np.arange(rows) * self.bins)[:, None]
+        self.counts += np.bincount(index[finite], minlength=rows * self.bins).reshape(rows, self.bins)
+        self.minimum = np.minimum(self.minimum, np.where(finite, values, np.inf).min(axis=1))
+        self.maximum = np.maximum(self.maximum, np.where(finite, values, -np.inf).max(axis=1))
+
+    def percentiles(self, percentiles):
+        """Estimate percentiles per row by interpolating within bins."""
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1:]
+        edges_width = (self.high - self.low) / self.bins
+        result = np.empty((self.counts.shape[0], len(percentiles)))
+        for j, p in enumerate(percentiles):
+            target = total[:, 0] * p / 100.0
+            bin_index = np.minimum((cumulative < target[:, None]).sum(axis=1), self.bins - 1)
+            below = np.where(bin_index > 0, cumulative[np.arange(len(bin_index)), bin_index - 1], 0)
+            in_bin = np.maximum(self.counts[np.arange(len(bin_index)), bin_index], 1)
+            fraction = np.clip((target - below) / in_bin, 0.0, 1.0)
+            result[:, j] = self.low + (bin_index + fraction) * edges_width
+        # Never report beyond what was actually observed
+        result = np.clip(result, self.minimum[:, None], self.maximum[:, None])
+        result[total[:, 0] == 0] = np.nan
+        return result
+
+
+def _lamp_table(lamps):
+    if isinstance(lamps, list):
+        return pd.DataFrame(lamps)
+    return lamps
+
+
+def simulate_total_costs(lamps, site_requirements, samples, years=5):
+    """
+    Calculate total costs for every lamp under a block of sampled inputs.
+
+    Uses the same formulas as calculate_lamp_metrics (without rounding).
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements (required_lumens is used)
+    - samples: Dictionary of sampled inputs; energy_cost, hours_per_day and
+      number_of_lamps are (n_samples,) arrays, capital_cost_factor is
+      (n_lamps, n_samples)
+    - years: Cost horizon in years
+
+    Returns:
+    - (n_lamps, n_samples) array of total costs
+    """
+    lamps = _lamp_table(lamps)
+    wattage = np.asarray(lamps['wattage'], dtype=np.float64)[:, None]
+    efficacy = np.asarray(lamps['efficacy'], dtype=np.float64)[:, None]
+    capital_cost = np.asarray(lamps['capital_cost'], dtype=np.float64)[:, None]
+    required_lumens = float(site_requirements['required_lumens'])
+
+    energy_cost = samples['energy_cost'][None, :]
+    hours_per_day = samples['hours_per_day'][None, :]
+    number_of_lamps = samples['number_of_lamps'][None, :]
+
+    light_output_per_lamp = wattage * efficacy
+    cost_per_1000lm_hour = (energy_cost * wattage / 1000) / (light_output_per_lamp / 1000)
+    cost_per_req_lumens = cost_per_1000lm_hour * (required_lumens / 1000)
+    energy_cost_total = hours_per_day * number_of_lamps * cost_per_req_lumens * 365 * years
+    total_capital_cost = number_of_lamps * (capital_cost * samples['capital_cost_factor'])
+    return total_capital_cost + energy_cost_total
+
+
+def draw_samples(rng, distributions, site_requirements, n_lamps, size):
+    """
+    Draw one chunk of inputs. Inputs without a distribution stay at their site value.
+
+    Returns:
+    - Dictionary of sampled arrays, clipped to SIMULATED_INPUTS bounds
+    """
+    samples = {}
+    for name, (low, high) in SIMULATED_INPUTS.items():
+        default = 1.0 if name == 'capital_cost_factor' else site_requirements[name]
+        shape = (n_lamps, size) if name == 'capital_cost_factor' else size
+        samples[name] = np.clip(sample_distribution(rng, distributions.get(name, default), shape), low, high)
+    samples['number_of_lamps'] = np.round(samples['number_of_lamps'])
+    return samples
+
+
+def iter_monte_carlo(lamps, site_requirements, distributions, n_samples=1_000_000, years=5,
+                     sustainabled_mask=None, percentiles=DEFAULT_PERCENTILES, seed=None,
+                     memory_budget=DEFAULT_MEMORY_BUDGET, pilot_size=20_000):
+    """
+    Run a Monte Carlo simulation of total cost and savings, yielding results chunk by chunk.
+
+    Samples are drawn in chunks sized to fit memory_budget. Percentiles come
+    from fixed-size histograms whose range is set from a pilot run, so memory
+    does not grow with n_samples.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements (the baseline values)
+    - distributions: Dictionary mapping any of energy_cost, hours_per_day,
+      number_of_lamps and capital_cost_factor to a distribution spec
+    - n_samples: Total number of samples
+    - years: Cost horizon in years
+    - sustainabled_mask: Boolean array marking SustainabLED options (defaults to brand_mask)
+    - percentiles: Percentiles to report
+    - seed: Random seed
+    - memory_budget: Approximate bytes of working memory per chunk
+    - pilot_size: Samples used to size the histograms
+
+    Returns:
+    - Iterator of result dictionaries, one per chunk, each covering all samples so far:
+      samples, mean_total_cost, total_cost_percentiles, savings_percentiles,
+      probability_sustainabled_cheaper
+    """
+    lamps = _lamp_table(lamps)
+    n_lamps = len(lamps['wattage'])
+    if sustainabled_mask is None:
+        sustainabled_mask = brand_mask(lamps)
+    sustainabled_mask = np.asarray(sustainabled_mask, dtype=bool)
+    ours = np.flatnonzero(sustainabled_mask)
+    theirs = np.flatnonzero(~sustainabled_mask)
+
+    rng = np.random.default_rng(seed)
+
+    # About six (n_lamps, chunk) float arrays are alive at once
+    chunk_size = max(1, int(memory_budget // (8 * 6 * max(n_lamps + len(ours) * len(theirs), 1))))
+
+    def savings_of(totals):
+        # Positive savings mean the SustainabLED lamp is cheaper than the comparison lamp
+        return (totals[theirs][None, :, :] - totals[ours][:, None, :]).reshape(len(ours) * len(theirs), -1)
+
+    # Pilot run to fix the histogram ranges
+    pilot = simulate_total_costs(lamps, site_requirements, draw_samples(rng, distributions, site_requirements, n_lamps, pilot_size), years)
+    pilot_savings = savings_of(pilot)
+
+    def padded_range(values):
+        finite = np.isfinite(values)
+        low = np.where(finite, values, np.inf).min(axis=1)
+        high = np.where(finite, values, -np.inf).max(axis=1)
+        # Rows with no valid pilot samples get a dummy range; their samples are all dropped
+        low, high = np.where(np.isfinite(low), low, 0.0), np.where(np.isfinite(high), high, 1.0)
+        pad = (high - low) * 0.5 + 1e-9
+        return low - pad, high + pad
+
+    cost_histogram = StreamingHistogram(*padded_range(pilot))
+    savings_histogram = StreamingHistogram(*padded_range(pilot_savings)) if pilot_savings.size else None
+
+    done = 0
+    cost_sum = np.zeros(n_lamps)
+    cheaper_counts = np.zeros((len(ours), len(theirs)), dtype=np.int64)
+
+    while done < n_samples:
+        size = min(chunk_size, n_samples - done)
+        totals = simulate_total_costs(lamps, site_requirements, draw_samples(rng, distributions, site_requirements, n_lamps, size), years)
+
+        cost_histogram.add(totals)
+        cost_sum += totals.sum(axis=1)
+        if savings_histogram is not None:
+            savings = savings_of(totals)
+            savings_histogram.add(savings)
+            cheaper_counts += (savings > 0).sum(axis=1).reshape(len(ours), len(theirs))
+        done += size
+
+        yield {
+            'samples': done,
+            'mean_total_cost': cost_sum / done,
+            'total_cost_percentiles': cost_histogram.percentiles(percentiles),
+            'savings_percentiles': (
+                savings_histogram.percentiles(percentiles).reshape(len(ours), len(theirs), len(percentiles))
+                if savings_histogram is not None else np.empty((len(ours), len(theirs), len(percentiles)))
+            ),
+            'probability_sustainabled_cheaper': cheaper_counts / done,
+            'sustainabled_index': ours,
+            'comparison_index': theirs,
+            'percentiles': tuple(percentiles),
+        }
+
+
+def run_monte_carlo(lamps, site_requirements, distributions, **kwargs):
+    """
+    Run iter_monte_carlo to completion and return the final result dictionary.
+    """
+    result = None
+    for result in iter_monte_carlo(lamps, site_requirements, distributions, **kwargs):
+        pass
+    return result
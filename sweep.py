@@ -0,0 +1,285 @@
+"""
+Parameter sweeps over energy_cost, hours_per_day and number_of_lamps.
+
+Evaluates the full calculator model for every lamp option at every point
+of a 1D, 2D or 3D grid of site inputs, and reports which lamp wins each
+cell and where each lamp's cost crosses a reference lamp's.
+
+The grid is flattened and split into chunks of cells. Chunks are evaluated
+on a process pool (or in-process for small sweeps) and written straight
+into the result arrays. Finished sweeps are kept in an in-memory LRU cache
+keyed by their inputs.
+
+Usage:
+    python sweep.py catalog.csv --energy-cost 0.05 0.6 200 --hours-per-day 1 24 200 \\
+        --number-of-lamps 120 --required-lumens 30000 -o sweep.npz
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculator import LAMP_COLUMNS, calculate_lamp_metric_batch
+from catalog import load_catalog
+from results_cache import LRUCache, content_hash
+
+
+# Site inputs a sweep can vary, in grid axis order
+SWEEP_AXES = ('energy_cost', 'hours_per_day', 'number_of_lamps')
+
+# Lamp x cell evaluations per chunk
+CHUNK_CELLS = 2_000_000
+
+# Below this many lamp x cell evaluations a sweep runs in-process
+PARALLEL_THRESHOLD = 20_000_000
+
+SWEEP_CACHE = LRUCache(maxsize=32)
+
+# Lamp columns and grid axes held by each worker process, set once by _init_worker
+_worker_state = None
+
+
+def sweep_axes(site_requirements, **axes):
+    """
+    Build the grid axes, keeping the site's own value for any axis not swept.
+
+    Parameters:
+    - site_requirements: Dictionary containing site requirements
+    - axes: energy_cost, hours_per_day and/or number_of_lamps as 1D arrays
+
+    Returns:
+    - Dictionary of 1D float arrays, one per SWEEP_AXES entry
+    """
+    unknown = set(axes) - set(SWEEP_AXES)
+    if unknown:
+        raise ValueError(f"Cannot sweep {', '.join(sorted(unknown))}; choose from {', '.join(SWEEP_AXES)}")
+    result = {}
+    for name in SWEEP_AXES:
+        values = axes.get(name)
+        if values is None:
+            values = [site_requirements[name]]
+        result[name] = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    return result
+
+
+def _lamp_columns(lamps):
+    if isinstance(lamps, list):
+        lamps = pd.DataFrame(lamps)
+    return {key: np.asarray(lamps[key], dtype=np.float64) for key in LAMP_COLUMNS}
+
+
+def _evaluate_cells(lamps, axes, required_lumens, metric, start, stop):
+    # Site inputs for grid cells start..stop of the flattened grid
+    shape = tuple(len(axes[name]) for name in SWEEP_AXES)
+    index = np.unravel_index(np.arange(start, stop), shape)
+    sites = {name: axes[name][i] for name, i in zip(SWEEP_AXES, index)}
+    sites['required_lumens'] = np.full(stop - start, required_lumens, dtype=np.float64)
+    return calculate_lamp_metric_batch(lamps, sites, metric)
+
+
+def _reduce(block, keep_values):
+    # Either the full block or just its per-cell winner and lowest value.
+    # A lamp whose metric is NaN never wins; cells where every lamp is NaN
+    # get winner -1 and best NaN.
+    if keep_values:
+        return block
+    valid = ~np.isnan(block)
+    winner = np.argmin(np.where(valid, block, np.inf), axis=0)
+    found = valid.any(axis=0)
+    best = np.where(found, block[winner, np.arange(block.shape[1])], np.nan)
+    return np.where(found, winner, -1), best
+
+
+def _init_worker(lamps, axes, required_lumens, metric, keep_values):
+    global _worker_state
+    _worker_state = (lamps, axes, required_lumens, metric, keep_values)
+
+
+def _evaluate_chunk(bounds):
+    start, stop = bounds
+    lamps, axes, required_lumens, metric, keep_values = _worker_state
+    return start, stop, _reduce(_evaluate_cells(lamps, axes, required_lumens, metric, start, stop), keep_values)
+
+
+def _chunks(cells, n_lamps, chunk_cells):
+    step = max(1, chunk_cells // max(n_lamps, 1))
+    for start in range(0, cells, step):
+        yield start, min(start + step, cells)
+
+
+def run_sweep(lamps, site_requirements, metric='total_5year_cost', workers=None,
+              chunk_cells=CHUNK_CELLS, keep_values=True, use_cache=True, **axes):
+    """
+    Evaluate every lamp at every point of a grid of site inputs.
+
+    Parameters:
+    - lamps: List of lamp dictionaries, DataFrame or LampCatalog
+    - site_requirements: Dictionary containing site requirements; supplies
+      required_lumens and any axis that isn't swept
+    - metric: calculate_lamp_metrics field to compare lamps on
+    - workers: Worker processes; None runs small sweeps in-process and large
+      ones on every core
+    - chunk_cells: Lamp x cell evaluations per chunk
+    - keep_values: Keep every lamp's value in every cell (needed for
+      crossover); without it only winner and best are kept, so memory is
+      per cell rather than per lamp x cell
+    - use_cache: Reuse an identical earlier sweep from SWEEP_CACHE
+    - axes: energy_cost, hours_per_day and/or number_of_lamps as 1D arrays
+
+    Returns:
+    - Dictionary with axes (see sweep_axes), values (n_lamps, n_energy_cost,
+      n_hours_per_day, n_number_of_lamps) of the metric or None, winner
+      (index of the lamp with the lowest value in each cell, ignoring NaN;
+      -1 where no lamp has a value) and best (that lowest value, or NaN)
+    """
+    lamp_columns = _lamp_columns(lamps)
+    grid_axes = sweep_axes(site_requirements, **axes)
+    required_lumens = float(site_requirements['required_lumens'])
+
+    key = content_hash(
+        {name: values.tolist() for name, values in lamp_columns.items()},
+        {name: values.tolist() for name, values in grid_axes.items()},
+        required_lumens, metric, keep_values,
+    )
+    if use_cache:
+        cached = SWEEP_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    n_lamps = len(lamp_columns['wattage'])
+    shape = tuple(len(grid_axes[name]) for name in SWEEP_AXES)
+    cells = int(np.prod(shape))
+    values = np.empty((n_lamps, cells)) if keep_values else None
+    winner = np.empty(cells, dtype=np.int64)
+    best = np.empty(cells)
+    chunks = _chunks(cells, n_lamps, chunk_cells)
+
+    def store(start, stop, reduced):
+        if keep_values:
+            values[:, start:stop] = reduced
+            reduced = _reduce(reduced, False)
+        winner[start:stop], best[start:stop] = reduced
+
+    if workers is None:
+        workers = 1 if n_lamps * cells < PARALLEL_THRESHOLD else (os.cpu_count() or 1)
+    if workers == 1:
+        for start, stop in chunks:
+            block = _evaluate_cells(lamp_columns, grid_axes, required_lumens, metric, start, stop)
+            store(start, stop, _reduce(block, keep_values))
+    else:
+        initargs = (lamp_columns, grid_axes, required_lumens, metric, keep_values)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(_evaluate_chunk, chunk))
+                # Backpressure: collect the oldest chunk before queueing more
+                if len(pending) >= workers * 2:
+                    store(*pending.pop(0).result())
+            for future in pending:
+                store(*future.result())
+
+    result = {
+        'axes': grid_axes,
+        'values': values.reshape((n_lamps,) + shape) if keep_values else None,
+        'winner': winner.reshape(shape),
+        'best': best.reshape(shape),
+    }
+    if use_cache:
+        SWEEP_CACHE.put(key, result)
+    return result
+
+
+def crossover(sweep, reference, other, axis='energy_cost'):
+    """
+    Find where one lamp's cost crosses a reference lamp's along a sweep axis.
+
+    The difference other - reference is interpolated linearly between the
+    grid points on either side of its first sign change.
+
+    Parameters:
+    - sweep: Result of run_sweep with keep_values
+    - reference: Index of the reference lamp
+    - other: Index of the lamp compared against it
+    - axis: Sweep axis to solve along
+
+    Returns:
+    - Array over the remaining axes (in SWEEP_AXES order) of the axis value
+      where the two lamps cost the same, NaN where they don't cross on the grid
+    """
+    position = SWEEP_AXES.index(axis)
+    points = sweep['axes'][axis]
+    difference = np.moveaxis(sweep['values'][other] - sweep['values'][reference], position, -1)
+    if len(points) < 2:
+        return np.full(difference.shape[:-1], np.nan)
+
+    # First grid interval where the sign of the difference changes
+    sign = np.sign(difference)
+    changes = (sign[..., :-1] * sign[..., 1:] <= 0) & (sign[..., :-1] != sign[..., 1:])
+    found = changes.any(axis=-1)
+    first = np.argmax(changes, axis=-1)
+
+    before = np.take_along_axis(difference, first[..., None], axis=-1)[..., 0]
+    after = np.take_along_axis(difference, first[..., None] + 1, axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(after != before, before / (before - after), 0.0)
+    value = points[first] + fraction * (points[first + 1] - points[first])
+    return np.where(found, value, np.nan)
+
+
+def crossover_surfaces(sweep, reference, axis='energy_cost'):
+    """
+    Crossover of every lamp against a reference lamp.
+
+    Returns:
+    - (n_lamps, ...) array from crossover; the reference lamp's own row is NaN
+    """
+    n_lamps = sweep['values'].shape[0]
+    surfaces = np.stack([crossover(sweep, reference, other, axis) for other in range(n_lamps)])
+    surfaces[reference] = np.nan
+    return surfaces
+
+
+def _axis_argument(text):
+    # "low high count" range or a single fixed value
+    parts = [float(part) for part in text]
+    if len(parts) == 1:
+        return np.array(parts)
+    if len(parts) == 3:
+        return np.linspace(parts[0], parts[1], int(parts[2]))
+    raise argparse.ArgumentTypeError("Give one value or LOW HIGH COUNT")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep site inputs and find the cheapest lamp in every cell.")
+    parser.add_argument('catalog', help="Lamp catalog (CSV/XLSX/ODS)")
+    for name in SWEEP_AXES:
+        parser.add_argument(f"--{name.replace('_', '-')}", nargs='+', required=True, metavar='VALUE',
+                            help="One value, or LOW HIGH COUNT for a swept axis")
+    parser.add_argument('--required-lumens', type=float, required=True)
+    parser.add_argument('--metric', default='total_5year_cost')
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: automatic)")
+    parser.add_argument('-o', '--output', required=True, help="Output .npz with axes, winner, best and lamp names")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    catalog = load_catalog(args.catalog)
+    axes = {name: _axis_argument(getattr(args, name)) for name in SWEEP_AXES}
+    site = {'required_lumens': args.required_lumens}
+    sweep = run_sweep(catalog, site, metric=args.metric, workers=args.workers, keep_values=False, use_cache=False, **axes)
+
+    with open(args.output, 'wb') as handle:
+        np.savez_compressed(
+            handle, winner=sweep['winner'], best=sweep['best'], names=np.asarray(catalog['name'], dtype=str),
+            **{name: values for name, values in sweep['axes'].items()}
+        )
+    cells = sweep['winner'].size
+    print(f"Evaluated {len(catalog)} lamps x {cells} cells in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+pytest.importorskip('streamlit')
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(__file__), os.pardir, 'app.py')
+SITE_INPUTS = (120, 12, 20000, 0.25)
+LAMP_INPUTS = (150, 110, 40)
+
+
+def run_app(monkeypatch, **environment):
+    for key, value in environment.items():
+        monkeypatch.setenv(key, value)
+    app = AppTest.from_file(APP, default_timeout=60).run()
+    for widget, value in zip(app.number_input, SITE_INPUTS + LAMP_INPUTS):
+        widget.set_value(value)
+    app.run()
+    next(button for button in app.button if 'Calculate' in button.label).click().run()
+    return app
+
+
+def test_calculate_renders_tables(monkeypatch):
+    app = run_app(monkeypatch)
+    assert not app.exception
+    assert len(app.dataframe) == 6
+    detailed = app.dataframe[-1].value
+    assert detailed['Suitability'].tolist()[:3] == ['OKAY', 'OKAY', 'NOT SUITABLE']
+
+
+def test_rerun_with_same_inputs_keeps_results(monkeypatch):
+    app = run_app(monkeypatch)
+    app.run()
+    assert not app.exception
+    assert len(app.dataframe) == 6
+
+
+def test_report_is_built_once_per_comparison(monkeypatch):
+    import streamlit as st
+
+    import report
+
+    calls = []
+    export_comparison = report.export_comparison
+
+    def counting_export(*args, **kwargs):
+        calls.append(args)
+        return export_comparison(*args, **kwargs)
+
+    monkeypatch.setattr(report, 'export_comparison', counting_export)
+    st.cache_resource.clear()
+    app = run_app(monkeypatch)
+    app.run()
+    assert not app.exception
+    assert len(calls) == 1
+
+
+def test_sweep_runs_only_when_requested(monkeypatch):
+    import sweep
+
+    calls = []
+    run_sweep = sweep.run_sweep
+
+    def counting_sweep(*args, **kwargs):
+        calls.append(args)
+        return run_sweep(*args, **kwargs)
+
+    monkeypatch.setattr(sweep, 'run_sweep', counting_sweep)
+    app = run_app(monkeypatch)
+    assert not app.exception
+    assert calls == []
+
+    app.checkbox(key='sweep_show').check().run()
+    assert not app.exception
+    assert len(calls) == 1
+
+
+def test_rerun_timer_finishes_when_the_script_raises(monkeypatch):
+    import streamlit as st
+
+    import comparison
+    import instrumentation
+
+    finished = []
+
+    class RecordingTimer:
+        def mark(self, stage):
+            pass
+
+        def finish(self):
+            finished.append(True)
+
+    def failing_comparison(*args, **kwargs):
+        raise RuntimeError("calculation failed")
+
+    monkeypatch.setattr(instrumentation, 'begin_rerun', RecordingTimer)
+    monkeypatch.setattr(comparison, 'build_comparison', failing_comparison)
+    st.cache_resource.clear()
+    app = run_app(monkeypatch)
+    assert app.exception
+    # One rerun for the first render, one for the inputs and one for Calculate
+    assert len(finished) == 3
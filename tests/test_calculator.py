@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import (
+    IncrementalMetrics, calculate_lamp_metric_batch, calculate_lamp_metrics, calculate_lamp_metrics_batch,
+    calculate_lamp_metrics_pairs, round_like_python,
+)
+
+
+def random_inputs(seed, n_lamps=40, n_sites=60):
+    rng = np.random.default_rng(seed)
+    lamps = pd.DataFrame({
+        'wattage': rng.uniform(5, 400, n_lamps).round(1),
+        'efficacy': rng.uniform(60, 220, n_lamps).round(1),
+        'capital_cost': rng.uniform(5, 900, n_lamps).round(2),
+    })
+    sites = pd.DataFrame({
+        'number_of_lamps': rng.integers(1, 5000, n_sites).astype(float),
+        'hours_per_day': rng.uniform(0.5, 24, n_sites).round(2),
+        'required_lumens': rng.uniform(1000, 60000, n_sites).round(0),
+        'energy_cost': rng.uniform(0.01, 0.9, n_sites).round(3),
+    })
+    return lamps, sites
+
+
+def scalar_metrics(lamp, site):
+    return calculate_lamp_metrics(
+        {'name': 'Lamp', 'make': 'Make', 'model': 'Model', **{key: float(value) for key, value in lamp.items()}},
+        {**{key: float(value) for key, value in site.items()}, 'currency': '$'},
+    )
+
+
+def assert_matches_scalar(metrics, column, lamp, site):
+    expected = scalar_metrics(lamp, site)
+    for key, value in expected.items():
+        if key in ('name', 'make', 'model'):
+            continue
+        if key == 'suitability':
+            assert metrics['suitable'][column] == (value == "OKAY")
+        else:
+            assert metrics[key][column] == value, key
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batch_matches_scalar_bit_for_bit(seed):
+    lamps, sites = random_inputs(seed)
+    metrics = calculate_lamp_metrics_batch(lamps, sites)
+    for i, lamp in enumerate(lamps.to_dict('records')):
+        for j, site in enumerate(sites.to_dict('records')):
+            assert_matches_scalar(metrics, (i, j), lamp, site)
+
+
+def test_pairs_match_scalar():
+    lamps, sites = random_inputs(7, n_lamps=500, n_sites=500)
+    metrics = calculate_lamp_metrics_pairs(lamps, sites)
+    for i, (lamp, site) in enumerate(zip(lamps.to_dict('records'), sites.to_dict('records'))):
+        assert_matches_scalar(metrics, i, lamp, site)
+
+
+def test_single_metric_matches_full_batch():
+    lamps, sites = random_inputs(11)
+    metrics = calculate_lamp_metrics_batch(lamps, sites)
+    for key in ('total_5year_cost', 'energy_cost_per_year', 'suitable', 'wattage'):
+        assert np.array_equal(calculate_lamp_metric_batch(lamps, sites, key), metrics[key])
+
+
+def test_incremental_matches_batch_after_edits():
+    lamps, sites = random_inputs(3, n_sites=4)
+    records = sites.to_dict('records')
+    incremental = IncrementalMetrics(lamps, records[0])
+    for site in records[1:]:
+        incremental.update(site)
+        expected = calculate_lamp_metrics_batch(lamps, pd.DataFrame([site]))
+        for key, values in incremental.metrics().items():
+            assert np.array_equal(values, expected[key][:, 0]), key
+
+
+def test_energy_cost_edit_only_recomputes_downstream():
+    lamps, sites = random_inputs(5, n_sites=1)
+    site = sites.to_dict('records')[0]
+    incremental = IncrementalMetrics(lamps, site)
+    recomputed = incremental.update({'energy_cost': site['energy_cost'] * 2})
+    assert 'light_output_per_lamp' not in recomputed
+    assert 'suitable' not in recomputed
+    assert 'total_5year_cost' in recomputed
+
+
+def test_round_like_python_on_halves():
+    values = np.array([0.125, 0.375, 2.675, 1.005, 1234567.125, -0.125, 1e17])
+    assert round_like_python(values).tolist() == [round(v, 2) for v in values.tolist()]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import calculate_lamp_metrics_batch, round_like_python
+from cashflow import break_even, project_against_comparisons, project_cash_flows
+
+# Energy per year is hours_per_day * 365 * number_of_lamps * energy_cost * required_lumens / (efficacy * 1000),
+# so with this site it is 3650 / efficacy
+SITE = {'number_of_lamps': 1, 'hours_per_day': 10, 'required_lumens': 1000, 'energy_cost': 1.0}
+
+
+def test_five_year_cumulative_cost_matches_total_5year_cost():
+    rng = np.random.default_rng(8)
+    lamps = pd.DataFrame({
+        'wattage': rng.uniform(5, 400, 50).round(1),
+        'efficacy': rng.uniform(60, 220, 50).round(1),
+        'capital_cost': rng.uniform(5, 900, 50).round(2),
+    })
+    for _ in range(20):
+        site = {
+            'number_of_lamps': float(rng.integers(1, 5000)), 'hours_per_day': round(rng.uniform(0.5, 24), 2),
+            'required_lumens': float(round(rng.uniform(1000, 60000))), 'energy_cost': round(rng.uniform(0.01, 0.9), 3),
+        }
+        metrics = calculate_lamp_metrics_batch(lamps, {key: [value] for key, value in site.items()})
+        projection = project_cash_flows(lamps, site, years=5)
+        # The calculator reports costs rounded to cents
+        np.testing.assert_array_equal(round_like_python(projection['cash_flows'][:, 0], 2), metrics['total_capital_cost'][:, 0])
+        np.testing.assert_array_equal(round_like_python(projection['cumulative_cost'][:, 5], 2),
+                                      metrics['total_5year_cost'][:, 0])
+        np.testing.assert_allclose(projection['npv'], projection['cumulative_cost'][:, -1], rtol=1e-12)
+
+
+def test_break_even_for_two_lamps():
+    # Ours: 1000 up front, 100 a year. Theirs: 400 up front, 350 a year.
+    # Savings by year: -600, -350, -100, 150, 400, so we pay back 100/250 into year 3.
+    lamps = [
+        {'name': 'Ours', 'wattage': 100.0, 'efficacy': 36.5, 'capital_cost': 1000.0},
+        {'name': 'Theirs', 'wattage': 100.0, 'efficacy': 3650 / 350, 'capital_cost': 400.0},
+    ]
+    projection = project_against_comparisons(lamps, SITE, sustainabled_mask=[True, False], years=4)
+    savings = projection['break_even']['cumulative_savings'][0, 0]
+    np.testing.assert_allclose(savings, [-600, -350, -100, 150, 400])
+    assert projection['break_even']['break_even_year'][0, 0] == 3
+    assert projection['break_even']['break_even_fraction'][0, 0] == pytest.approx(2.4)
+
+
+def test_break_even_edge_cases():
+    cumulative = np.array([
+        [100.0, 200.0, 300.0],   # cheaper from the start
+        [500.0, 600.0, 700.0],   # never pays back
+        [300.0, 300.0, 300.0],   # comparison lamp
+    ])
+    result = break_even(cumulative, ours=[0, 1], theirs=[2])
+    assert result['break_even_year'][0, 0] == 0 and result['break_even_fraction'][0, 0] == 0
+    assert np.isnan(result['break_even_year'][1, 0]) and np.isnan(result['break_even_fraction'][1, 0])
+
+
+def test_replacement_capital_lands_at_the_end_of_each_cycle():
+    lamps = [
+        {'name': 'Four', 'wattage': 100.0, 'efficacy': 36.5, 'capital_cost': 200.0},
+        {'name': 'Five', 'wattage': 100.0, 'efficacy': 36.5, 'capital_cost': 200.0},
+        {'name': 'Ten', 'wattage': 100.0, 'efficacy': 36.5, 'capital_cost': 200.0},
+    ]
+    projection = project_cash_flows(lamps, SITE, years=10, replacement_years=[4, 5, 10], capital_escalation=0.1)
+    replacement = projection['cash_flows'][:, 1:] - 100.0
+    expected = np.zeros((3, 10))
+    # No replacement at the end of the horizon itself
+    for row, years in ((0, (4, 8)), (1, (5,)), (2, ())):
+        for year in years:
+            expected[row, year - 1] = 200.0 * 1.1 ** year
+    np.testing.assert_allclose(replacement, expected, atol=1e-9)
+
+
+def test_npv_matches_direct_discounting():
+    lamps = [
+        {'name': 'A', 'wattage': 150.0, 'efficacy': 110.0, 'capital_cost': 40.0},
+        {'name': 'B', 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0},
+    ]
+    site = {'number_of_lamps': 120, 'hours_per_day': 12, 'required_lumens': 20000, 'energy_cost': 0.25}
+    projection = project_cash_flows(lamps, site, years=12, escalation=0.03, discount_rate=0.07, replacement_years=5)
+
+    for i, lamp in enumerate(lamps):
+        capital = 120 * lamp['capital_cost']
+        # Unrounded yearly energy cost, in calculate_lamp_metrics' order of operations
+        cost_per_1000lm_hour = (0.25 * lamp['wattage'] / 1000) / (lamp['wattage'] * lamp['efficacy'] / 1000)
+        energy = 12 * 120 * (cost_per_1000lm_hour * (20000 / 1000)) * 365
+        flows = [capital] + [
+            energy * 1.03 ** (year - 1) + (capital if year in (5, 10) else 0.0) for year in range(1, 13)
+        ]
+        npv = sum(flow / 1.07 ** year for year, flow in enumerate(flows))
+        np.testing.assert_allclose(projection['cash_flows'][i], flows, rtol=1e-12)
+        assert projection['npv'][i] == pytest.approx(npv, rel=1e-12)
+        assert projection['cumulative_discounted_cost'][i, -1] == pytest.approx(npv, rel=1e-12)
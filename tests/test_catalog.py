@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import LampCatalog, _to_number, brand_mask, catalog_fingerprint, load_catalog
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('120', 120.0),
+    ('1.5', 1.5),
+    ('120 W', 120.0),
+    ('$1,299.00', 1299.0),
+    ('1,234', 1234.0),
+    ('1,234.50', 1234.5),
+    ('12,5', 12.5),
+    ('0,75', 0.75),
+    ('€ 12,50', 12.5),
+    ('1.234,50', 1234.5),
+    ('12.345.678,9', 12345678.9),
+    ('1e3', 1000.0),
+    ('EUR 12.50', 12.5),
+    ('12.50 EUR', 12.5),
+    ('Euro 5', 5.0),
+    ('5 each', 5.0),
+    ('12,5EUR', 12.5),
+    ('1 234,50', 1234.5),
+    ('12.5E3 lm', 12500.0),
+])
+def test_to_number_parses_locales(text, expected):
+    assert _to_number(pd.Series([text], dtype=object)).iloc[0] == expected
+
+
+@pytest.mark.parametrize('text', ['12,34,567', '1.23,5', '1,2,3', '', 'n/a', '2 x 50W', 'EUR'])
+def test_to_number_rejects_ambiguous_values(text):
+    assert np.isnan(_to_number(pd.Series([text], dtype=object)).iloc[0])
+
+
+def test_load_csv_maps_aliases_and_rejects_bad_rows(tmp_path):
+    path = tmp_path / 'prices.csv'
+    path.write_text(
+        "Brand,SKU,Watts,lm/W,Unit Price\n"
+        "Acme,A1,100,150,\"1.234,50\"\n"
+        "Acme,A2,\"12,5\",160,$20\n"
+        "Acme,A3,0,160,20\n"
+        "Acme,A4,100,,20\n"
+        "Acme,A5,100 W,150 lm/W,EUR 12.50\n"
+    )
+    catalog = load_catalog(str(path), chunk_size=2)
+    assert len(catalog) == 3
+    assert list(catalog['name']) == ['Acme A1', 'Acme A2', 'Acme A5']
+    assert catalog['capital_cost'].tolist() == [1234.5, 20.0, 12.5]
+    assert catalog['wattage'].tolist() == [100.0, 12.5, 100.0]
+    assert catalog.load_stats['rows_rejected'] == 2
+
+
+def test_load_xlsx_matches_csv(tmp_path):
+    frame = pd.DataFrame({
+        'Lamp Name': ['One', 'Two'], 'Make': ['SustainabLED', 'Other'], 'Model': ['M1', 'M2'],
+        'Wattage (W)': [160.0, 200.0], 'Efficacy (lm/W)': [198.0, 120.0], 'Capital Cost': ['102', '1,050.00'],
+    })
+    frame.to_csv(tmp_path / 'prices.csv', index=False)
+    frame.to_excel(tmp_path / 'prices.xlsx', index=False)
+    from_csv = load_catalog(str(tmp_path / 'prices.csv'))
+    from_xlsx = load_catalog(str(tmp_path / 'prices.xlsx'))
+    assert catalog_fingerprint(from_csv) == catalog_fingerprint(from_xlsx)
+    assert from_xlsx['capital_cost'].tolist() == [102.0, 1050.0]
+
+
+def test_brand_mask_uses_make_not_name():
+    catalog = LampCatalog.from_records([
+        {'name': 'SustainabLED lookalike', 'make': 'Other', 'model': 'X', 'wattage': 1.0, 'efficacy': 1.0, 'capital_cost': 1.0},
+        {'name': 'Ours', 'make': 'SustainabLED', 'model': 'Y', 'wattage': 1.0, 'efficacy': 1.0, 'capital_cost': 1.0},
+    ])
+    assert brand_mask(catalog).tolist() == [False, True]
@@ -0,0 +1,60 @@
+import numpy as np
+
+from catalog import LampCatalog
+from catalog_index import CatalogIndex, load_or_build_index
+
+
+def random_catalog(rng, n):
+    # Coarse values so ties in light output, efficacy and capital are common
+    return LampCatalog.from_records([
+        {'name': f'L{i}', 'make': 'M', 'model': str(i),
+         'wattage': float(rng.integers(1, 8) * 20), 'efficacy': float(rng.integers(5, 12) * 10),
+         'capital_cost': float(rng.integers(1, 10) * 10)}
+        for i in range(n)
+    ])
+
+
+def brute_force_frontier(catalog, required_lumens):
+    light = catalog['wattage'] * catalog['efficacy']
+    cost = 1 / catalog['efficacy']
+    capital = catalog['capital_cost']
+    suitable = np.flatnonzero(light >= required_lumens)
+    frontier = []
+    for i in suitable:
+        dominated = (
+            (cost[suitable] <= cost[i]) & (capital[suitable] <= capital[i])
+            & ((cost[suitable] < cost[i]) | (capital[suitable] < capital[i]))
+        )
+        if not dominated.any():
+            frontier.append(i)
+    return set(frontier), set(suitable.tolist())
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        catalog = random_catalog(rng, int(rng.integers(1, 60)))
+        index = CatalogIndex.build(catalog)
+        light = catalog['wattage'] * catalog['efficacy']
+        queries = np.concatenate([np.unique(light), np.unique(light) + 1, [0.0, light.max() + 1]])
+        for required_lumens in queries:
+            frontier, suitable = brute_force_frontier(catalog, required_lumens)
+            found = index.suitable_frontier(required_lumens)
+            assert set(found.tolist()) == frontier
+            # Cheapest cost per 1000 lm/hour first
+            assert np.all(np.diff(1 / catalog['efficacy'][found]) >= 0)
+            assert set(index.suitable(required_lumens).tolist()) == suitable
+
+
+def test_saved_index_is_reused_until_catalog_changes(tmp_path):
+    rng = np.random.default_rng(1)
+    catalog = random_catalog(rng, 40)
+    path = str(tmp_path / 'catalog.idx')
+    built = load_or_build_index(catalog, path)
+    loaded = load_or_build_index(catalog, path)
+    assert loaded.fingerprint == built.fingerprint
+    assert np.array_equal(loaded.suitable_frontier(5000), built.suitable_frontier(5000))
+
+    changed = random_catalog(rng, 40)
+    rebuilt = load_or_build_index(changed, path)
+    assert rebuilt.fingerprint != built.fingerprint
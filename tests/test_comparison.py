@@ -0,0 +1,35 @@
+import pandas as pd
+
+from catalog import SUSTAINABLED_PRODUCTS
+from comparison import COMPARISON_TABLES, build_comparison, style_comparison
+
+SITE = {'number_of_lamps': 120, 'hours_per_day': 12, 'required_lumens': 20000, 'energy_cost': 0.25, 'currency': '$'}
+LAMPS = [dict(product) for product in SUSTAINABLED_PRODUCTS] + [
+    {'name': 'Comparison Lamp 1', 'make': '', 'model': '', 'wattage': 150.0, 'efficacy': 110.0, 'capital_cost': 40.0},
+]
+
+
+def test_comparison_holds_only_data():
+    comparison = build_comparison(LAMPS, SITE)
+    for key in COMPARISON_TABLES:
+        assert isinstance(comparison[key], pd.DataFrame), key
+    assert comparison['best_sustainabled'] == "SustainabLED SHB 160"
+    savings = comparison['savings']
+    best = comparison['results'][1]['total_5year_cost']
+    assert savings['5-Year Savings ($)'].tolist() == [comparison['results'][2]['total_5year_cost'] - best]
+
+
+def test_stylers_are_fresh_and_leave_frames_untouched():
+    comparison = build_comparison(LAMPS, SITE)
+    before = {key: comparison[key].copy() for key in COMPARISON_TABLES}
+    first, second = style_comparison(comparison), style_comparison(comparison)
+    for key in COMPARISON_TABLES:
+        assert first[key] is not second[key]
+        first[key].to_html()
+        pd.testing.assert_frame_equal(comparison[key], before[key])
+
+
+def test_no_savings_without_comparison_lamps():
+    comparison = build_comparison(LAMPS[:2], SITE)
+    assert comparison['savings'] is None
+    assert style_comparison(comparison)['savings'] is None
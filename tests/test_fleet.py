@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculator import calculate_lamp_metrics_batch
+from fleet import lumen_maintenance, simulate_fleet
+
+LAMPS = [
+    {'name': 'A', 'wattage': 100.0, 'efficacy': 100.0, 'capital_cost': 50.0},
+    {'name': 'B', 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0},
+]
+SITE = {'number_of_lamps': 40, 'hours_per_day': 12, 'required_lumens': 8000, 'energy_cost': 0.25}
+
+# Output never depreciates and no unit ever fails
+PERFECT = {'l70_hours': np.inf, 'failure_rate': 0.0}
+
+
+def site_metrics(site=SITE):
+    return calculate_lamp_metrics_batch(pd.DataFrame(LAMPS), {key: [value] for key, value in site.items()})
+
+
+def test_without_depreciation_or_failures_cash_flows_match_calculator():
+    metrics = site_metrics()
+    fleet = simulate_fleet(LAMPS, SITE, years=10, lifetime=PERFECT, seed=1)
+    np.testing.assert_array_equal(fleet['cash_flows'][:, 0], metrics['total_capital_cost'][:, 0])
+    np.testing.assert_allclose(fleet['cash_flows'][:, 1:], np.repeat(metrics['energy_cost_per_year'], 10, axis=1), rtol=1e-12)
+    five_years = metrics['total_capital_cost'][:, 0] + 5 * metrics['energy_cost_per_year'][:, 0]
+    np.testing.assert_allclose(fleet['cumulative_cost'][:, 5], five_years, rtol=1e-12)
+    # total_5year_cost is rounded to cents from the unrounded yearly cost
+    np.testing.assert_allclose(fleet['cumulative_cost'][:, 5], metrics['total_5year_cost'][:, 0], atol=0.05)
+    assert fleet['failures'].sum() == fleet['refurbishments'].sum() == 0
+    assert (fleet['mean_output'] == 1.0).all()
+    assert np.isnan(fleet['first_unsuitable_year']).all()
+
+
+def test_failures_within_warranty_cost_nothing():
+    lifetime = {'l70_hours': np.inf, 'failure_rate': 0.5}
+    covered = simulate_fleet(LAMPS, SITE, years=5, lifetime={**lifetime, 'warranty_years': 5}, seed=3)
+    assert covered['failures'][:, 1:].sum() > 0
+    assert (covered['replacement_cost'] == 0).all()
+
+    uncovered = simulate_fleet(LAMPS, SITE, years=5, lifetime=lifetime, seed=3)
+    np.testing.assert_array_equal(uncovered['failures'], covered['failures'])
+    capital_cost = np.array([lamp['capital_cost'] for lamp in LAMPS])[:, None]
+    np.testing.assert_array_equal(uncovered['replacement_cost'], uncovered['failures'] * capital_cost)
+
+
+def test_refurbishment_restores_output():
+    # 4380 hours a year against L70 8000: 82% after one year, 68% after two
+    lifetime = {'l70_hours': 8000.0, 'failure_rate': 0.0, 'refurbishment_cost': 30.0}
+    fleet = simulate_fleet(LAMPS, SITE, years=4, lifetime=lifetime, seed=0)
+    one_year = lumen_maintenance(4380.0, 8000.0)
+    np.testing.assert_allclose(fleet['mean_output'][:, 1], one_year)
+    assert (fleet['refurbishments'][:, 1] == 0).all()
+    assert (fleet['refurbishments'][:, 2] == SITE['number_of_lamps']).all()
+    np.testing.assert_array_equal(fleet['refurbishment_cost'][:, 2], SITE['number_of_lamps'] * 30.0)
+    # Refurbished units start the next year at full output again
+    np.testing.assert_array_equal(fleet['mean_output'][:, 3], fleet['mean_output'][:, 1])
+
+    worn = simulate_fleet(LAMPS, SITE, years=4, lifetime=lifetime, refurbish_below=None, seed=0)
+    assert (worn['refurbishments'] == 0).all()
+    assert (worn['mean_output'][:, 3] < worn['mean_output'][:, 2]).all()
+
+
+def test_first_unsuitable_year_for_l70_decay():
+    # Lamp A gives 10000 lm against 8000 required, so it fails once output drops below 80%.
+    # Output is 0.7 ** (hours / L70), so that happens after L70 * ln(0.8) / ln(0.7) hours.
+    l70_hours = 50_000.0
+    hours = l70_hours * math.log(0.8) / math.log(0.7)
+    expected = math.ceil(hours / (SITE['hours_per_day'] * 365))
+    assert expected == 8
+
+    fleet = simulate_fleet(LAMPS[:1], SITE, years=15, lifetime={'l70_hours': l70_hours, 'failure_rate': 0.0},
+                           refurbish_below=None)
+    assert fleet['first_unsuitable_year'][0] == expected
+    assert fleet['suitable_fraction'][0, expected - 1] == 1.0
+    assert fleet['suitable_fraction'][0, expected] == 0.0
+
+    # Lamp B starts at 31680 lm and never gets near 8000 lm within 15 years
+    assert np.isnan(simulate_fleet(LAMPS[1:], SITE, years=15, lifetime={'l70_hours': l70_hours},
+                                   refurbish_below=None)['first_unsuitable_year'][0])
+
+
+def test_fixed_seed_is_deterministic():
+    lifetime = {'l70_hours': 20_000.0, 'failure_rate': 0.2, 'wear_out_shape': 2.5}
+    first = simulate_fleet(LAMPS, SITE, years=12, lifetime=lifetime, discount_rate=0.05, seed=42)
+    second = simulate_fleet(LAMPS, SITE, years=12, lifetime=lifetime, discount_rate=0.05, seed=42)
+    for key, values in first.items():
+        np.testing.assert_array_equal(values, second[key], err_msg=key)
+
+    other = simulate_fleet(LAMPS, SITE, years=12, lifetime=lifetime, discount_rate=0.05, seed=43)
+    assert not np.array_equal(first['failures'], other['failures'])
+
+
+def test_lifetime_columns_override_arguments_and_blanks_fall_back():
+    lamps = [{**LAMPS[0], 'l70_hours': np.inf, 'failure_rate': 0.0}, LAMPS[1]]
+    fleet = simulate_fleet(lamps, SITE, years=3, lifetime={'l70_hours': 8000.0, 'failure_rate': 0.0}, seed=0)
+    assert (fleet['mean_output'][0] == 1.0).all()
+    assert fleet['mean_output'][1, 1] == pytest.approx(lumen_maintenance(4380.0, 8000.0))
@@ -0,0 +1,44 @@
+import socket
+import urllib.request
+
+import instrumentation
+from instrumentation import Registry, ensure_metrics_server
+
+
+def test_registry_renders_cumulative_buckets():
+    registry = Registry()
+    registry.observe('calc', 0.0002)
+    registry.observe('calc', 3.0)
+    text = registry.render()
+    assert 'calculator_span_seconds_bucket{span="calc",le="0.00025"} 1' in text
+    assert 'calculator_span_seconds_bucket{span="calc",le="+Inf"} 2' in text
+    assert 'calculator_span_seconds_count{span="calc"} 2' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_taken_port_disables_server_once(monkeypatch, capsys):
+    monkeypatch.setattr(instrumentation, '_server', None)
+    monkeypatch.setattr(instrumentation, '_server_disabled', False)
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        assert ensure_metrics_server(port) is None
+        assert ensure_metrics_server(port) is None
+    assert capsys.readouterr().err.count("Metrics endpoint disabled") == 1
+
+
+def test_server_serves_metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_server', None)
+    monkeypatch.setattr(instrumentation, '_server_disabled', False)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = ensure_metrics_server(port)
+    try:
+        assert ensure_metrics_server(port) is server
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+            assert response.read().decode().endswith('# EOF\n')
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,155 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from optimizer import pareto_frontier_2d_costs, solve_fixed_positions, solve_lumen_target
+
+# energy per position = hours x 365 x years x energy_cost x required_lumens / (1000 x efficacy)
+SITE = {'hours_per_day': 10.0, 'energy_cost': 1.0, 'required_lumens': 1000.0}
+
+
+def position_costs(catalog, site, years=5):
+    wattage, efficacy, capital = (np.asarray(catalog[key], dtype=np.float64) for key in ('wattage', 'efficacy', 'capital_cost'))
+    light = wattage * efficacy
+    energy = site['hours_per_day'] * (site['energy_cost'] * wattage / 1000) / (light / 1000) * (site['required_lumens'] / 1000) * 365 * years
+    suitable = light >= site['required_lumens']
+    return capital, energy, suitable
+
+
+def brute_force_pairs(catalog, site, positions, budget):
+    # Cheapest fleet of at most two lamp types, trying every split
+    capital, energy, suitable = position_costs(catalog, site)
+    total = capital + energy
+    lamps = np.flatnonzero(suitable)
+    upgraded = np.arange(positions + 1)
+    best = np.inf
+    for cheap, dear in itertools.product(lamps, repeat=2):
+        spend = (positions - upgraded) * capital[cheap] + upgraded * capital[dear]
+        cost = (positions - upgraded) * total[cheap] + upgraded * total[dear]
+        cost = cost[spend <= budget]
+        if len(cost):
+            best = min(best, cost.min())
+    return best
+
+
+def random_catalog(rng, n):
+    return {
+        'wattage': rng.uniform(50, 300, n),
+        'efficacy': rng.uniform(5, 40, n),
+        'capital_cost': rng.integers(10, 200, n).astype(float),
+    }
+
+
+def test_single_affordable_lamp_beats_split():
+    # Lamp A: capital 86, 5-year total 1172. Lamp B: capital 101, total 1089.
+    catalog = {
+        'wattage': [100.0, 100.0],
+        'efficacy': [18250 / 1086, 18250 / 988],
+        'capital_cost': [86.0, 101.0],
+    }
+    result = solve_fixed_positions(catalog, {**SITE, 'number_of_lamps': 1}, capital_budget=127)
+    assert result['mix'] == {1: 1}
+    assert result['total_cost'] == pytest.approx(1089)
+
+
+def test_budgeted_solver_never_loses_to_brute_force_pairs():
+    rng = np.random.default_rng(0)
+    for _ in range(3000):
+        catalog = random_catalog(rng, int(rng.integers(1, 7)))
+        positions = int(rng.integers(1, 12))
+        budget = float(rng.uniform(5, 200)) * positions
+        expected = brute_force_pairs(catalog, SITE, positions, budget)
+        result = solve_fixed_positions(catalog, {**SITE, 'number_of_lamps': positions}, capital_budget=budget)
+        assert result['feasible'] == np.isfinite(expected)
+        if result['feasible']:
+            assert result['number_of_lamps'] == positions
+            assert result['total_capital_cost'] <= budget + 1e-9
+            assert result['total_cost'] <= expected + 1e-6 * expected
+
+
+def test_unbudgeted_solver_picks_cheapest_suitable_lamp():
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        catalog = random_catalog(rng, 20)
+        capital, energy, suitable = position_costs(catalog, SITE)
+        result = solve_fixed_positions(catalog, {**SITE, 'number_of_lamps': 7})
+        if not suitable.any():
+            assert not result['feasible']
+            continue
+        best = np.flatnonzero(suitable)[np.argmin((capital + energy)[suitable])]
+        assert result['mix'] == {best: 7}
+
+
+def test_lumen_target_matches_brute_force_single_type_and_top_up():
+    rng = np.random.default_rng(2)
+    site = {'hours_per_day': 12.0, 'energy_cost': 0.2}
+    for _ in range(300):
+        catalog = random_catalog(rng, int(rng.integers(1, 8)))
+        total_lumens = float(rng.uniform(1_000, 60_000))
+        light = catalog['wattage'] * catalog['efficacy']
+        per_lamp = catalog['capital_cost'] + catalog['wattage'] / 1000 * 12 * 365 * 5 * 0.2
+        expected = np.inf
+        for bulk in range(len(light)):
+            full = int(np.ceil(total_lumens / light[bulk]))
+            expected = min(expected, full * per_lamp[bulk])
+            for extra in range(len(light)):
+                if (full - 1) * light[bulk] + light[extra] >= total_lumens:
+                    expected = min(expected, (full - 1) * per_lamp[bulk] + per_lamp[extra])
+        result = solve_lumen_target(catalog, site, total_lumens)
+        assert result['total_light_output'] >= total_lumens
+        assert result['total_cost'] <= expected + 1e-6 * expected
+
+
+def test_lumen_target_finds_optimum_outside_the_best_cost_per_lumen():
+    # 100 frontier lamps beat the last one on cost per lumen, but each needs
+    # two lamps to reach 1000 lm; one lamp of the last kind is cheapest overall
+    light = np.concatenate((600.0 + np.arange(100), [1000.0]))
+    catalog = {
+        'wattage': np.ones(101),
+        'efficacy': light,
+        'capital_cost': np.concatenate((550.0 + 0.5 * np.arange(100), [999.0])),
+    }
+    site = {'hours_per_day': 12.0, 'energy_cost': 0.0}
+    assert np.argsort(catalog['capital_cost'] / light)[-1] == 100
+    result = solve_lumen_target(catalog, site, 1000.0)
+    assert result['mix'] == {100: 1}
+    assert result['total_cost'] == 999.0
+
+
+def test_budgeted_lumen_target_never_loses_to_single_type_fleets():
+    # Lamps with cheap capital but costly energy drop off the cost frontier,
+    # yet may be the only fleets within budget
+    rng = np.random.default_rng(4)
+    site = {'hours_per_day': 12.0, 'energy_cost': 0.2}
+    for _ in range(100):
+        catalog = random_catalog(rng, 200)
+        total_lumens = float(rng.uniform(1_000, 60_000))
+        light = catalog['wattage'] * catalog['efficacy']
+        per_lamp = catalog['capital_cost'] + catalog['wattage'] / 1000 * 12 * 365 * 5 * 0.2
+        full = np.ceil(total_lumens / light)
+        budget = float(rng.uniform(0.5, 2.0) * np.min(full * catalog['capital_cost']))
+        affordable = full * catalog['capital_cost'] <= budget
+        result = solve_lumen_target(catalog, site, total_lumens, capital_budget=budget)
+        if affordable.any():
+            expected = np.min((full * per_lamp)[affordable])
+            assert result['feasible']
+            assert result['total_cost'] <= expected + 1e-9 * expected
+        if result['feasible']:
+            assert result['total_light_output'] >= total_lumens
+            assert result['total_capital_cost'] <= budget + 1e-9
+
+
+def test_pareto_frontier_matches_brute_force():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        first, second = rng.integers(0, 20, (2, 30)).astype(float)
+        dominated = {
+            i for i in range(30) for j in range(30)
+            if first[j] <= first[i] and second[j] <= second[i] and (first[j], second[j]) != (first[i], second[i])
+        }
+        frontier = set(pareto_frontier_2d_costs(first, second).tolist())
+        assert not frontier & dominated
+        # Every non-dominated point is on the frontier, or an exact duplicate of one that is
+        for i in set(range(30)) - dominated:
+            assert any((first[i], second[i]) == (first[j], second[j]) for j in frontier)
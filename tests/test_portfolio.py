@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from catalog import LampCatalog
+from portfolio import ResultWriter, evaluate_sites, run_portfolio, run_portfolio_to_directory
+
+pytest.importorskip('pyarrow')
+
+CATALOG = LampCatalog.from_records([
+    {'name': 'A', 'make': 'X', 'model': 'a', 'wattage': 100.0, 'efficacy': 100.0, 'capital_cost': 10.0},
+    {'name': 'B', 'make': 'Y', 'model': 'b', 'wattage': 200.0, 'efficacy': 150.0, 'capital_cost': 20.0},
+])
+
+# Nothing is suitable for the first site, both lamps are for the second
+SITES = pd.DataFrame({
+    'site_id': [1, 2], 'currency': ['$', '$'],
+    'number_of_lamps': [10.0, 10.0], 'hours_per_day': [10.0, 10.0],
+    'required_lumens': [1e9, 100.0], 'energy_cost': [0.2, 0.2],
+})
+
+
+def test_suitable_only_parquet_survives_empty_first_shard(tmp_path):
+    path = str(tmp_path / 'results.parquet')
+    writer = ResultWriter(path)
+    try:
+        rows = run_portfolio(SITES, CATALOG, writer, workers=1, sites_per_task=1, suitable_only=True)
+    finally:
+        writer.close()
+    written = pd.read_parquet(path)
+    assert rows == len(written) == 2
+    assert written['site_id'].tolist() == [2, 2]
+
+
+def test_directory_parts_share_one_schema(tmp_path):
+    rows = run_portfolio_to_directory(SITES, CATALOG, str(tmp_path / 'parts'), workers=2,
+                                      sites_per_task=1, suitable_only=True)
+    written = pd.read_parquet(tmp_path / 'parts')
+    assert rows == len(written) == 2
+
+
+def test_writer_keeps_empty_only_output(tmp_path):
+    path = str(tmp_path / 'empty.parquet')
+    writer = ResultWriter(path)
+    writer.write(evaluate_sites(CATALOG, SITES.iloc[:1], suitable_only=True))
+    writer.close()
+    assert len(pd.read_parquet(path)) == 0
+
+
+def test_csv_matches_evaluate_sites(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    writer = ResultWriter(path)
+    run_portfolio(SITES, CATALOG, writer, workers=1, sites_per_task=1)
+    writer.close()
+    expected = evaluate_sites(CATALOG, SITES)
+    pd.testing.assert_frame_equal(pd.read_csv(path), expected, check_dtype=False)
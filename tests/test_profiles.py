@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from calculator import calculate_lamp_metrics
+from profiles import (
+    HOURS_PER_YEAR, daily_hours_profile, flat_hours_per_day, load_profiles, profile_energy_costs, save_profiles,
+)
+
+
+def random_case(rng):
+    lamp = {
+        'name': 'Lamp', 'make': 'Make', 'model': 'Model',
+        'wattage': round(rng.uniform(5, 400), 1),
+        'efficacy': rng.uniform(60, 220),
+        'capital_cost': round(rng.uniform(5, 900), 2),
+    }
+    site = {
+        'number_of_lamps': float(rng.integers(1, 200000)),
+        'hours_per_day': rng.uniform(0.5, 24),
+        'required_lumens': float(round(rng.uniform(1000, 60000))),
+        'energy_cost': rng.uniform(0.01, 0.9),
+        'currency': '$',
+    }
+    return lamp, site
+
+
+def test_daily_profile_on_flat_tariff_matches_flat_metrics_exactly():
+    rng = np.random.default_rng(13)
+    for _ in range(2000):
+        lamp, site = random_case(rng)
+        flat = calculate_lamp_metrics(lamp, site)
+        profile = daily_hours_profile(site['hours_per_day'])
+        assert calculate_lamp_metrics(lamp, {**site, 'operating_profile': profile}) == flat
+        tariff = np.full(HOURS_PER_YEAR, site['energy_cost'])
+        assert calculate_lamp_metrics(
+            lamp, {**site, 'operating_profile': profile, 'tariff_profile': tariff, 'demand_rates': np.zeros(12)}
+        ) == flat
+
+
+def test_flat_hours_per_day_recognises_only_flat_schedules():
+    profile = daily_hours_profile(9.25)
+    assert flat_hours_per_day(profile, energy_cost=0.2) == 9.25
+    assert flat_hours_per_day(profile, np.full(HOURS_PER_YEAR, 0.2), np.zeros(12), 0.2) == 9.25
+
+    tariff = np.full(HOURS_PER_YEAR, 0.2)
+    tariff[18:22] = 0.35
+    assert flat_hours_per_day(profile, tariff, None, 0.2) is None
+    assert flat_hours_per_day(profile, np.full(HOURS_PER_YEAR, 0.3), None, 0.2) is None
+    assert flat_hours_per_day(profile, None, np.full(12, 5.0), 0.2) is None
+    dimmed = profile.copy()
+    dimmed[24 * 100:24 * 101] *= 0.5
+    assert flat_hours_per_day(dimmed, None, None, 0.2) is None
+
+
+def test_profile_energy_costs_tracks_flat_formula():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        lamp, site = random_case(rng)
+        expected = calculate_lamp_metrics(lamp, site)['energy_cost_per_year']
+        cost = profile_energy_costs(
+            {'wattage': [lamp['wattage']], 'efficacy': [lamp['efficacy']]},
+            site['number_of_lamps'], site['required_lumens'],
+            daily_hours_profile(site['hours_per_day']), np.full(HOURS_PER_YEAR, site['energy_cost']),
+        )[0, 0]
+        assert cost == pytest.approx(expected, rel=1e-9, abs=0.01)
+
+
+def test_saved_profiles_round_trip_through_memory_map(tmp_path):
+    profiles = np.stack([daily_hours_profile(hours) for hours in (4.5, 12.0, 24.0)])
+    path = tmp_path / 'profiles.npy'
+    save_profiles(path, profiles)
+    loaded = load_profiles(path)
+    assert loaded.shape == (3, HOURS_PER_YEAR)
+    np.testing.assert_array_equal(loaded, profiles.astype(np.float32))
+    # Whole-hour and half-hour schedules survive float32 storage unchanged
+    assert [flat_hours_per_day(row, energy_cost=0.1) for row in loaded] == [4.5, 12.0, 24.0]
@@ -0,0 +1,99 @@
+import io
+
+import pandas as pd
+import pytest
+
+from catalog import LampCatalog
+from report import export_comparison, export_report
+from results import calculate_results
+
+openpyxl = pytest.importorskip('openpyxl')
+
+LAMPS = [
+    {'name': 'SustainabLED SHB 240', 'make': 'SustainabLED', 'model': 'SHB 240', 'wattage': 240.0, 'efficacy': 204.0, 'capital_cost': 140.0},
+    {'name': 'Other 1', 'make': 'Other', 'model': 'O1', 'wattage': 200.0, 'efficacy': 120.0, 'capital_cost': 60.0},
+]
+SITE = {'number_of_lamps': 500, 'hours_per_day': 20, 'required_lumens': 35000, 'energy_cost': 0.3, 'currency': '€'}
+
+
+def sheet_rows(workbook, title):
+    return [list(row) for row in workbook[title].iter_rows(values_only=True)]
+
+
+def test_single_site_xlsx_follows_calculator_layout():
+    buffer = io.BytesIO()
+    rows = export_comparison(calculate_results(LAMPS, SITE), SITE, buffer)
+    workbook = openpyxl.load_workbook(buffer)
+    assert workbook.sheetnames[0] == 'Calculator'
+    assert rows['calculator'] == len(sheet_rows(workbook, 'Calculator'))
+
+    by_label = {row[0]: row[1:] for row in sheet_rows(workbook, 'Calculator') if row and row[0]}
+    # Site requirements block
+    assert by_label['No of Lamps'][0] == 500
+    assert by_label['No of Hours per day'][0] == 20
+    assert by_label['Lumens Required from each lamp'][0] == 35000
+    assert by_label['Energy Cost per kWh (€)'][0] == 0.3
+    # Metrics down the rows, lamps across the columns
+    assert by_label['MAKE'][:2] == ['SustainabLED', 'Other']
+    assert by_label['MODEL'][:2] == ['SHB 240', 'O1']
+    assert by_label['SUITABILITY OF THIS LAMP FOR PROJECT'][:2] == ['OKAY', 'NOT SUITABLE']
+    assert by_label['CAPITAL COST OF ALL LAMPS (€)'][:2] == [70000, 30000]
+    assert 'Suitability Check' in workbook.sheetnames
+
+
+def test_single_site_csv_keeps_site_requirements(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    rows = export_comparison(calculate_results(LAMPS, SITE), SITE, path, format='csv')
+    assert rows['sites'] == 1
+    sites = pd.read_csv(tmp_path / 'report-sites.csv')
+    assert sites.iloc[0].to_dict() == {
+        'No of Lamps': 500, 'No of Hours per day': 20, 'Lumens Required from each lamp': 35000,
+        'Energy Cost per kWh (€)': 0.3,
+    }
+
+
+def test_portfolio_report_writes_every_site(tmp_path):
+    sites = pd.DataFrame({
+        'site_id': [1, 2, 3], 'currency': ['$', '€', '$'],
+        'number_of_lamps': [10.0, 20.0, 30.0], 'hours_per_day': [10.0, 12.0, 24.0],
+        'required_lumens': [1e9, 100.0, 5000.0], 'energy_cost': [0.2, 0.3, 0.1],
+    })
+    path = str(tmp_path / 'report.xlsx')
+    rows = export_report(LampCatalog.from_records(LAMPS), sites, path, sites_per_block=2)
+    assert rows['sites'] == 3
+    assert rows['suitability'] == 6
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames[0] == 'Site Requirements'
+    written = sheet_rows(workbook, 'Site Requirements')
+    assert written[0] == ['Site ID', 'Currency', 'No of Lamps', 'No of Hours per day',
+                          'Lumens Required from each lamp', 'Energy Cost per kWh']
+    assert [row[0] for row in written[1:]] == [1, 2, 3]
+    assert [row[4] for row in written[1:]] == [1e9, 100, 5000]
+
+
+def test_parquet_sections_keep_their_types_across_blocks(tmp_path):
+    pytest.importorskip('pyarrow')
+    # The first block has no site IDs, so it can't show their type
+    sites = pd.DataFrame({
+        'site_id': [None, None, 'C'], 'currency': ['$', '€', '$'],
+        'number_of_lamps': [10.0, 20.0, 30.0], 'hours_per_day': [10.0, 12.0, 24.0],
+        'required_lumens': [1e9, 100.0, 5000.0], 'energy_cost': [0.2, 0.3, 0.1],
+    })
+    path = str(tmp_path / 'report.parquet')
+    rows = export_report(LampCatalog.from_records(LAMPS), sites, path, sites_per_block=2)
+    assert rows['suitability'] == 6
+
+    suitability = pd.read_parquet(tmp_path / 'report-suitability.parquet')
+    assert suitability['Site ID'].tolist() == [None, None, None, None, 'C', 'C']
+    assert suitability['Make'].tolist() == ['SustainabLED', 'Other'] * 3
+    assert pd.read_parquet(tmp_path / 'report-sites.parquet')['Site ID'].tolist() == [None, None, 'C']
+
+
+def test_single_site_parquet_writes_numbers_as_floats(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    export_comparison(calculate_results(LAMPS, SITE), SITE, str(tmp_path / 'report.parquet'), format='parquet')
+    schema = pq.read_schema(tmp_path / 'report-sites.parquet')
+    assert schema.names == ['No of Lamps', 'No of Hours per day', 'Lumens Required from each lamp', 'Energy Cost per kWh (€)']
+    assert all(str(schema.field(name).type) == 'double' for name in schema.names)
+    total = pd.read_parquet(tmp_path / 'report-total.parquet')
+    assert total['Total Capital Cost (€)'].tolist() == [70000, 30000]
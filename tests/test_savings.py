@@ -0,0 +1,44 @@
+import numpy as np
+
+from savings import top_alternatives
+
+
+def brute_force_top(their_cost, our_cost, k, their_output, our_output):
+    index = np.full((len(their_cost), k), -1)
+    savings = np.full((len(their_cost), k), np.nan)
+    for i in range(len(their_cost)):
+        allowed = [
+            (their_cost[i] - our_cost[j], j) for j in range(len(our_cost))
+            if our_output[j] >= their_output[i] and np.isfinite(their_cost[i] - our_cost[j])
+        ]
+        # Largest savings first, lowest index first on ties
+        allowed.sort(key=lambda pair: (-pair[0], pair[1]))
+        for rank, (value, j) in enumerate(allowed[:k]):
+            index[i, rank], savings[i, rank] = j, value
+    return index, savings
+
+
+def test_top_alternatives_matches_brute_force_with_nan_costs():
+    rng = np.random.default_rng(19)
+    for _ in range(30):
+        n_theirs, n_ours, k = rng.integers(1, 30), rng.integers(1, 40), int(rng.integers(1, 8))
+        their_cost = rng.uniform(100, 1000, n_theirs).round(0)
+        our_cost = rng.uniform(50, 900, n_ours).round(0)
+        their_cost[rng.random(n_theirs) < 0.1] = np.nan
+        our_cost[rng.random(n_ours) < 0.3] = np.nan
+        their_output = rng.uniform(1000, 5000, n_theirs)
+        our_output = rng.uniform(1000, 5000, n_ours)
+
+        top = top_alternatives(their_cost, our_cost, k, their_output, our_output, memory_budget=2000)
+        index, savings = brute_force_top(their_cost, our_cost, min(k, n_ours), their_output, our_output)
+        np.testing.assert_array_equal(top['savings'], savings)
+        # Ties may come out in either order; the savings at each rank must agree
+        chosen = np.where(top['index'] >= 0, our_cost[top['index']], np.nan)
+        expected = np.where(index >= 0, our_cost[index], np.nan)
+        np.testing.assert_array_equal(chosen, expected)
+
+
+def test_nan_alternatives_do_not_displace_real_ones():
+    top = top_alternatives([500.0], [np.nan, 100.0, np.nan, 200.0, np.nan], k=2)
+    assert top['index'].tolist() == [[1, 3]]
+    assert top['savings'].tolist() == [[400.0, 300.0]]
@@ -0,0 +1,148 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+import scenario_store
+from calculator import calculate_lamp_metrics_batch
+from scenario_store import STORED_METRICS, ScenarioStore
+
+LAMPS = pd.DataFrame({
+    'name': ['SustainabLED SHB 240', 'SustainabLED SHB 160', 'Other 1'],
+    'make': ['SustainabLED', 'SustainabLED', 'Other'],
+    'model': ['SHB 240', 'SHB 160', 'O1'],
+    'wattage': [240.0, 160.0, 200.0],
+    'efficacy': [204.0, 198.0, 120.0],
+    'capital_cost': [140.0, 102.0, 60.0],
+})
+
+
+def random_sites(seed, n_sites=25):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'site_id': [f'S{i}' for i in range(n_sites)],
+        'currency': '$',
+        'number_of_lamps': rng.integers(1, 5000, n_sites).astype(float),
+        'hours_per_day': rng.uniform(0.5, 24, n_sites),
+        'required_lumens': rng.uniform(1000, 60000, n_sites),
+        'energy_cost': rng.uniform(0.01, 0.9, n_sites),
+    })
+
+
+def count_rows(path, table):
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / 'scenarios.sqlite')
+
+
+def test_stored_results_round_trip_bit_for_bit(store_path):
+    sites = random_sites(1)
+    expected = calculate_lamp_metrics_batch(LAMPS, sites)
+
+    store = ScenarioStore(store_path)
+    first = store.evaluate(LAMPS, sites, customer='Acme')
+    assert (store.hits, store.misses) == (0, len(sites))
+    store.close()
+
+    # A fresh connection, as after a restart, reads every scenario back
+    store = ScenarioStore(store_path)
+    second = store.evaluate(LAMPS, sites, customer='Acme')
+    assert (store.hits, store.misses) == (len(sites), 0)
+    store.close()
+
+    for key in STORED_METRICS:
+        assert first[key].dtype == second[key].dtype == expected[key].dtype
+        assert first[key].tobytes() == expected[key].tobytes()
+        assert second[key].tobytes() == expected[key].tobytes()
+
+
+def test_partial_hits_only_calculate_new_sites(store_path, monkeypatch):
+    sites = random_sites(2)
+    store = ScenarioStore(store_path)
+    store.evaluate(LAMPS, sites.iloc[::2])
+
+    calculated = []
+    batch = scenario_store.calculate_lamp_metrics_batch
+
+    def counting_batch(lamps, missing):
+        calculated.append(len(missing))
+        return batch(lamps, missing)
+
+    monkeypatch.setattr(scenario_store, 'calculate_lamp_metrics_batch', counting_batch)
+    metrics = store.evaluate(LAMPS, sites)
+    store.close()
+    assert calculated == [len(sites) // 2]
+    expected = calculate_lamp_metrics_batch(LAMPS, sites)
+    for key in STORED_METRICS:
+        assert metrics[key].tobytes() == expected[key].tobytes()
+
+
+def test_lamps_sets_and_scenarios_are_stored_once(store_path):
+    store = ScenarioStore(store_path)
+    set_key = store.put_lamp_set(LAMPS)
+    assert store.put_lamp_set(LAMPS.copy()) == set_key
+    # A second set sharing two lamps adds only its new lamp
+    other_key = store.put_lamp_set(pd.concat([LAMPS.iloc[:2], LAMPS.iloc[:1].assign(name='New', model='N1')]))
+    assert other_key != set_key
+
+    sites = random_sites(3, n_sites=4)
+    # The same site twice in one call, and again under another ID and currency
+    duplicated = pd.concat([sites, sites.iloc[:1], sites.iloc[:1].assign(site_id='Elsewhere', currency='€')])
+    store.evaluate(LAMPS, duplicated, set_key=set_key)
+    store.close()
+
+    assert count_rows(store_path, 'lamps') == 4
+    assert count_rows(store_path, 'lamp_sets') == 2
+    assert count_rows(store_path, 'scenarios') == 4
+    assert count_rows(store_path, 'scenario_tags') == 5
+    store = ScenarioStore(store_path)
+    assert store.lamp_set(set_key)['name'].tolist() == LAMPS['name'].tolist()
+    store.close()
+
+
+def test_find_by_customer_site_and_lamp(store_path):
+    store = ScenarioStore(store_path)
+    sites = random_sites(4, n_sites=3)
+    store.evaluate(LAMPS, sites, customer='Acme')
+    store.evaluate(LAMPS.iloc[1:], sites.iloc[:1], customer='Globex')
+
+    assert sorted(store.find(customer='Acme')['site_id']) == ['S0', 'S1', 'S2']
+    assert store.find(customer='Globex')['site_id'].tolist() == ['S0']
+    assert sorted(store.find(site_id='S0')['customer']) == ['Acme', 'Globex']
+    assert sorted(store.find(lamp='SustainabLED SHB 240')['customer']) == ['Acme'] * 3
+    assert len(store.find(lamp='SustainabLED SHB 160')) == 4
+    assert store.find(customer='Initech').empty
+    store.close()
+
+
+def test_portfolio_store_reuses_results(tmp_path, store_path, monkeypatch):
+    sites_path = tmp_path / 'sites.csv'
+    random_sites(5, n_sites=12).to_csv(sites_path, index=False)
+    catalog_path = tmp_path / 'catalog.csv'
+    LAMPS.to_csv(catalog_path, index=False)
+
+    def run(output):
+        args = [str(sites_path), str(catalog_path), '-o', str(tmp_path / output), '-w', '1',
+                '--sites-per-task', '5', '--store', store_path, '--customer', 'Acme']
+        assert portfolio.main(args) == 0
+        return pd.read_csv(tmp_path / output)
+
+    first = run('first.csv')
+    assert count_rows(store_path, 'scenarios') == 12
+
+    def no_batch(*args, **kwargs):
+        raise AssertionError("stored sites were recalculated")
+
+    monkeypatch.setattr(scenario_store, 'calculate_lamp_metrics_batch', no_batch)
+    second = run('second.csv')
+    pd.testing.assert_frame_equal(first, second)
+    assert count_rows(store_path, 'scenarios') == 12
+    store = ScenarioStore(store_path)
+    assert sorted(store.find(customer='Acme')['site_id']) == sorted(f'S{i}' for i in range(12))
+    store.close()
@@ -0,0 +1,180 @@
+import asyncio
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import service
+from calculator import calculate_lamp_metrics, calculate_lamp_metrics_batch
+from service import CalculationService, MicroBatcher, RequestError
+
+LAMP = {'name': 'Lamp', 'make': 'Make', 'model': 'Model', 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0}
+SITE = {'number_of_lamps': 120, 'hours_per_day': 12, 'required_lumens': 20000, 'energy_cost': 0.25}
+
+
+@pytest.fixture
+def server():
+    # Run the service on its own event loop thread, on a free port
+    calculation_service = CalculationService(max_wait=0.05)
+    loop = asyncio.new_event_loop()
+
+    async def start():
+        calculation_service.batcher.start()
+        return await asyncio.start_server(calculation_service.handle_connection, '127.0.0.1', 0)
+
+    tcp_server = loop.run_until_complete(start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield calculation_service, tcp_server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    tcp_server.close()
+    loop.run_until_complete(calculation_service.batcher.stop())
+    loop.close()
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        payload = body if isinstance(body, (bytes, str)) or body is None else json.dumps(body)
+        connection.request(method, path, body=payload, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_calculate_matches_calculator(server):
+    _, port = server
+    status, result = request(port, 'POST', '/calculate', {'lamp': LAMP, 'site_requirements': SITE})
+    assert status == 200
+    assert result == calculate_lamp_metrics(LAMP, {**SITE, 'currency': '$'})
+
+
+def test_batch_matches_batch_engine(server):
+    _, port = server
+    lamps = [LAMP, {**LAMP, 'name': 'Other', 'wattage': 150.0, 'efficacy': 110.0}]
+    sites = [SITE, {**SITE, 'site_id': 'B', 'required_lumens': 17000}]
+    status, result = request(port, 'POST', '/batch', {'lamps': lamps, 'sites': sites})
+    assert status == 200
+    expected = calculate_lamp_metrics_batch(
+        {key: [lamp[key] for lamp in lamps] for key in ('wattage', 'efficacy', 'capital_cost')},
+        {key: [site[key] for site in sites] for key in SITE},
+    )
+    assert result['metrics']['total_5year_cost'] == expected['total_5year_cost'].tolist()
+    assert result['metrics']['suitability'] == [['OKAY', 'OKAY'], ['NOT SUITABLE', 'NOT SUITABLE']]
+    assert result['sites'] == [0, 'B']
+
+
+def test_oversized_number_only_fails_its_own_request(server):
+    _, port = server
+    bad = {'lamp': {**LAMP, 'wattage': 10 ** 400}, 'site_requirements': SITE}
+    good = {'lamp': LAMP, 'site_requirements': SITE}
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda body: request(port, 'POST', '/calculate', body), [good, bad] * 4))
+    assert [status for status, _ in responses] == [200, 400] * 4
+    assert 'finite' in responses[1][1]['error']
+
+
+@pytest.mark.parametrize('value', ['NaN', 'Infinity', '"12"', 'true'])
+def test_non_numeric_values_are_rejected(server, value):
+    _, port = server
+    body = json.dumps({'lamp': LAMP, 'site_requirements': SITE}).replace('"energy_cost": 0.25', f'"energy_cost": {value}')
+    status, result = request(port, 'POST', '/calculate', body)
+    assert status == 400
+    assert 'energy_cost' in result['error']
+
+
+@pytest.mark.parametrize('section, key, value, message', [
+    ('lamp', 'wattage', 0, 'greater than zero'),
+    ('lamp', 'efficacy', 0, 'greater than zero'),
+    ('lamp', 'wattage', -160, 'greater than zero'),
+    ('lamp', 'efficacy', -198.0, 'greater than zero'),
+    ('lamp', 'capital_cost', -1, 'not be negative'),
+    ('site_requirements', 'number_of_lamps', -120, 'not be negative'),
+    ('site_requirements', 'energy_cost', -0.25, 'not be negative'),
+])
+def test_zero_and_negative_inputs_are_rejected(server, section, key, value, message):
+    _, port = server
+    body = {'lamp': LAMP, 'site_requirements': SITE}
+    body[section] = {**body[section], key: value}
+    status, result = request(port, 'POST', '/calculate', body)
+    assert status == 400
+    assert f'{section}.{key}' in result['error'] and message in result['error']
+
+    lamps, sites = ([body['lamp']], [SITE]) if section == 'lamp' else ([LAMP], [body['site_requirements']])
+    assert request(port, 'POST', '/batch', {'lamps': lamps, 'sites': sites})[0] == 400
+
+
+def test_non_finite_results_are_sent_as_null():
+    # Validation keeps these out of requests; the encoder must still never write NaN
+    [result] = service.evaluate_pairs([{**LAMP, 'efficacy': 0.0}], [SITE])
+    grid = service.evaluate_grid([{**LAMP, 'efficacy': 0.0}], [SITE])
+    decoded = json.loads(service.encode_json({'result': result, 'grid': grid}))
+    assert decoded['result']['cost_per_1000lm_hour'] is None
+    assert decoded['grid']['metrics']['cost_per_1000lm_hour'] == [[None]]
+    with pytest.raises(ValueError):
+        service.encode_json({'value': float('nan')})
+
+
+def test_bad_content_length_gets_a_response():
+    calculation_service = CalculationService()
+
+    async def exchange():
+        server = await asyncio.start_server(calculation_service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"POST /calculate HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        return response
+
+    response = asyncio.run(exchange())
+    assert response.startswith(b"HTTP/1.1 400")
+    assert b"Connection: close" in response
+
+
+def test_errors_and_routes(server):
+    _, port = server
+    assert request(port, 'GET', '/health') == (200, {'status': 'ok'})
+    assert request(port, 'GET', '/nowhere')[0] == 404
+    assert request(port, 'GET', '/calculate')[0] == 405
+    assert request(port, 'POST', '/calculate', 'not json')[0] == 400
+    assert request(port, 'POST', '/calculate', {'lamp': LAMP})[0] == 400
+    status, metrics = request(port, 'GET', '/metrics')
+    assert status == 200 and 'queue_depth' in metrics
+
+
+def test_oversized_grid_is_rejected(server, monkeypatch):
+    _, port = server
+    monkeypatch.setattr(service, 'MAX_GRID_CELLS', 3)
+    status, result = request(port, 'POST', '/batch', {'lamps': [LAMP, LAMP], 'sites': [SITE, SITE]})
+    assert status == 413
+
+
+def test_unexpected_error_becomes_500(server, monkeypatch):
+    _, port = server
+
+    def broken(lamps, sites):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, 'evaluate_grid', broken)
+    status, result = request(port, 'POST', '/batch', {'lamps': [LAMP], 'sites': [SITE]})
+    assert status == 500
+    assert result == {'error': "Internal server error"}
+    assert request(port, 'GET', '/health')[0] == 200
+
+
+def test_full_queue_raises_503():
+    async def fill():
+        batcher = MicroBatcher(max_pending=1)
+        batcher.submit(LAMP, SITE)
+        with pytest.raises(RequestError) as error:
+            batcher.submit(LAMP, SITE)
+        return error.value.status
+
+    assert asyncio.run(fill()) == 503
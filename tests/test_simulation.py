@@ -0,0 +1,53 @@
+import numpy as np
+
+from simulation import StreamingHistogram, run_monte_carlo, simulate_total_costs
+
+LAMPS = [
+    {'name': 'Ours', 'make': 'SustainabLED', 'model': 'A', 'wattage': 160.0, 'efficacy': 198.0, 'capital_cost': 102.0},
+    {'name': 'Theirs', 'make': 'Other', 'model': 'B', 'wattage': 150.0, 'efficacy': 110.0, 'capital_cost': 40.0},
+    {'name': 'Blank', 'make': 'Other', 'model': 'C', 'wattage': 150.0, 'efficacy': 110.0, 'capital_cost': np.nan},
+]
+SITE = {'number_of_lamps': 120, 'hours_per_day': 12, 'required_lumens': 20000, 'energy_cost': 0.25}
+
+
+def test_histogram_percentiles_close_to_exact():
+    rng = np.random.default_rng(0)
+    values = rng.normal(100, 10, (2, 200_000))
+    histogram = StreamingHistogram(values.min(axis=1), values.max(axis=1))
+    for chunk in np.array_split(values, 4, axis=1):
+        histogram.add(chunk)
+    estimated = histogram.percentiles((5, 50, 95))
+    assert np.allclose(estimated, np.percentile(values, (5, 50, 95), axis=1).T, atol=0.05)
+
+
+def test_histogram_skips_non_finite_samples():
+    values = np.array([[1.0, 2.0, 3.0, np.nan, np.inf], [np.nan, np.nan, np.nan, np.nan, np.nan]])
+    histogram = StreamingHistogram([0.0, 0.0], [4.0, 4.0], bins=400)
+    histogram.add(values)
+    assert histogram.counts[0].sum() == 3
+    assert histogram.counts[1].sum() == 0
+    assert histogram.invalid.tolist() == [2, 5]
+    assert (histogram.minimum[0], histogram.maximum[0]) == (1.0, 3.0)
+    percentiles = histogram.percentiles((50,))
+    assert abs(percentiles[0, 0] - 2.0) < 0.02
+    assert np.isnan(percentiles[1, 0])
+
+
+def test_constant_inputs_give_the_deterministic_cost():
+    result = run_monte_carlo(LAMPS[:2], SITE, {}, n_samples=1000, seed=1)
+    samples = {key: np.array([float(SITE[key])]) for key in ('energy_cost', 'hours_per_day', 'number_of_lamps')}
+    samples['capital_cost_factor'] = np.ones((2, 1))
+    expected = simulate_total_costs(LAMPS[:2], SITE, samples)[:, 0]
+    assert np.allclose(result['mean_total_cost'], expected)
+    assert np.allclose(result['total_cost_percentiles'], expected[:, None])
+
+
+def test_lamp_without_capital_cost_does_not_corrupt_others():
+    distributions = {'energy_cost': {'dist': 'uniform', 'low': 0.1, 'high': 0.4}}
+    result = run_monte_carlo(LAMPS, SITE, distributions, n_samples=20_000, seed=2)
+    percentiles = result['total_cost_percentiles']
+    assert np.isfinite(percentiles[:2]).all()
+    assert np.isnan(percentiles[2]).all()
+    assert np.all(np.diff(percentiles[:2], axis=1) >= 0)
+    assert np.isnan(result['savings_percentiles'][0, 1]).all()
+    assert np.isfinite(result['savings_percentiles'][0, 0]).all()
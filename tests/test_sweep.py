@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from sweep import run_sweep
+
+SITE = {'number_of_lamps': 100, 'hours_per_day': 12, 'required_lumens': 20000, 'energy_cost': 0.25}
+AXES = {'energy_cost': np.linspace(0.01, 1.0, 7), 'hours_per_day': np.linspace(1, 24, 5)}
+
+
+def lamps(*capital_costs):
+    # Lower indexes are more efficient, so lamp 0 is cheapest when its cost is known
+    return [
+        {'name': f'Lamp {i}', 'wattage': 100.0 + 40 * i, 'efficacy': 150.0 - 10 * i, 'capital_cost': cost}
+        for i, cost in enumerate(capital_costs)
+    ]
+
+
+@pytest.mark.parametrize('keep_values', [True, False])
+def test_nan_lamp_never_wins(keep_values):
+    options = lamps(np.nan, 50.0, 60.0)
+    sweep = run_sweep(options, SITE, keep_values=keep_values, use_cache=False, **AXES)
+    known = run_sweep(options[1:], SITE, keep_values=keep_values, use_cache=False, **AXES)
+    np.testing.assert_array_equal(sweep['winner'], known['winner'] + 1)
+    np.testing.assert_array_equal(sweep['best'], known['best'])
+
+
+def test_cells_without_any_value_have_no_winner():
+    sweep = run_sweep(lamps(np.nan, np.nan), SITE, keep_values=False, use_cache=False, **AXES)
+    assert (sweep['winner'] == -1).all()
+    assert np.isnan(sweep['best']).all()
+
+
+def test_parallel_sweep_matches_in_process():
+    options = lamps(np.nan, 50.0, 60.0, 20.0)
+    serial = run_sweep(options, SITE, workers=1, chunk_cells=16, keep_values=False, use_cache=False, **AXES)
+    parallel = run_sweep(options, SITE, workers=2, chunk_cells=16, keep_values=False, use_cache=False, **AXES)
+    np.testing.assert_array_equal(serial['winner'], parallel['winner'])
+    np.testing.assert_array_equal(serial['best'], parallel['best'])